@@ -0,0 +1,208 @@
+import asyncio
+import json
+import time
+from tqdm import tqdm
+import config
+from LogDecoder import (LogDecoder, GET_TRANSACTION_CONFIG, _json_loads, DECODE_RETRIES, DECODE_RETRY_SLEEP,
+                        is_retryable_rpc_error)
+from RateLimiter import RateLimiter
+from EndpointPool import EndpointPool
+from RpcBudget import rpc_slot_async
+from RpcTransport import RpcTransport
+from Tracer import traced
+
+CONFIG = config.CONFIG  # 直接使用 CONFIG
+
+
+class AsyncDecodeEngine:
+    """
+    基于 asyncio 的交易解码引擎：
+    - 单个事件循环，每个 RPC 端点固定数量的协程 worker（即该端点的最大并发）
+    - worker 从共享队列领取签名，快的端点自然领取更多任务；worker 数按 CONFIG["endpoint_weights"] 缩放
+    - 端点健康状态与 EndpointPool 一致：被剔除的端点的 worker 暂停领取任务，冷却后恢复
+    - 解码结果统一交给一个 writer 协程顺序写入，无需线程锁
+    """
+
+    def __init__(self, rpc_urls, log_decoder, concurrency_per_endpoint=None, max_retries=5, wait_time=1):
+        """
+        :param rpc_urls: RPC 端点列表
+        :param log_decoder: LogDecoder 实例，用于解析交易 JSON 和写入结果
+        :param concurrency_per_endpoint: 每个端点同时在途的请求数（默认读取 CONFIG["async_concurrency_per_endpoint"]）
+        :param max_retries: 单笔交易的最大重试次数
+        :param wait_time: 每次重试的等待时间（秒）
+        """
+        if not rpc_urls:
+            raise ValueError("❌ 没有可用的 RPC 端点，请检查 CONFIG 配置！")
+        self.rpc_urls = rpc_urls
+        self.log_decoder = log_decoder
+        self.concurrency_per_endpoint = concurrency_per_endpoint or CONFIG.get("async_concurrency_per_endpoint", 20)
+        self.max_retries = max_retries
+        self.wait_time = wait_time
+        # 与同步路径共用端点池：延迟、错误率与剔除状态只有一份；端点列表不同时才单独建池
+        shared_pool = EndpointPool.for_url(rpc_urls[0])
+        if [endpoint.url for endpoint in shared_pool.endpoints] == list(rpc_urls):
+            self.endpoint_pool = shared_pool
+        else:
+            self.endpoint_pool = EndpointPool.from_config(rpc_urls)
+
+        print(f"AsyncDecodeEngine initialized: {len(rpc_urls)} endpoints x {self.concurrency_per_endpoint} concurrency")
+
+    def run(self, tx_signatures):
+        """
+        解码全部交易签名（阻塞直到完成）
+        :param tx_signatures: [(signature, market_address), ...]
+        """
+        if not tx_signatures:
+            print("⚠️ 没有符合条件的交易签名，跳过解码！")
+            return
+        asyncio.run(self._run(tx_signatures))
+
+    async def _create_client(self, rpc_url):
+        """ 创建异步客户端，连接池上限与并发数一致，HTTP/2 与超时沿用共享传输层配置 """
+        return await RpcTransport.shared().async_client(rpc_url, max_connections=self.concurrency_per_endpoint)
+
+    async def _run(self, tx_signatures):
+        start_time = time.time()
+        clients = [await self._create_client(endpoint.url) for endpoint in self.endpoint_pool.endpoints]
+
+        # 输入队列一次性装满，结果队列有界：writer 跟不上时 worker 会等待
+        task_queue = asyncio.Queue()
+        for item in tx_signatures:
+            task_queue.put_nowait(item)
+        result_queue = asyncio.Queue(maxsize=self.concurrency_per_endpoint * len(clients) * 2)
+
+        progress = tqdm(total=len(tx_signatures), desc="Overall Progress", position=0, leave=True,
+                        dynamic_ncols=True, unit="tx")
+
+        writer = asyncio.create_task(self._writer(result_queue, progress))
+        workers = [
+            asyncio.create_task(self._worker(client, endpoint, task_queue, result_queue))
+            for client, endpoint in zip(clients, self.endpoint_pool.endpoints)
+            for _ in range(max(1, round(self.concurrency_per_endpoint * endpoint.weight)))
+        ]
+
+        try:
+            # 同时等待 worker 与 writer：writer 只会因异常提前结束，此时结果队列有界，worker 会一直阻塞，
+            # 直接抛出 writer 的异常，由 finally 取消 worker
+            pending = set(workers)
+            while pending:
+                done, pending = await asyncio.wait(pending | {writer}, return_when=asyncio.FIRST_COMPLETED)
+                pending.discard(writer)
+                for task in done:
+                    task.result()
+            await result_queue.put(None)  # 通知 writer 结束
+            await writer
+        finally:
+            for task in workers + [writer]:
+                task.cancel()  # 正常结束时都已完成，cancel 无效果；异常时避免遗留的协程
+            progress.close()
+            for client in clients:
+                await client.close()
+
+        elapsed_time = time.time() - start_time
+        print(f"\n✅ 异步解码完成，共处理 {len(tx_signatures)} 笔交易，耗时 {elapsed_time:.2f} 秒")
+        for stat in self.endpoint_pool.stats():
+            print(f"   {stat}")
+
+    async def _worker(self, client, endpoint, task_queue, result_queue):
+        """ 不断领取签名并解码，直到输入队列为空；端点被剔除期间暂停领取 """
+        while True:
+            while not endpoint.is_available():
+                await asyncio.sleep(max(0.1, endpoint.ejected_until - time.monotonic()))
+            try:
+                transaction_signature, market_address = task_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            transaction_data = await self._decode_transaction(client, endpoint, transaction_signature, market_address)
+            await result_queue.put((transaction_signature, transaction_data))
+
+    async def _get_transaction_with_retries(self, client, endpoint, transaction_signature):
+        """
+        带重试机制的异步交易查询：直接发送 JSON-RPC 请求并解析原始响应字节（与 LogDecoder 的快速路径相同）
+        :return: 交易 JSON（dict） 或 None（查询失败 / 未找到）
+        """
+        provider = client._provider
+        headers = {"Content-Type": "application/json", **(provider.extra_headers or {})}
+        content = json.dumps({"jsonrpc": "2.0", "id": 0, "method": "getTransaction",
+                              "params": [transaction_signature, GET_TRANSACTION_CONFIG]})
+        rate_limiter = RateLimiter.for_endpoint(client._provider.endpoint_uri)
+        for attempt in range(1, self.max_retries + 1):
+            await rate_limiter.acquire_async()
+            self.endpoint_pool.begin(endpoint)
+            request_start = time.monotonic()
+            try:
+                async with rpc_slot_async():  # 全局并发预算（PairScheduler 启用时）
+                    request_start = time.monotonic()  # 预算等待不计入端点延迟
+                    response = await provider.session.post(provider.endpoint_uri, content=content, headers=headers)
+                response.raise_for_status()
+                reply = _json_loads(response.content)
+                if "error" in reply and is_retryable_rpc_error(reply["error"]):
+                    raise ValueError(f"RPC error: {reply['error']}")
+                rate_limiter.record_result()
+                self.endpoint_pool.record(endpoint, time.monotonic() - request_start, method="getTransaction")
+                if "error" in reply:
+                    self.log_decoder.log(f"🚨 RPC error {reply['error']}, skipping transaction {transaction_signature}.")
+                    return None
+                tx_details = reply.get("result")
+                if tx_details is None:
+                    self.log_decoder.log("⚠️ Transaction not found or is not confirmed yet.")
+                return tx_details
+            except Exception as e:
+                rate_limiter.record_result(e)
+                self.endpoint_pool.record(endpoint, time.monotonic() - request_start, e, "getTransaction")
+                self.log_decoder.log(f"❌ Error fetching transaction (attempt {attempt}/{self.max_retries}): {e}")
+                if attempt < self.max_retries:
+                    delay = rate_limiter.backoff(attempt, self.wait_time)
+                    DECODE_RETRIES.inc("getTransaction")
+                    DECODE_RETRY_SLEEP.inc("getTransaction", value=delay)
+                    await asyncio.sleep(delay)
+        self.log_decoder.log(f"🚨 All {self.max_retries} attempts failed. Skipping transaction {transaction_signature}.")
+        return None
+
+    @traced("decode_tx", category="decode", sample=True)
+    async def _decode_transaction(self, client, endpoint, transaction_signature, market_address):
+        """ 异步版本的 LogDecoder.decode_transaction """
+        # 缓存读写是 gzip 文件 I/O，放到线程池执行以免阻塞事件循环
+        loop = asyncio.get_running_loop()
+        tx_cache = self.log_decoder.tx_cache
+        if tx_cache is not None:
+            cached = await loop.run_in_executor(None, tx_cache.get, transaction_signature)
+            if cached is not None:
+                if self.log_decoder.slot_index is not None:
+                    self.log_decoder.slot_index.record(cached.get("slot"), cached.get("blockTime"))
+                return self.log_decoder.parse_transaction_json(cached, market_address)
+
+        tx_details = await self._get_transaction_with_retries(client, endpoint, transaction_signature)
+        if tx_details is None:
+            return {"blockTime": None, "balanceChanges": []}
+
+        if self.log_decoder.slot_index is not None:
+            self.log_decoder.slot_index.record(tx_details.get("slot"), tx_details.get("blockTime"))
+
+        if tx_cache is not None:
+            await loop.run_in_executor(None, tx_cache.put, transaction_signature, tx_details)
+        return self.log_decoder.parse_transaction_json(tx_details, market_address)
+
+    async def _writer(self, result_queue, progress):
+        """ 唯一的写入者：顺序写入结果；未使用 DataWriter 时文件 I/O 放到线程池执行以免阻塞事件循环 """
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await result_queue.get()
+            if item is None:
+                return
+            transaction_signature, transaction_data = item
+            if self.log_decoder.data_writer is not None:
+                self.log_decoder.save_decoded(transaction_signature, transaction_data)  # 仅入队，不阻塞
+            else:
+                await loop.run_in_executor(None, self.log_decoder.save_decoded, transaction_signature, transaction_data)
+            progress.update(1)
+
+
+# ========== 使用示例 ==========
+if __name__ == "__main__":
+    rpc_urls = [CONFIG[key] for key in CONFIG if key.startswith("rpc_url")]
+    engine = AsyncDecodeEngine(rpc_urls, LogDecoder(rpc_urls[0], log_enabled=False))
+
+    transaction_signature = "3XZp6PAJT9e2k2t5U1mdo2kc9boDG69JjeV5oUwquNG3SLJigQMDHoYhb7TrZUsHCSyMDyV4r4QSH6ynuw17Jj89"
+    market_address = "3nMFwZXwY1s1M5s8vYAHqd4wGs4iSxXE4LRoUMMYqEgF"
+    engine.run([(transaction_signature, market_address)])
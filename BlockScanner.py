@@ -0,0 +1,206 @@
+import concurrent.futures
+import csv
+import glob
+import os
+import time
+from tqdm import tqdm
+import config
+from LogDecoder import LogDecoder
+from TransactionFetcher import TransactionFetcher
+
+CONFIG = config.CONFIG  # 直接使用 CONFIG
+
+GET_BLOCK_CONFIG = {
+    "encoding": "json",
+    "maxSupportedTransactionVersion": 0,
+    "transactionDetails": "full",
+    "rewards": False,
+}
+
+# getBlock 的错误码：Slot 被跳过 / 区块不在长期存储中，重试也不会有结果
+SKIPPED_SLOT_ERRORS = {-32007, -32009}
+
+# get_block_with_retries 多次重试仍失败时的返回值（与被跳过的 Slot 返回的 None 区分，不能记为跳过）
+BLOCK_FAILED = object()
+
+
+class BlockScanner:
+    """
+    区块扫描模式：对 [start_slot, end_slot] 中的每个 Slot 调用一次 getBlock（多线程并行），
+    在同一遍扫描中提取 RESULT/POOL/*.csv 里所有交易池的余额变化。
+    对 WSOL/USDC 这类交易数远多于 Slot 数的活跃池，RPC 调用数远少于逐笔 getSignaturesForAddress + getTransaction。
+    结果与逐笔模式一致：DATA 通过 LogDecoder.save_decoded 写入，命中的签名同时追加到 SIGNATURE 文件。
+    """
+
+    def __init__(self, start_slot, end_slot, log_decoder, max_workers=None):
+        """
+        :param start_slot: 起始 Slot
+        :param end_slot: 结束 Slot（包含）
+        :param log_decoder: LogDecoder 实例（提供 RPC 端点池、解析与写入逻辑）
+        :param max_workers: 同时请求的区块数（默认读取 CONFIG["block_scan_workers"]）
+        """
+        self.start_slot = start_slot
+        self.end_slot = end_slot
+        self.log_decoder = log_decoder
+        self.max_workers = max_workers or CONFIG.get("block_scan_workers", 32)
+
+        self.pool_folder = os.path.join(CONFIG["output_path"], "POOL")
+        self.signature_folder = os.path.join(CONFIG["output_path"], "SIGNATURE")
+        os.makedirs(self.signature_folder, exist_ok=True)
+
+        self.pools = self.load_pools()  # pool_id -> SIGNATURE 文件名
+
+        # 统计信息
+        self.blocks_fetched = 0
+        self.slots_skipped = 0
+        self.transactions_matched = 0
+        self.failed_slots = []  # 多次重试仍失败的 Slot，需要重新扫描
+
+    def load_pools(self):
+        """
+        读取 RESULT/POOL/POOL_{symbol1}_{symbol2}.csv，返回 {pool_id: "{symbol1}_{symbol2}.csv"}
+        """
+        pools = {}
+        for pool_file in sorted(glob.glob(os.path.join(self.pool_folder, "POOL_*.csv"))):
+            file_name = os.path.basename(pool_file)[len("POOL_"):]
+            with open(pool_file, mode="r", newline="", encoding="utf-8") as file:
+                for row in csv.DictReader(file):
+                    if row.get("pool_id"):
+                        pools[row["pool_id"]] = file_name
+        print(f"🔍 区块扫描：共 {len(pools)} 个交易池")
+        return pools
+
+    def get_block_with_retries(self, slot, max_retries=5, wait_time=1):
+        """
+        获取完整区块（原始 JSON）
+        :return: 区块 JSON（dict）；Slot 被跳过时返回 None，多次失败时返回 BLOCK_FAILED
+        """
+        payload = {"jsonrpc": "2.0", "id": 0, "method": "getBlock", "params": [slot, GET_BLOCK_CONFIG]}
+        for attempt in range(1, max_retries + 1):
+            try:
+                reply = self.log_decoder.rpc_request(payload)
+                error = reply.get("error")
+                if error is not None:
+                    if error.get("code") in SKIPPED_SLOT_ERRORS:
+                        return None
+                    raise ValueError(f"RPC error: {error}")
+                return reply.get("result")
+            except Exception as e:
+                self.log_decoder.log(f"❌ Error fetching block {slot} (attempt {attempt}/{max_retries}): {e}")
+                if attempt < max_retries:
+                    time.sleep(self.log_decoder.endpoint_pool.backoff(attempt, wait_time))
+        print(f"🚨 区块 {slot} 获取失败，稍后重新扫描")
+        return BLOCK_FAILED
+
+    def scan_block(self, slot):
+        """
+        获取一个区块并找出涉及目标交易池的成功交易（在工作线程中执行）
+        :return: (slot, blockTime, [(signature, pool_id, tx_details), ...])，Slot 被跳过时 blockTime 为 None，
+                 获取失败时 blockTime 为 BLOCK_FAILED
+        """
+        block = self.get_block_with_retries(slot)
+        if block is None or block is BLOCK_FAILED:
+            return slot, block, []
+
+        block_time = block.get("blockTime")
+        matches = []
+        for tx in block.get("transactions") or []:
+            meta = tx.get("meta")
+            if not meta or meta.get("err") is not None:
+                continue
+            owners = {
+                b.get("owner")
+                for b in (meta.get("preTokenBalances") or []) + (meta.get("postTokenBalances") or [])
+            }
+            pool_ids = owners.intersection(self.pools)
+            if not pool_ids:
+                continue
+            # 与 getTransaction 的 result 结构相同，可直接交给 parse_transaction_json / 交易缓存
+            tx_details = {"slot": slot, "blockTime": block_time, **tx}
+            signature = tx["transaction"]["signatures"][0]
+            for pool_id in pool_ids:
+                matches.append((signature, pool_id, tx_details))
+        return slot, block_time, matches
+
+    def handle_result(self, slot, block_time, matches):
+        """ 在主线程中处理一个区块的结果：写索引、缓存、DATA 与 SIGNATURE """
+        slot_index = self.log_decoder.slot_index
+        if block_time is BLOCK_FAILED:
+            # 临时故障（超时 / 5xx / 限流）不是被跳过的 Slot，不写入 Slot 索引，留待重新扫描
+            self.failed_slots.append(slot)
+            return
+        if block_time is None:
+            self.slots_skipped += 1
+            if slot_index is not None:
+                slot_index.record_skipped(slot)
+            return
+
+        self.blocks_fetched += 1
+        if slot_index is not None:
+            slot_index.record(slot, block_time)
+
+        signature_rows = {}
+        for signature, pool_id, tx_details in matches:
+            if self.log_decoder.tx_cache is not None:
+                self.log_decoder.tx_cache.put(signature, tx_details)
+            transaction_data = self.log_decoder.parse_transaction_json(tx_details, pool_id)
+            self.log_decoder.save_decoded(signature, transaction_data)
+            signature_rows.setdefault(self.pools[pool_id], []).append([signature, slot, pool_id])
+            self.transactions_matched += 1
+
+        for file_name, rows in signature_rows.items():
+            TransactionFetcher.append_signatures(os.path.join(self.signature_folder, file_name), rows)
+
+    def run(self, slots=None):
+        """
+        扫描全部 Slot：最多 max_workers * 2 个区块在途，完成一个处理一个，避免大量区块同时驻留内存
+        :param slots: 要扫描的 Slot 列表（默认为 [start_slot, end_slot]，重新扫描失败的 Slot 时传入 failed_slots）
+        :return: 本次多次重试仍失败的 Slot 列表
+        """
+        if not self.pools:
+            print("⚠️ RESULT/POOL 中没有交易池，跳过区块扫描！")
+            return []
+
+        start_time = time.time()
+        slots = list(range(self.start_slot, self.end_slot + 1)) if slots is None else list(slots)
+        total = len(slots)
+        slots = iter(slots)
+        self.failed_slots = []
+        progress = tqdm(total=total, desc="Block Scan", position=0, leave=True,
+                        dynamic_ncols=True, unit="slot")
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = set()
+            for slot in slots:
+                pending.add(executor.submit(self.scan_block, slot))
+                if len(pending) >= self.max_workers * 2:
+                    break
+
+            while pending:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    self.handle_result(*future.result())
+                    progress.update(1)
+                    next_slot = next(slots, None)
+                    if next_slot is not None:
+                        pending.add(executor.submit(self.scan_block, next_slot))
+        progress.close()
+
+        elapsed_time = time.time() - start_time
+        print(f"\n✅ 区块扫描完成：{self.blocks_fetched} 个区块，{self.slots_skipped} 个跳过的 Slot，"
+              f"{len(self.failed_slots)} 个获取失败的 Slot，命中 {self.transactions_matched} 笔交易，耗时 {elapsed_time:.2f} 秒")
+        if self.failed_slots:
+            print(f"⚠️ 获取失败的 Slot（未写入 DATA / SIGNATURE，需要重新扫描）: {sorted(self.failed_slots)[:20]}"
+                  f"{' ...' if len(self.failed_slots) > 20 else ''}")
+        return list(self.failed_slots)
+
+
+# ========== 使用示例 ==========
+if __name__ == "__main__":
+    from DataWriter import DataWriter
+
+    rpc_url = CONFIG["rpc_url1"]
+    log_decoder = LogDecoder(rpc_url, log_enabled=False)
+    with DataWriter() as data_writer:
+        log_decoder.data_writer = data_writer
+        BlockScanner(323247000, 323247010, log_decoder).run()
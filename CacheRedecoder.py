@@ -0,0 +1,105 @@
+import csv
+import glob
+import os
+import shutil
+import time
+import config
+from DataWriter import DataWriter
+from LogDecoder import LogDecoder
+from TransactionCache import TransactionCache
+
+CONFIG = config.CONFIG  # 直接使用 CONFIG
+
+
+class CacheRedecoder:
+    """
+    离线重新解码：只读取 RESULT/SIGNATURE/*.csv 与本地交易缓存，重建 RESULT/DATA，不发起任何 RPC 请求。
+    适用于修改解码逻辑或新增交易池后重新生成结果。
+    """
+
+    def __init__(self, tx_cache=None, log_enabled=False):
+        """
+        :param tx_cache: TransactionCache 实例（默认使用共享缓存）
+        :param log_enabled: 是否输出逐笔日志
+        """
+        self.tx_cache = tx_cache or TransactionCache.shared()
+        # 仅使用 LogDecoder 的解析与写入逻辑，不会连接 RPC
+        self.log_decoder = LogDecoder(None, log_enabled=log_enabled)
+        self.signature_folder = os.path.join(CONFIG["output_path"], "SIGNATURE")
+        self.data_folder = os.path.join(CONFIG["output_path"], "DATA")
+
+    def read_signature_files(self):
+        """
+        读取全部签名文件，返回去重后的 [(signature, market_address), ...]
+        """
+        seen = set()
+        entries = []
+        for sig_file in sorted(glob.glob(os.path.join(self.signature_folder, "*.csv"))):
+            with open(sig_file, mode="r", newline="") as file:
+                for row in csv.DictReader(file):
+                    signature = row.get("Signature")
+                    market_address = row.get("Market_Address")
+                    if not signature or not market_address or signature in seen:
+                        continue
+                    seen.add(signature)
+                    entries.append((signature, market_address))
+        return entries
+
+    def run(self, rebuild=True):
+        """
+        执行离线解码
+        :param rebuild: True 时先写入临时目录，完成后整体替换 DATA 中对应的文件；
+                        缓存中没有的交易沿用 DATA 中已有的行，不会因为未缓存而丢失
+                        False 时直接追加到现有 DATA 文件（已存在的签名会被跳过）
+        :return: (缓存解码笔数, 未缓存笔数, 沿用的已有行数)
+        """
+        start_time = time.time()
+        output_folder = self.data_folder + "_REBUILD" if rebuild else self.data_folder
+        if rebuild and os.path.exists(output_folder):
+            shutil.rmtree(output_folder)
+
+        data_writer = DataWriter(output_folder=output_folder, log_enabled=False)
+        self.log_decoder.data_writer = data_writer
+
+        decoded, missing = 0, 0
+        decoded_signatures = set()
+        for transaction_signature, market_address in self.read_signature_files():
+            tx_details = self.tx_cache.get(transaction_signature)
+            if tx_details is None:
+                missing += 1
+                continue
+            transaction_data = self.log_decoder.parse_transaction_json(tx_details, market_address)
+            self.log_decoder.save_decoded(transaction_signature, transaction_data)
+            decoded_signatures.add(transaction_signature)
+            decoded += 1
+
+        # 重建时，未能从缓存重新解码的签名（启用缓存之前解码的行、区块扫描写入的行等）原样保留
+        preserved = 0
+        if rebuild and os.path.isdir(self.data_folder):
+            for file_name in sorted(os.listdir(self.data_folder)):
+                if not file_name.endswith(".csv"):
+                    continue
+                for row in DataWriter.read_rows(os.path.join(self.data_folder, file_name)):
+                    if len(row) != len(DataWriter.HEADER) or row[0] in decoded_signatures:
+                        continue
+                    signature, token1, token1_change, token2, token2_change, block_time = row
+                    data_writer.submit(token1, token2, signature, token1_change, token2_change, block_time)
+                    preserved += 1
+
+        data_writer.close()
+
+        if rebuild:
+            os.makedirs(self.data_folder, exist_ok=True)
+            for file_name in os.listdir(output_folder):
+                os.replace(os.path.join(output_folder, file_name), os.path.join(self.data_folder, file_name))
+            os.rmdir(output_folder)
+
+        elapsed_time = time.time() - start_time
+        print(f"✅ 离线解码完成：{decoded} 笔来自缓存，{missing} 笔未缓存（沿用 DATA 中已有的 {preserved} 行），"
+              f"写入 {sum(data_writer.rows_written.values())} 行，耗时 {elapsed_time:.2f} 秒")
+        return decoded, missing, preserved
+
+
+# ========== 主函数 ========== #
+if __name__ == "__main__":
+    CacheRedecoder().run()
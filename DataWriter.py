@@ -0,0 +1,207 @@
+import atexit
+import csv
+import os
+import queue
+import threading
+import time
+import config
+from Metrics import Metrics
+from Tracer import Tracer
+
+CONFIG = config.CONFIG  # 直接使用 CONFIG
+
+DATA_ROWS = Metrics.shared().counter("data_rows_written_total", "写入 DATA 文件的行数", ("file",))
+WRITER_FLUSH = Metrics.shared().histogram("writer_flush_seconds", "DataWriter 一次批量写盘的耗时（秒）")
+WRITER_QUEUE = Metrics.shared().gauge("writer_queue_size", "DataWriter 队列中等待写盘的行数")
+TRACER = Tracer.shared()
+
+
+class DataWriter:
+    """
+    DATA 文件的后台批量写入器（write-behind）：
+    - 解码线程只调用 submit() 把结果放入队列，不接触文件系统
+    - 唯一的写入线程按文件缓冲结果，达到数量或时间阈值时批量追加
+    - 每个输出文件的已有签名只在首次写入时读取一次，用于去重
+    """
+
+    HEADER = ["Signature", "Token1", "Token1_Change", "Token2", "Token2_Change", "BlockTime"]
+
+    def __init__(self, output_folder=None, batch_size=None, flush_interval=None, log_enabled=True):
+        """
+        :param output_folder: 输出目录（默认 RESULT/DATA）
+        :param batch_size: 缓冲多少行后写盘（默认读取 CONFIG["writer_batch_size"]）
+        :param flush_interval: 最长多少秒写盘一次（默认读取 CONFIG["writer_flush_interval"]）
+        :param log_enabled: 是否输出写入日志
+        """
+        self.output_folder = output_folder or os.path.join(CONFIG["output_path"], "DATA")
+        os.makedirs(self.output_folder, exist_ok=True)
+        self.batch_size = batch_size or CONFIG.get("writer_batch_size", 500)
+        self.flush_interval = flush_interval or CONFIG.get("writer_flush_interval", 1.0)
+        self.log_enabled = log_enabled
+
+        self._queue = queue.Queue()
+        self._buffers = {}  # file_name -> [row, ...]
+        self._buffered = 0
+        self._existing_signatures = {}  # file_name -> set(signature)
+        self.rows_written = {}  # file_name -> 已写入行数
+        self._closed = False
+
+        WRITER_QUEUE.track(self._queue.qsize)
+
+        self._thread = threading.Thread(target=self._run, name="DataWriter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, message):
+        """ 控制日志输出 """
+        if self.log_enabled:
+            print(message)
+
+    def submit(self, token1_symbol, token2_symbol, transaction_signature, token1_change, token2_change, block_time):
+        """
+        提交一行解码结果（线程安全，不阻塞于磁盘 I/O）
+        """
+        file_name = f"{token1_symbol}_{token2_symbol}.csv"
+        row = [transaction_signature, token1_symbol, token1_change, token2_symbol, token2_change, block_time]
+        self._queue.put((file_name, row))
+
+    def flush(self):
+        """
+        把已提交的所有结果写盘，阻塞直到完成
+        """
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        """
+        写盘并停止写入线程（可重复调用）
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _run(self):
+        """ 写入线程主循环 """
+        next_flush = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, next_flush - time.monotonic()))
+            except queue.Empty:
+                item = ()
+
+            if item is None:
+                self._flush_all()
+                return
+            if isinstance(item, threading.Event):
+                self._flush_all()
+                item.set()
+                continue
+            if item:
+                file_name, row = item
+                self._buffers.setdefault(file_name, []).append(row)
+                self._buffered += 1
+
+            if self._buffered >= self.batch_size or time.monotonic() >= next_flush:
+                self._flush_all()
+                next_flush = time.monotonic() + self.flush_interval
+
+    @classmethod
+    def read_rows(cls, output_file):
+        """
+        读取 DATA 文件中的全部数据行（不含表头）
+        兼容表头与第一行数据之间缺少换行的旧文件（表头最后一列与第一行的签名连在一起）
+        """
+        rows = []
+        if not os.path.exists(output_file):
+            return rows
+        with open(output_file, mode="r", newline="") as file:
+            reader = csv.reader(file)
+            header = next(reader, None)
+            if header and len(header) == 2 * len(cls.HEADER) - 1 and header[:len(cls.HEADER) - 1] == cls.HEADER[:-1]:
+                rows.append([header[len(cls.HEADER) - 1][len(cls.HEADER[-1]):]] + header[len(cls.HEADER):])
+            rows.extend(row for row in reader if row)
+        return rows
+
+    def _load_existing(self, output_file):
+        """ 首次写入某文件时读取一次已有签名 """
+        return {row[0] for row in self.read_rows(output_file)}
+
+    def _flush_all(self):
+        """ 把缓冲区中的结果去重后批量追加到各自的文件 """
+        if not self._buffered:
+            return
+        with TRACER.span("write_data", category="io", sample=True, rows=self._buffered):
+            self._write_buffers()
+
+    def _write_buffers(self):
+        flush_start = time.perf_counter()
+        failed = {}  # 写盘失败的缓冲留到下次重试
+        for file_name, rows in self._buffers.items():
+            if not rows:
+                continue
+            output_file = os.path.join(self.output_folder, file_name)
+            try:
+                if file_name not in self._existing_signatures:
+                    self._existing_signatures[file_name] = self._load_existing(output_file)
+                existing_signatures = self._existing_signatures[file_name]
+
+                new_rows = []
+                batch_signatures = set()
+                for row in rows:
+                    if row[0] in existing_signatures or row[0] in batch_signatures:
+                        continue
+                    batch_signatures.add(row[0])
+                    new_rows.append(row)
+                if not new_rows:
+                    continue
+
+                # 文件末尾缺少换行时先补上，避免新行接在最后一行后面
+                missing_newline = False
+                if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
+                    with open(output_file, mode="rb") as file:
+                        file.seek(-1, os.SEEK_END)
+                        missing_newline = file.read(1) not in (b"\n", b"\r")
+
+                with open(output_file, mode="a", newline="") as file:
+                    if missing_newline:
+                        file.write("\r\n")
+                    writer = csv.writer(file)
+                    if os.stat(output_file).st_size == 0:
+                        writer.writerow(self.HEADER)
+                    writer.writerows(new_rows)
+            except Exception as e:
+                print(f"❌ 写入 CSV 失败（{len(rows)} 行保留在缓冲区，下次写盘时重试）: {e}")
+                failed[file_name] = rows
+                continue
+
+            # 写盘成功后才记为已有签名，失败的行重新提交时不会被当作重复丢弃
+            existing_signatures.update(batch_signatures)
+            self.rows_written[file_name] = self.rows_written.get(file_name, 0) + len(new_rows)
+            DATA_ROWS.inc(file_name, value=len(new_rows))
+            self.log(f"✅ {len(new_rows)} 条交易数据已批量存入 {output_file}，BlockTime: {new_rows[-1][-1]}")
+
+        self._buffers = failed
+        self._buffered = sum(len(rows) for rows in failed.values())
+        WRITER_FLUSH.observe(time.perf_counter() - flush_start)
+
+
+# ========== 使用示例 ==========
+if __name__ == "__main__":
+    import tempfile
+
+    # 写入临时目录，避免污染 RESULT/DATA
+    with DataWriter(output_folder=tempfile.mkdtemp()) as data_writer:
+        data_writer.submit("WSOL", "USDC", "example-signature", 1.5, 200.0, 1740595456)
+        data_writer.submit("WSOL", "USDC", "example-signature", 1.5, 200.0, 1740595456)  # 重复提交会被去重
+    print(data_writer.rows_written)
@@ -0,0 +1,273 @@
+import functools
+import random
+import threading
+import time
+from urllib.parse import urlparse
+from solana.rpc.core import RPCException
+import config
+from Metrics import Metrics
+from RateLimiter import RateLimiter, is_throttle_error
+from RpcBudget import rpc_slot
+from RpcTransport import RpcTransport
+
+CONFIG = config.CONFIG  # 直接使用 CONFIG
+
+RPC_REQUESTS = Metrics.shared().counter("rpc_requests_total", "RPC 请求数", ("method", "endpoint", "status"))
+RPC_LATENCY = Metrics.shared().histogram("rpc_latency_seconds", "RPC 请求耗时（秒，不含限速与全局预算的等待）", ("method", "endpoint"))
+
+
+@functools.lru_cache(maxsize=None)
+def rpc_method_name(method):
+    """ solana-py 的方法名转为 JSON-RPC 方法名，例如 get_transaction -> getTransaction """
+    head, *rest = method.split("_")
+    return head + "".join(part.title() for part in rest)
+
+
+class Endpoint:
+    """
+    单个 RPC 端点的客户端及健康状态（滚动延迟 / 错误率）
+    """
+
+    def __init__(self, url, weight=1.0, ewma_alpha=0.2):
+        """
+        :param url: RPC 端点
+        :param weight: 权重，越大分到的请求越多
+        :param ewma_alpha: 滚动平均的平滑系数
+        """
+        self.url = url
+        # 指标中的端点名：CONFIG 中的键名（如 rpc_url1）或主机名，不暴露 URL 中的 API key
+        self.name = next((key for key in CONFIG if key.startswith("rpc_url") and CONFIG[key] == url),
+                         urlparse(url).netloc or url)
+        self.weight = max(float(weight), 1e-6)
+        self.ewma_alpha = ewma_alpha
+        self.client = RpcTransport.shared().client(url)  # 共用连接池
+        self.rate_limiter = RateLimiter.for_endpoint(self.client._provider.endpoint_uri)
+
+        self.latency = None  # 滚动平均延迟（秒），None 表示还没有样本
+        self.error_rate = 0.0  # 滚动平均错误率
+        self.consecutive_failures = 0
+        self.in_flight = 0
+        self.ejected_until = 0.0
+
+        # 统计信息
+        self.total_requests = 0
+        self.total_errors = 0
+
+    def is_available(self, now=None):
+        return (now or time.monotonic()) >= self.ejected_until
+
+    def score(self):
+        """ 预计等待时间，越小越优：延迟 x 排队数 / 权重，错误率越高惩罚越大 """
+        latency = self.latency if self.latency is not None else 0.0
+        return latency * (self.in_flight + 1) * (1.0 + 4.0 * self.error_rate) / self.weight
+
+    def __repr__(self):
+        latency = f"{self.latency * 1000:.0f}ms" if self.latency is not None else "-"
+        return (f"Endpoint({self.url}, weight={self.weight}, latency={latency}, "
+                f"error_rate={self.error_rate:.2f}, in_flight={self.in_flight})")
+
+
+class EndpointPool:
+    """
+    多个 RPC 端点的负载均衡池：
+    - 每次请求发往此刻预计最快的端点（滚动延迟、在途请求数、错误率、权重综合评分）
+    - 连续失败或错误率过高的端点被暂时剔除，冷却后重新加入
+    - 每个端点的调用同时经过该端点共享的 RateLimiter
+    """
+
+    _shared_instances = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, rpc_urls, weights=None, max_consecutive_failures=5, max_error_rate=0.5,
+                 eject_cooldown=30.0, min_samples=20):
+        """
+        :param rpc_urls: RPC 端点列表
+        :param weights: {url: weight}，未列出的端点权重为 1
+        :param max_consecutive_failures: 连续失败多少次后剔除
+        :param max_error_rate: 滚动错误率超过该值（且样本足够）后剔除
+        :param eject_cooldown: 剔除后多少秒重新加入
+        :param min_samples: 按错误率剔除前至少需要的请求数
+        """
+        if not rpc_urls:
+            raise ValueError("❌ 没有可用的 RPC 端点，请检查 CONFIG 配置！")
+        weights = weights or {}
+        self.endpoints = [Endpoint(url, weights.get(url, 1.0)) for url in rpc_urls]
+        self.max_consecutive_failures = max_consecutive_failures
+        self.max_error_rate = max_error_rate
+        self.eject_cooldown = eject_cooldown
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._local = threading.local()  # 每个线程最近一次失败的端点，退避时使用它的限速器
+
+    @classmethod
+    def from_config(cls, rpc_urls=None):
+        """
+        按 CONFIG 创建端点池：默认包含所有 rpc_url* 端点，权重来自 CONFIG["endpoint_weights"]
+        （键可以是端点键名如 "rpc_url1"，也可以是 URL）
+        """
+        if rpc_urls is None:
+            rpc_urls = [CONFIG[key] for key in CONFIG if key.startswith("rpc_url")]
+        weights = {}
+        for key, weight in CONFIG.get("endpoint_weights", {}).items():
+            weights[CONFIG.get(key, key)] = weight
+        return cls(rpc_urls, weights=weights, eject_cooldown=CONFIG.get("endpoint_eject_cooldown", 30.0))
+
+    @classmethod
+    def shared(cls):
+        """
+        进程内共享的端点池（包含 CONFIG 中全部 rpc_url* 端点）
+        """
+        return cls.for_url(None)
+
+    @classmethod
+    def for_url(cls, rpc_url):
+        """
+        获取组件使用的端点池：
+        - rpc_url 为 None 或属于 CONFIG 中的端点，且启用了 endpoint_pool_enabled 时，返回包含全部端点的共享池
+        - 否则返回只包含该端点的池（行为与直接使用 Client(rpc_url) 相同）
+        """
+        configured = [CONFIG[key] for key in CONFIG if key.startswith("rpc_url")]
+        if CONFIG.get("endpoint_pool_enabled", True) and (rpc_url is None or rpc_url in configured):
+            key = None
+        else:
+            key = rpc_url
+        with cls._shared_lock:
+            if key not in cls._shared_instances:
+                cls._shared_instances[key] = cls.from_config(None if key is None else [key])
+            return cls._shared_instances[key]
+
+    def client_for(self, rpc_url):
+        """ 返回指定端点的 Client（兼容直接使用 solana_client 的旧代码） """
+        for endpoint in self.endpoints:
+            if endpoint.url == rpc_url:
+                return endpoint.client
+        return self.endpoints[0].client
+
+    def select(self):
+        """
+        选出此刻最优的端点并计入在途请求；全部被剔除时选择最早恢复的端点
+        """
+        with self._lock:
+            now = time.monotonic()
+            available = [endpoint for endpoint in self.endpoints if endpoint.is_available(now)]
+            if available:
+                best_score = min(endpoint.score() for endpoint in available)
+                # 分数相同（例如都没有样本）时随机选择，避免所有线程挤到第一个端点
+                candidates = [endpoint for endpoint in available if endpoint.score() <= best_score]
+                endpoint = random.choice(candidates)
+            else:
+                endpoint = min(self.endpoints, key=lambda e: e.ejected_until)
+            endpoint.in_flight += 1
+            return endpoint
+
+    def begin(self, endpoint):
+        """ 计入一次在途请求（调用方自行选择端点时使用，与 record() 配对） """
+        with self._lock:
+            endpoint.in_flight += 1
+
+    def record(self, endpoint, latency, error=None, method="rpc"):
+        """
+        记录一次请求结果，更新滚动延迟 / 错误率，必要时剔除端点
+        :param endpoint: select() 返回（或已 begin() 计入在途）的端点
+        :param latency: 请求耗时（秒，不含限速与预算等待）
+        :param error: 异常对象，成功时为 None
+        :param method: JSON-RPC 方法名（用于指标）
+        """
+        RPC_REQUESTS.inc(method, endpoint.name, "ok" if error is None else "error")
+        RPC_LATENCY.observe(latency, method, endpoint.name)
+        with self._lock:
+            endpoint.in_flight = max(0, endpoint.in_flight - 1)
+            endpoint.total_requests += 1
+            alpha = endpoint.ewma_alpha
+            failed = 1.0 if error is not None else 0.0
+            endpoint.error_rate = (1 - alpha) * endpoint.error_rate + alpha * failed
+
+            if error is None:
+                endpoint.consecutive_failures = 0
+                endpoint.latency = latency if endpoint.latency is None else (1 - alpha) * endpoint.latency + alpha * latency
+                return
+
+            endpoint.total_errors += 1
+            endpoint.consecutive_failures += 1
+            too_many_failures = endpoint.consecutive_failures >= self.max_consecutive_failures
+            too_many_errors = (endpoint.total_requests >= self.min_samples
+                               and endpoint.error_rate >= self.max_error_rate)
+            if len(self.endpoints) > 1 and endpoint.is_available() and (too_many_failures or too_many_errors):
+                self._eject(endpoint)
+
+    def _eject(self, endpoint):
+        """ 剔除端点；冷却结束后以一半的错误率重新加入，让它有机会证明自己恢复了 """
+        endpoint.ejected_until = time.monotonic() + self.eject_cooldown
+        endpoint.consecutive_failures = 0
+        endpoint.error_rate /= 2
+        print(f"⚠️ RPC 端点 {endpoint.url} 暂时剔除 {self.eject_cooldown:.0f} 秒（{endpoint}）")
+
+    def request(self, func, tokens=1, method="rpc"):
+        """
+        在最优端点上执行一次请求
+        :param func: func(endpoint) -> 结果
+        :param tokens: 消耗的限速令牌数（批量请求按其中的调用数计）
+        :param method: JSON-RPC 方法名（用于指标）
+        """
+        endpoint = self.select()
+        start_time = time.monotonic()
+
+        def timed(endpoint):
+            nonlocal start_time
+            start_time = time.monotonic()  # 取得预算名额与限速令牌后才计时：排队等待不计入端点延迟
+            return func(endpoint)
+
+        try:
+            with rpc_slot():  # 全局并发预算（PairScheduler 启用时）
+                result = endpoint.rate_limiter.call(timed, endpoint, tokens=tokens)
+        except RPCException as e:
+            # 节点正常返回了 JSON-RPC 错误（例如 Slot 被跳过），不计入端点故障
+            self.record(endpoint, time.monotonic() - start_time, e if is_throttle_error(e) else None, method)
+            self._local.failed_endpoint = endpoint
+            raise
+        except Exception as e:
+            self.record(endpoint, time.monotonic() - start_time, e, method)
+            self._local.failed_endpoint = endpoint
+            raise
+        self.record(endpoint, time.monotonic() - start_time, method=method)
+        return result
+
+    def call(self, method, *args, **kwargs):
+        """
+        在最优端点上调用 Client 的方法，例如 pool.call("get_slot")
+        """
+        return self.request(lambda endpoint: getattr(endpoint.client, method)(*args, **kwargs),
+                            method=rpc_method_name(method))
+
+    def backoff(self, attempt, base=1.0, endpoint=None):
+        """
+        重试等待时间（指数退避 + 抖动），按失败端点的限速器计算
+        :param endpoint: 失败的端点，默认为当前线程最近一次 request() 失败的端点
+        """
+        endpoint = endpoint or getattr(self._local, "failed_endpoint", None) or self.endpoints[0]
+        return endpoint.rate_limiter.backoff(attempt, base)
+
+    def stats(self):
+        """ 各端点状态快照 """
+        with self._lock:
+            return [
+                {
+                    "url": endpoint.url,
+                    "weight": endpoint.weight,
+                    "latency_ms": None if endpoint.latency is None else round(endpoint.latency * 1000, 1),
+                    "error_rate": round(endpoint.error_rate, 3),
+                    "requests": endpoint.total_requests,
+                    "errors": endpoint.total_errors,
+                    "ejected": not endpoint.is_available(),
+                }
+                for endpoint in self.endpoints
+            ]
+
+
+# ========== 使用示例 ==========
+if __name__ == "__main__":
+    pool = EndpointPool.shared()
+    for _ in range(5):
+        print(pool.call("get_slot").value)
+    for stat in pool.stats():
+        print(stat)
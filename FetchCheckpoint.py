@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+import time
+import config
+
+CONFIG = config.CONFIG  # 直接使用 CONFIG
+
+
+class FetchCheckpoint:
+    """
+    签名分页的断点清单（JSON）：
+    - 以 (交易池, Slot 子区间) 为键，记录最近一页最旧的签名与 Slot（下一页的 before 游标）
+    - 每保存一页就原子写回文件（先写 .tmp 再 os.replace），进程中断也不会留下损坏的清单
+    - 重试或重启后从游标继续分页；已完成的子区间直接跳过
+    """
+
+    _shared_instances = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, checkpoint_file=None):
+        """
+        :param checkpoint_file: 清单文件路径（默认 RESULT/CHECKPOINT/signatures.json）
+        """
+        self.checkpoint_file = checkpoint_file or os.path.join(CONFIG["output_path"], "CHECKPOINT", "signatures.json")
+        os.makedirs(os.path.dirname(self.checkpoint_file) or ".", exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    @classmethod
+    def shared(cls, checkpoint_file=None):
+        """
+        获取进程内共享的断点清单（同一路径只加载一次）
+        """
+        checkpoint_file = checkpoint_file or os.path.join(CONFIG["output_path"], "CHECKPOINT", "signatures.json")
+        with cls._shared_lock:
+            if checkpoint_file not in cls._shared_instances:
+                cls._shared_instances[checkpoint_file] = cls(checkpoint_file)
+            return cls._shared_instances[checkpoint_file]
+
+    @staticmethod
+    def key(market_address, start_slot, end_slot):
+        return f"{market_address}:{start_slot}-{end_slot}"
+
+    def _load(self):
+        """ 读取清单；文件不存在或损坏时从空清单开始 """
+        if not os.path.exists(self.checkpoint_file):
+            return {}
+        try:
+            with open(self.checkpoint_file, mode="r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 断点清单 {self.checkpoint_file} 无法读取（{e}），从头开始分页")
+            return {}
+
+    def _save(self):
+        """ 原子写回清单（调用方持有锁） """
+        tmp_file = self.checkpoint_file + ".tmp"
+        with open(tmp_file, mode="w", encoding="utf-8") as file:
+            json.dump(self._entries, file, indent=1, sort_keys=True)
+        os.replace(tmp_file, self.checkpoint_file)
+
+    def get(self, key):
+        """
+        :return: {"signature", "slot", "pages", "done", "updated"}，没有断点时返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return dict(entry) if entry is not None else None
+
+    def update(self, key, signature, slot, retry=None):
+        """
+        保存一页之后记录新的游标
+        :param signature: 本页最旧的签名（下一页的 before），只知道 Slot 时为 None
+        :param slot: 该签名所在的 Slot
+        :param retry: 可选的待重试签名 {signature: 已失败次数}（跟踪模式使用），None 表示不修改
+        """
+        with self._lock:
+            entry = self._entries.setdefault(key, {"pages": 0, "done": False})
+            entry.update(signature=None if signature is None else str(signature), slot=slot,
+                         pages=entry["pages"] + 1, updated=int(time.time()))
+            if retry:
+                entry["retry"] = dict(retry)
+            elif retry is not None:
+                entry.pop("retry", None)
+            self._save()
+
+    def mark_done(self, key):
+        """ 子区间分页完成，之后的重试 / 重启直接跳过 """
+        with self._lock:
+            entry = self._entries.setdefault(key, {"signature": None, "slot": None, "pages": 0})
+            entry.update(done=True, updated=int(time.time()))
+            self._save()
+
+    def clear(self, key=None):
+        """ 删除一个子区间的断点（key 为 None 时清空整个清单），用于强制重新抓取 """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+            self._save()
+
+
+# ========== 使用示例 ==========
+if __name__ == "__main__":
+    checkpoint = FetchCheckpoint.shared()
+    for key, entry in sorted(checkpoint._entries.items()):
+        state = "✅ 完成" if entry.get("done") else f"⏸️ 游标 Slot {entry.get('slot')}"
+        print(f"{key}: {state}（{entry.get('pages', 0)} 页）")
@@ -0,0 +1,179 @@
+import math
+import time
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+import config
+
+CONFIG = config.CONFIG  # 直接使用 CONFIG
+
+SIGNATURE_PAGE_LIMIT = 1000  # getSignaturesForAddress 每页最多条数
+SIGNATURE_ENTRY_BYTES = 250  # 签名列表中每条记录的大约字节数
+BLOCK_SIGNATURE_BYTES = 90  # getBlock（transactionDetails="signatures"）中每个签名的大约字节数
+MAX_CURSOR_PROBE = 16  # 子区间结束 Slot 被跳过时，向前最多探测的 Slot 数
+
+
+class IngestPlanner:
+    """
+    基于代价的抓取计划：把 Slot 范围切分为子区间，对每个子区间采样各交易池的交易密度，
+    估算两种方式的 RPC 调用数与传输字节数，选择更便宜的一种：
+    - "signatures"：逐个交易池 getSignaturesForAddress 分页 + 逐笔 getTransaction，代价与交易数成正比
+    - "blocks"：逐个 Slot getBlock（BlockScanner），代价与 Slot 数成正比，一遍覆盖所有交易池
+    采样代价：每个子区间 1 次 getBlock（只取签名）+ 每个交易池 1 页 getSignaturesForAddress。
+    """
+
+    def __init__(self, log_decoder, subrange_slots=None, tx_bytes=None, bytes_per_call=None):
+        """
+        :param log_decoder: LogDecoder 实例（提供 RPC 端点池）
+        :param subrange_slots: 子区间大小（Slot 数，默认读取 CONFIG["planner_subrange_slots"]）
+        :param tx_bytes: 单笔交易 JSON 的大约字节数（默认读取 CONFIG["planner_tx_bytes"]）
+        :param bytes_per_call: 多少字节的传输代价相当于一次 RPC 调用（默认读取 CONFIG["planner_bytes_per_call"]）
+        """
+        self.log_decoder = log_decoder
+        self.endpoint_pool = log_decoder.endpoint_pool
+        self.subrange_slots = subrange_slots or CONFIG.get("planner_subrange_slots", 9000)
+        self.tx_bytes = tx_bytes or CONFIG.get("planner_tx_bytes", 4000)
+        self.bytes_per_call = bytes_per_call or CONFIG.get("planner_bytes_per_call", 100000)
+
+    def split(self, slot_partitions):
+        """ 把每个 Slot 区间切分为不超过 subrange_slots 的子区间 """
+        subranges = []
+        for start_slot, end_slot in slot_partitions:
+            for sub_start in range(start_slot, end_slot + 1, self.subrange_slots):
+                subranges.append((sub_start, min(end_slot, sub_start + self.subrange_slots - 1)))
+        return subranges
+
+    def sample_block(self, end_slot, start_slot):
+        """
+        获取子区间末尾的区块签名列表（作为分页游标，同时估算每个区块的交易数）
+        :return: (slot, [signature, ...])；区间内找不到区块时返回 (None, [])
+        """
+        for slot in range(end_slot, max(start_slot, end_slot - MAX_CURSOR_PROBE) - 1, -1):
+            payload = {
+                "jsonrpc": "2.0", "id": 0, "method": "getBlock",
+                "params": [slot, {"encoding": "json", "maxSupportedTransactionVersion": 0,
+                                  "transactionDetails": "signatures", "rewards": False}],
+            }
+            reply = self.log_decoder.rpc_request(payload)
+            result = reply.get("result")
+            if result is not None:
+                return slot, result.get("signatures") or []
+        return None, []
+
+    def sample_pool(self, pool_id, cursor, start_slot, end_slot):
+        """
+        从游标处取一页签名，估算交易池在子区间内的签名数与成功交易数
+        :return: {"signatures": 估算签名数, "transactions": 估算成功交易数, "exact": 是否已覆盖整个子区间}
+        """
+        response = self.endpoint_pool.call(
+            "get_signatures_for_address",
+            Pubkey.from_string(pool_id),
+            before=Signature.from_string(cursor),
+            limit=SIGNATURE_PAGE_LIMIT,
+        )
+        page = response.value or []
+        in_range = [txn for txn in page if start_slot <= txn.slot <= end_slot]
+        succeeded = sum(1 for txn in in_range if txn.err is None)
+
+        # 一页就越过了起始 Slot：计数是精确的
+        if len(page) < SIGNATURE_PAGE_LIMIT or page[-1].slot < start_slot:
+            return {"signatures": len(in_range), "transactions": succeeded, "exact": True}
+
+        # 否则按这一页的密度（每个 Slot 的签名数）与成功率外推到整个子区间
+        span = max(1, page[0].slot - page[-1].slot + 1)
+        signatures = len(page) / span * (end_slot - start_slot + 1)
+        success_rate = sum(1 for txn in page if txn.err is None) / len(page)
+        return {"signatures": signatures, "transactions": signatures * success_rate, "exact": False}
+
+    def cost(self, calls, transferred_bytes):
+        """ 综合代价：调用数 + 字节数折算的调用数 """
+        return calls + transferred_bytes / self.bytes_per_call
+
+    def plan(self, pools, slot_partitions):
+        """
+        生成抓取计划
+        :param pools: {pool_id: 交易对名称}（所有需要抓取的交易池）
+        :param slot_partitions: [(start_slot, end_slot), ...]
+        :return: [{"start_slot", "end_slot", "mode", "signature_cost", "block_cost", "pools": {...}}, ...]
+        """
+        start_time = time.time()
+        plan = []
+        for start_slot, end_slot in self.split(slot_partitions):
+            slots = end_slot - start_slot + 1
+            try:
+                cursor_slot, block_signatures = self.sample_block(end_slot, start_slot)
+                samples = {
+                    pool_id: self.sample_pool(pool_id, block_signatures[0], start_slot, end_slot)
+                    for pool_id in pools
+                } if block_signatures else None
+            except Exception as e:
+                print(f"⚠️ 子区间 {start_slot} ~ {end_slot} 采样失败: {e}")
+                samples = None
+            if samples is None:
+                # 无法采样时保持原有的逐笔方式
+                plan.append({"start_slot": start_slot, "end_slot": end_slot, "mode": "signatures",
+                             "signature_cost": None, "block_cost": None, "pools": {}})
+                continue
+
+            # 逐笔抓取：边界游标只需 1 次只取签名的 getBlock（TransactionFetcher 按 Slot 缓存，所有交易池共用），
+            # 每个交易池再加签名分页 + 逐笔 getTransaction
+            pool_estimates = {}
+            signature_calls, signature_bytes = 1.0, len(block_signatures) * BLOCK_SIGNATURE_BYTES
+            for pool_id, pair in pools.items():
+                estimate = samples[pool_id]
+                pages = max(1, math.ceil(estimate["signatures"] / SIGNATURE_PAGE_LIMIT))
+                estimate["pair"] = pair
+                estimate["calls"] = pages + estimate["transactions"]
+                estimate["bytes"] = (estimate["signatures"] * SIGNATURE_ENTRY_BYTES
+                                     + estimate["transactions"] * self.tx_bytes)
+                signature_calls += estimate["calls"]
+                signature_bytes += estimate["bytes"]
+                pool_estimates[pool_id] = estimate
+
+            # getBlock 返回区块内全部交易，按采样区块的交易数估算字节数
+            block_calls = slots
+            block_bytes = slots * len(block_signatures) * self.tx_bytes
+
+            signature_cost = self.cost(signature_calls, signature_bytes)
+            block_cost = self.cost(block_calls, block_bytes)
+            plan.append({
+                "start_slot": start_slot,
+                "end_slot": end_slot,
+                "mode": "blocks" if block_cost < signature_cost else "signatures",
+                "signature_cost": signature_cost,
+                "block_cost": block_cost,
+                "signature_calls": signature_calls,
+                "signature_bytes": signature_bytes,
+                "block_calls": block_calls,
+                "block_bytes": block_bytes,
+                "block_transactions": len(block_signatures),
+                "pools": pool_estimates,
+            })
+
+        self.log_plan(plan, time.time() - start_time)
+        return plan
+
+    @staticmethod
+    def log_plan(plan, elapsed_time):
+        """ 输出计划及每个子区间的估算依据 """
+        print(f"\n📋 抓取计划（采样耗时 {elapsed_time:.2f} 秒）：")
+        for entry in plan:
+            header = f"  Slot {entry['start_slot']} ~ {entry['end_slot']} -> {entry['mode']}"
+            if entry["signature_cost"] is None:
+                print(f"{header}（无法采样，保持逐笔方式）")
+                continue
+            print(f"{header}\n"
+                  f"    逐笔: {entry['signature_calls']:.0f} 次调用, {entry['signature_bytes'] / 1024 ** 2:.1f} MB"
+                  f" -> 代价 {entry['signature_cost']:.0f}\n"
+                  f"    区块: {entry['block_calls']} 次调用, {entry['block_bytes'] / 1024 ** 2:.1f} MB"
+                  f"（采样区块 {entry['block_transactions']} 笔交易） -> 代价 {entry['block_cost']:.0f}")
+            for pool_id, estimate in entry["pools"].items():
+                exact = "精确" if estimate["exact"] else "外推"
+                print(f"    {estimate['pair']:<16} {pool_id}: ~{estimate['transactions']:.0f} 笔交易（{exact}）")
+
+
+# ========== 使用示例 ==========
+if __name__ == "__main__":
+    from LogDecoder import LogDecoder
+
+    planner = IngestPlanner(LogDecoder(CONFIG["rpc_url1"], log_enabled=False))
+    planner.plan({"3ucNos4NbumPLZNWztqGHNFFgkHeRMBQAVemeeomsUxv": "WSOL_USDC"}, [(323247000, 323247500)])
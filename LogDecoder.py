@@ -1,14 +1,54 @@
 import csv
 import json
 import os
-from solana.rpc.api import Client
 from solders.signature import Signature
 import config
 import time
 import threading
+from SlotIndex import SlotIndex
+from TransactionCache import TransactionCache
+from RateLimiter import is_throttle_error
+from EndpointPool import EndpointPool
+from Metrics import Metrics, LOCK_WAIT_BUCKETS
+from Tracer import Tracer
 
 CONFIG = config.CONFIG  # 直接使用 CONFIG
 
+DECODE_RETRIES = Metrics.shared().counter("decode_retries_total", "getTransaction 重试次数", ("method",))
+DECODE_RETRY_SLEEP = Metrics.shared().counter("decode_retry_sleep_seconds_total", "getTransaction 重试前的等待时间（秒）",
+                                              ("method",))
+LOCK_WAIT = Metrics.shared().histogram("lock_wait_seconds", "等待共享锁的时间（秒）", ("lock",), LOCK_WAIT_BUCKETS)
+DATA_ROWS = Metrics.shared().counter("data_rows_written_total", "写入 DATA 文件的行数", ("file",))
+TRACER = Tracer.shared()
+
+try:
+    import orjson  # 可选：更快的 JSON 解析，用于批量请求的原始响应
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+GET_TRANSACTION_CONFIG = {"encoding": "json", "maxSupportedTransactionVersion": 0}
+
+# 值得重试的 JSON-RPC 错误码：区块暂不可用 / 节点不健康 / 状态尚未就绪 / 未达到 minContextSlot / 内部错误
+RETRYABLE_RPC_ERRORS = {-32004, -32005, -32014, -32016, -32603}
+
+# 常见稳定币地址映射（Solana 主网）
+COINS = {
+    "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v": "USDC",
+    "Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB": "USDT",
+    "So11111111111111111111111111111111111111112": "WSOL"
+}
+
+
+def is_retryable_rpc_error(error):
+    """
+    JSON-RPC error 对象是否值得重试：限流或节点暂时不可用；
+    参数错误、方法不存在、交易版本不支持等永久错误重试也不会成功
+    """
+    if not isinstance(error, dict):
+        return True
+    return error.get("code") in RETRYABLE_RPC_ERRORS or is_throttle_error(Exception(str(error)))
+
 
 class LogDecoder:
     _global_lock = threading.Lock()  # 共享锁
@@ -16,19 +56,21 @@ class LogDecoder:
     def __init__(self, rpc_url, log_enabled=True):
         """
         初始化 Solana RPC 连接
-        :param rpc_url: Solana RPC 端点
+        :param rpc_url: Solana RPC 端点（属于 CONFIG 中的端点时，请求会在全部端点间按延迟负载均衡）
         :param log_enabled: 是否启用日志（默认 False）
         """
-        self.solana_client = Client(rpc_url)
+        self.endpoint_pool = EndpointPool.for_url(rpc_url)
+        self.solana_client = self.endpoint_pool.client_for(rpc_url)
         self.log_enabled = log_enabled  # 控制日志输出
+        # 设置 DataWriter 后解码结果交给后台写入线程，解码线程不再读写文件
+        self.data_writer = None
+        # 顺带把交易的 (slot, blockTime) 写入 Slot 索引
+        self.slot_index = SlotIndex.shared() if CONFIG.get("slot_index_enabled", True) else None
+        # 可选的原始交易缓存：命中时无需再调用 getTransaction
+        self.tx_cache = TransactionCache.shared() if CONFIG.get("tx_cache_enabled", False) else None
 
         # 常见稳定币地址映射（Solana 主网）
-        self.coins = {
-            "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v": "USDC",
-            "Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB": "USDT",
-            "So11111111111111111111111111111111111111112": "WSOL"
-
-        }
+        self.coins = dict(COINS)
         print(f"LogDecoder initialized with RPC: {rpc_url}")
 
     def log(self, message):
@@ -42,12 +84,14 @@ class LogDecoder:
         带重试机制的 Solana 交易查询
         :param tx_signature: 交易签名
         :param max_retries: 最大重试次数
-        :param wait_time: 每次重试的等待时间（秒）
+        :param wait_time: 重试的基础等待时间（秒），实际按指数退避 + 抖动计算
         :return: 交易详情（dict） 或 None（查询失败）
         """
         for attempt in range(1, max_retries + 1):
             try:
-                tx_details = self.solana_client.get_transaction(tx_signature, max_supported_transaction_version=0)
+                tx_details = self.endpoint_pool.call(
+                    "get_transaction", tx_signature, max_supported_transaction_version=0
+                )
 
                 # 如果交易未找到
                 if tx_details.value is None:
@@ -62,51 +106,149 @@ class LogDecoder:
                 self.log(f"❌ Error fetching transaction (attempt {attempt}/{max_retries}): {e}")
 
                 if attempt < max_retries:
-                    self.log(f"⏳ Retrying in {wait_time} seconds...")
-                    time.sleep(wait_time)
+                    delay = self.endpoint_pool.backoff(attempt, wait_time)
+                    self.log(f"⏳ Retrying in {delay:.2f} seconds...")
+                    DECODE_RETRIES.inc("getTransaction")
+                    DECODE_RETRY_SLEEP.inc("getTransaction", value=delay)
+                    time.sleep(delay)
                 else:
                     self.log(f"🚨 All {max_retries} attempts failed. Skipping transaction {tx_signature}.")
                     return None  # 所有重试都失败，返回 None
 
+    def rpc_request(self, payload, tokens=1, raw=False):
+        """
+        通过端点池发送原始 JSON-RPC 请求（单个或批量），响应字节直接用快速 JSON 解析器解析，
+        不经过 solana-py 的 solders 反序列化
+        :param payload: 请求体（dict 或 list）
+        :param tokens: 消耗的限速令牌数（批量请求按其中的调用数计）
+        :param raw: True 时不解析，直接返回响应字节（交给解码子进程解析）
+        :return: 解析后的响应（dict 或 list），raw 为 True 时为 bytes
+        """
+        def post(endpoint):
+            provider = endpoint.client._provider
+            headers = {"Content-Type": "application/json", **(provider.extra_headers or {})}
+            response = provider.session.post(provider.endpoint_uri, content=json.dumps(payload), headers=headers)
+            response.raise_for_status()
+            if raw and b'"error"' not in response.content:
+                return response.content  # 没有错误条目时无需解析，节省 I/O 线程的 CPU
+            replies = _json_loads(response.content)
+            if any("error" in reply and is_throttle_error(Exception(str(reply["error"])))
+                   for reply in (replies if isinstance(replies, list) else [replies]) if isinstance(reply, dict)):
+                endpoint.rate_limiter.on_throttle()
+            return response.content if raw else replies
+
+        if isinstance(payload, list):
+            method = f"{payload[0]['method']}:batch" if payload else "batch"
+        else:
+            method = payload["method"]
+        return self.endpoint_pool.request(post, tokens=tokens, method=method)
+
+    def get_transaction_json_with_retries(self, transaction_signature, max_retries=100, wait_time=1):
+        """
+        带重试机制的交易查询（快速路径），返回 getTransaction 的 result JSON
+        :param transaction_signature: 交易签名字符串
+        :param max_retries: 最大重试次数
+        :param wait_time: 重试的基础等待时间（秒），实际按指数退避 + 抖动计算
+        :return: 交易 JSON（dict） 或 None（查询失败 / 未找到）
+        """
+        payload = {"jsonrpc": "2.0", "id": 0, "method": "getTransaction",
+                   "params": [transaction_signature, GET_TRANSACTION_CONFIG]}
+        for attempt in range(1, max_retries + 1):
+            try:
+                reply = self.rpc_request(payload)
+                if "error" in reply:
+                    if not is_retryable_rpc_error(reply["error"]):
+                        self.log(f"🚨 RPC error {reply['error']}, skipping transaction {transaction_signature}.")
+                        return None
+                    raise ValueError(f"RPC error: {reply['error']}")
+
+                tx_details = reply.get("result")
+                if tx_details is None:
+                    self.log("⚠️ Transaction not found or is not confirmed yet.")
+                    return None
+
+                self.log(f"✅ Transaction {transaction_signature} fetched successfully on attempt {attempt}")
+                return tx_details
+
+            except Exception as e:
+                self.log(f"❌ Error fetching transaction (attempt {attempt}/{max_retries}): {e}")
+
+                if attempt < max_retries:
+                    delay = self.endpoint_pool.backoff(attempt, wait_time)
+                    self.log(f"⏳ Retrying in {delay:.2f} seconds...")
+                    DECODE_RETRIES.inc("getTransaction")
+                    DECODE_RETRY_SLEEP.inc("getTransaction", value=delay)
+                    time.sleep(delay)
+                else:
+                    self.log(f"🚨 All {max_retries} attempts failed. Skipping transaction {transaction_signature}.")
+                    return None
+
     def decode_transaction(self, transaction_signature, market_address):
         """
         解析指定交易的日志，并计算目标账户的代币余额变化，同时返回交易的 blockTime。
         """
         #self.log(f"🔍 Decoding transaction: {transaction_signature}")
 
-        # 转换交易签名
-        tx_signature = Signature.from_string(transaction_signature)
+        # 优先读取本地缓存
+        if self.tx_cache is not None:
+            cached = self.tx_cache.get(transaction_signature)
+            if cached is not None:
+                if self.slot_index is not None:
+                    self.slot_index.record(cached.get("slot"), cached.get("blockTime"))
+                return self.parse_transaction_json(cached, market_address)
 
-        # **使用带重试机制的 get_transaction**
-        tx_details = self.get_transaction_with_retries(tx_signature)
+        # **使用带重试机制的 getTransaction，直接解析原始响应字节**
+        tx_details = self.get_transaction_json_with_retries(transaction_signature)
 
         if tx_details is None:
             print("\nerror! get_transaction_with_retries failed.")
             self.log(f"⚠️ Skipping transaction {transaction_signature} due to repeated failures.")
-            return {"blockTime": None, "balanceChanges": []}  # 返回空结果
+            return {"blockTime": None, "balanceChanges": [], "failed": True}  # 返回空结果，failed 标记获取失败
+
+        if self.slot_index is not None:
+            self.slot_index.record(tx_details.get("slot"), tx_details.get("blockTime"))
 
-        # 解析 JSON 数据
-        tx_details = json.loads(tx_details.value.to_json())
+        if self.tx_cache is not None:
+            self.tx_cache.put(transaction_signature, tx_details)
 
+        return self.parse_transaction_json(tx_details, market_address)
+
+    def parse_transaction_json(self, tx_details, market_address):
+        """
+        从交易 JSON（getTransaction 的 result）中提取 blockTime 及目标账户的代币余额变化
+        :param tx_details: 交易 JSON（dict）
+        :param market_address: 市场地址
+        :return: {"blockTime": ..., "balanceChanges": [...]}
+        """
         # 提取 meta 数据
-        meta = tx_details.get("meta", {})
+        meta = tx_details.get("meta") or {}
 
         # 获取交易的 blockTime
         block_time = tx_details.get("blockTime", None)
 
         # 获取交易前后的代币余额
+        def ui_amount(b):
+            amount = b["uiTokenAmount"].get("uiAmount")
+            return float(b["uiTokenAmount"]["uiAmountString"] if amount is None else amount)
+
         pre_balances = {
-            b["mint"]: float(b["uiTokenAmount"]["uiAmount"])
-            for b in meta.get("preTokenBalances", [])
+            b["mint"]: ui_amount(b)
+            for b in meta.get("preTokenBalances") or []
             if b.get("owner") == market_address
         }
         post_balances = {
-            b["mint"]: float(b["uiTokenAmount"]["uiAmount"])
-            for b in meta.get("postTokenBalances", [])
+            b["mint"]: ui_amount(b)
+            for b in meta.get("postTokenBalances") or []
             if b.get("owner") == market_address
         }
 
-        # 计算余额变化
+        return self.build_transaction_data(block_time, pre_balances, post_balances)
+
+    def build_transaction_data(self, block_time, pre_balances, post_balances):
+        """
+        根据目标账户交易前后的余额（{mint: amount}）计算余额变化
+        :return: {"blockTime": ..., "balanceChanges": [...]}
+        """
         balance_changes = []
         for mint in pre_balances.keys() | post_balances.keys():
             pre_amount = pre_balances.get(mint, 0)
@@ -125,13 +267,124 @@ class LogDecoder:
             "balanceChanges": balance_changes
         }
 
+    def get_transactions_batch(self, transaction_signatures, max_retries=3, wait_time=1):
+        """
+        通过一次 JSON-RPC 批量请求（batch POST）获取多笔交易
+        :param transaction_signatures: 交易签名字符串列表
+        :param max_retries: 整个批次请求失败时的最大重试次数
+        :param wait_time: 每次重试的等待时间（秒）
+        :return: (results, failed)
+                 results = {signature: 交易 JSON（dict），交易不存在时为 None}
+                 failed = 需要单独重试的签名列表
+        """
+        if not transaction_signatures:
+            return {}, []
+
+        body = [
+            {
+                "jsonrpc": "2.0",
+                "id": idx,
+                "method": "getTransaction",
+                "params": [sig, GET_TRANSACTION_CONFIG],
+            }
+            for idx, sig in enumerate(transaction_signatures)
+        ]
+
+        for attempt in range(1, max_retries + 1):
+            try:
+                # 批量请求按其中的调用数消耗令牌
+                replies = self.rpc_request(body, tokens=len(body))
+                if not isinstance(replies, list):
+                    # 节点拒绝了整个批次（例如批量过大），返回的是单个错误对象
+                    raise ValueError(f"Unexpected batch response: {str(replies)[:200]}")
+                break
+            except Exception as e:
+                self.log(f"❌ Error fetching batch of {len(body)} (attempt {attempt}/{max_retries}): {e}")
+                if attempt < max_retries:
+                    delay = self.endpoint_pool.backoff(attempt, wait_time)
+                    DECODE_RETRIES.inc("getTransaction:batch")
+                    DECODE_RETRY_SLEEP.inc("getTransaction:batch", value=delay)
+                    time.sleep(delay)
+                else:
+                    self.log("🚨 Batch request failed, falling back to single requests.")
+                    return {}, list(transaction_signatures)
+
+        results, failed = {}, []
+        replied_ids = set()
+        for reply in replies:
+            idx = reply.get("id")
+            if not isinstance(idx, int) or not 0 <= idx < len(transaction_signatures):
+                continue
+            replied_ids.add(idx)
+            sig = transaction_signatures[idx]
+            if "error" in reply:
+                failed.append(sig)
+            else:
+                results[sig] = reply.get("result")
+
+        # 响应中缺失的条目同样单独重试
+        failed.extend(sig for idx, sig in enumerate(transaction_signatures) if idx not in replied_ids)
+        return results, failed
+
+    def decode_transactions_batch(self, items):
+        """
+        批量解析交易：一次批量请求获取全部交易，失败的条目再逐笔重试
+        :param items: [(transaction_signature, market_address), ...]
+        :return: [(transaction_signature, market_address, transaction_data), ...]
+        """
+        # 缓存命中的交易不再请求
+        cached = {}
+        if self.tx_cache is not None:
+            for transaction_signature, _ in items:
+                tx_details = self.tx_cache.get(transaction_signature)
+                if tx_details is not None:
+                    cached[transaction_signature] = tx_details
+
+        results, failed = self.get_transactions_batch([sig for sig, _ in items if sig not in cached])
+        failed = set(failed)
+        if self.tx_cache is not None:
+            for transaction_signature, tx_details in results.items():
+                self.tx_cache.put(transaction_signature, tx_details)
+        results.update(cached)
+
+        decoded = []
+        for transaction_signature, market_address in items:
+            if transaction_signature in failed:
+                transaction_data = self.decode_transaction(transaction_signature, market_address)
+            else:
+                tx_details = results.get(transaction_signature)
+                if tx_details is None:
+                    self.log("⚠️ Transaction not found or is not confirmed yet.")
+                    transaction_data = {"blockTime": None, "balanceChanges": []}
+                else:
+                    if self.slot_index is not None:
+                        self.slot_index.record(tx_details.get("slot"), tx_details.get("blockTime"))
+                    transaction_data = self.parse_transaction_json(tx_details, market_address)
+            decoded.append((transaction_signature, market_address, transaction_data))
+        return decoded
+
     def decode(self, transaction_signature, market_address):
         """
         解析交易日志，并直接记录两个代币的 Change 和 Symbol
+        :return: 是否成功获取交易（获取失败时为 False，由调用方决定是否稍后重试）
         """
         # 获取交易数据
         transaction_data = self.decode_transaction(transaction_signature, market_address)
+        self.save_decoded(transaction_signature, transaction_data)
+        return not transaction_data.get("failed")
 
+    def decode_batch(self, items):
+        """
+        批量解析交易日志（JSON-RPC batch），并记录两个代币的 Change 和 Symbol
+        :param items: [(transaction_signature, market_address), ...]
+        """
+        for transaction_signature, _, transaction_data in self.decode_transactions_batch(items):
+            self.save_decoded(transaction_signature, transaction_data)
+
+    def save_decoded(self, transaction_signature, transaction_data):
+        """
+        将解析结果写入 CSV（仅当恰好两个代币发生变动时）
+        """
         # 提取 blockTime 和 balanceChanges
         block_time = transaction_data.get("blockTime")
         balance_changes = transaction_data.get("balanceChanges")
@@ -151,10 +404,19 @@ class LogDecoder:
                 self.log(
                     f"- 代币: {change['Token']}, 交易前: {change['Pre Balance']}, 交易后: {change['Post Balance']}, 变动: {change['Change']}")
 
+            if self.data_writer is not None:
+                self.data_writer.submit(
+                    token1["Token"], token2["Token"], transaction_signature,
+                    abs(token1["Change"]), abs(token2["Change"]), block_time
+                )
+                return
+
             # 存储数据到 CSV
             # 存储数据到 CSV，使用线程锁保护
             try:
-                with LogDecoder._global_lock:
+                wait_start = time.perf_counter()
+                with LogDecoder._global_lock, TRACER.span("write_csv", category="io", sample=True):
+                    LOCK_WAIT.observe(time.perf_counter() - wait_start, "LogDecoder._global_lock")
                     self.save_to_csv(
                         token1["Token"], token2["Token"], transaction_signature,
                         abs(token1["Change"]), abs(token2["Change"]), block_time
@@ -196,6 +458,7 @@ class LogDecoder:
 
             writer.writerow(
                 [transaction_signature, token1_symbol, token1_change, token2_symbol, token2_change, block_time])
+        DATA_ROWS.inc(file_name)
 
         self.log(f"✅ 交易数据已存入 {output_file}，BlockTime: {block_time}")
 
@@ -205,7 +468,7 @@ class LogDecoder:
         """
         try:
             tx_signature = Signature.from_string(transaction_signature)
-            tx_details = self.solana_client.get_transaction(tx_signature, max_supported_transaction_version=0)
+            tx_details = self.endpoint_pool.call("get_transaction", tx_signature, max_supported_transaction_version=0)
             if tx_details.value is None:
                 self.log(f"⚠️ 交易 {transaction_signature} 未找到 BlockTime。")
                 return "N/A"
@@ -0,0 +1,284 @@
+import asyncio
+import collections
+import concurrent.futures
+import json
+import os
+import threading
+import time
+import websockets
+from solders.pubkey import Pubkey
+import config
+from PoolFollower import PoolFollower
+from TransactionFetcher import TransactionFetcher
+
+CONFIG = config.CONFIG  # 直接使用 CONFIG
+
+MAX_SLOT = 2 ** 63 - 1  # 补缺口时的结束 Slot（不设上限）
+SEEN_SIGNATURES = 100000  # 推送与补缺口之间去重时保留的最近签名数
+
+
+class LogSubscriber:
+    """
+    推送式抓取：通过 websocket logsSubscribe（mentions 过滤）订阅每个交易池，
+    收到通知后立即把签名交给 LogDecoder 解码，安静的交易池不再消耗轮询调用，活跃交易池也没有轮询间隔的延迟。
+    - 每次（重新）连接并订阅成功后，用 TransactionFetcher 的签名分页补齐高水位之后、断线期间的交易
+    - 高水位与跟踪模式（PoolFollower）共用 RESULT/CHECKPOINT/watermarks.json，DATA 写盘后才推进
+    - 连续多次无法连接时退回轮询（PoolFollower.poll_once），直到 websocket 恢复
+    """
+
+    def __init__(self, solana_fetcher, pools, ws_url=None, commitment=None, decode_workers=None,
+                 checkpoint_interval=None, fallback_after=None):
+        """
+        :param solana_fetcher: SolanaFetcher 实例（提供 TransactionFetcher、LogDecoder 与 DataWriter）
+        :param pools: {pool_id: SIGNATURE 文件名}
+        :param ws_url: websocket 端点（默认读取 CONFIG["ws_url"]，未配置时由 rpc_url1 把 http 换成 ws）
+        :param commitment: 订阅的确认级别（默认读取 CONFIG["ws_commitment"]，需与 getTransaction 一致）
+        :param decode_workers: 解码线程数（默认读取 CONFIG["ws_decode_workers"]）
+        :param checkpoint_interval: 多少秒推进一次高水位（默认读取 CONFIG["ws_checkpoint_interval"]）
+        :param fallback_after: 连续多少次连接失败后退回轮询（默认读取 CONFIG["ws_fallback_after"]）
+        """
+        self.solana_fetcher = solana_fetcher
+        self.tx_fetcher = solana_fetcher.TX_SIG_fetcher
+        self.log_decoders = solana_fetcher.log_decoders
+        self.data_writer = solana_fetcher.data_writer
+        self.pools = pools
+        self.ws_url = ws_url or CONFIG.get("ws_url") or CONFIG["rpc_url1"].replace("https://", "wss://").replace(
+            "http://", "ws://")
+        self.commitment = commitment or CONFIG.get("ws_commitment", "finalized")
+        self.decode_workers = decode_workers or CONFIG.get("ws_decode_workers", 50)
+        self.checkpoint_interval = checkpoint_interval or CONFIG.get("ws_checkpoint_interval", 5)
+        self.fallback_after = fallback_after or CONFIG.get("ws_fallback_after", 3)
+
+        self.follower = PoolFollower(solana_fetcher, pools)  # 共用高水位清单；也用于轮询兜底
+        self.watermarks = self.follower.watermarks
+        self.signature_folder = self.follower.signature_folder
+
+        self._lock = threading.Lock()
+        self._pending = {pool_id: {} for pool_id in pools}  # pool_id -> {signature: slot}，已提交但未解码完成
+        self._latest = {}  # pool_id -> (signature, slot)，最近一条推送
+        self._filling = set()  # 正在补缺口的交易池（期间不推进高水位）
+        self._seen = set()
+        self._seen_order = collections.deque()
+
+        # 统计信息
+        self.notifications = 0
+        self.gap_filled = 0
+        self.transactions_decoded = 0
+        self.reconnects = 0
+
+    def _mark_seen(self, signature):
+        """ 推送与补缺口可能给出同一签名，只解码一次 """
+        with self._lock:
+            if signature in self._seen:
+                return False
+            self._seen.add(signature)
+            self._seen_order.append(signature)
+            if len(self._seen_order) > SEEN_SIGNATURES:
+                self._seen.discard(self._seen_order.popleft())
+            return True
+
+    def submit(self, executor, signature, pool_id, slot):
+        """
+        把签名交给解码线程（LogDecoder.decode），完成后从 pending 中移除
+        """
+        if not self._mark_seen(signature):
+            return
+        with self._lock:
+            self._pending[pool_id][signature] = slot
+        log_decoder = self.log_decoders[hash(signature) % len(self.log_decoders)]
+        future = executor.submit(log_decoder.decode, signature, pool_id)
+        future.add_done_callback(lambda f: self._on_decoded(f, signature, pool_id))
+
+    def _on_decoded(self, future, signature, pool_id):
+        with self._lock:
+            self._pending[pool_id].pop(signature, None)
+            if future.exception() is None:
+                self.transactions_decoded += 1
+        if future.exception() is not None:
+            print(f"❌ 交易 {signature} 解码失败: {future.exception()}")
+
+    def fill_gap(self, executor, pool_id, max_retries=5):
+        """
+        补缺口：从最新签名向前分页到高水位 Slot（TransactionFetcher.fetch_transactions_by_signature），
+        期间到达的推送与这里给出的签名由 _mark_seen 去重
+        """
+        mark_signature, mark_slot = self.follower.watermark(pool_id)
+        # 高水位只有 Slot 时该 Slot 已全部处理；有签名时同一 Slot 中可能还有断线时错过的交易
+        start_slot = mark_slot if mark_signature else mark_slot + 1
+        output_file = os.path.join(self.signature_folder, self.pools[pool_id])
+
+        def on_page(entries):
+            for signature, market_address in entries:
+                # 签名分页的回调不带 Slot，按缺口起点计，补完之前高水位不会越过缺口
+                self.submit(executor, signature, market_address, start_slot)
+            with self._lock:
+                self.gap_filled += len(entries)
+
+        for attempt in range(1, max_retries + 1):
+            try:
+                self.tx_fetcher.fetch_transactions_by_signature(Pubkey.from_string(pool_id), None, 1000, pool_id,
+                                                                on_page, start_slot, MAX_SLOT, output_file)
+                break
+            except Exception as e:
+                print(f"⚠️ 交易池 {pool_id} 补缺口失败 (attempt {attempt}/{max_retries}): {e}")
+                if attempt == max_retries:
+                    # 保持 _filling：高水位停在缺口之前，重启后重新补
+                    return
+                time.sleep(self.tx_fetcher.endpoint_pool.backoff(attempt))
+        with self._lock:
+            self._filling.discard(pool_id)
+
+    def checkpoint(self):
+        """
+        DATA 写盘后推进高水位：
+        - 交易池没有未完成的解码时，高水位为最近一条推送
+        - 否则停在最旧的未完成签名之前的 Slot（重启后该 Slot 会重新获取，DataWriter 按签名去重）
+        """
+        self.data_writer.flush()
+        with self._lock:
+            marks = {}
+            for pool_id in self.pools:
+                if pool_id in self._filling:
+                    continue
+                pending = self._pending[pool_id]
+                if pending:
+                    marks[pool_id] = (None, min(pending.values()) - 1)
+                elif pool_id in self._latest:
+                    marks[pool_id] = self._latest[pool_id]
+
+        for pool_id, (signature, slot) in marks.items():
+            current_signature, current_slot = self.follower.watermark(pool_id)
+            if slot > current_slot or (slot == current_slot and signature and signature != current_signature):
+                self.watermarks.update(pool_id, signature, slot)
+
+    async def _subscribe(self, ws):
+        """
+        为每个交易池发送 logsSubscribe，返回 {subscription_id: pool_id}
+        """
+        requests = {}
+        for request_id, pool_id in enumerate(self.pools, start=1):
+            requests[request_id] = pool_id
+            await ws.send(json.dumps({
+                "jsonrpc": "2.0", "id": request_id, "method": "logsSubscribe",
+                "params": [{"mentions": [pool_id]}, {"commitment": self.commitment}],
+            }))
+
+        subscriptions = {}
+        while len(subscriptions) < len(requests):
+            message = json.loads(await ws.recv())
+            if "error" in message:
+                raise ConnectionError(f"logsSubscribe 失败: {message['error']}")
+            if message.get("id") in requests:
+                subscriptions[message["result"]] = requests[message["id"]]
+        return subscriptions
+
+    async def _listen(self, ws, subscriptions, executor):
+        """
+        读取推送直到连接断开；定期推进高水位
+        """
+        loop = asyncio.get_running_loop()
+        last_checkpoint = time.monotonic()
+        while True:
+            try:
+                raw = await asyncio.wait_for(ws.recv(), timeout=self.checkpoint_interval)
+            except asyncio.TimeoutError:
+                raw = None
+
+            if raw is not None:
+                message = json.loads(raw)
+                if message.get("method") == "logsNotification":
+                    params = message["params"]
+                    pool_id = subscriptions.get(params["subscription"])
+                    result = params["result"]
+                    value = result["value"]
+                    if pool_id is not None:
+                        self.notifications += 1
+                        slot = result["context"]["slot"]
+                        with self._lock:
+                            self._latest[pool_id] = (value["signature"], slot)
+                        if value.get("err") is None:
+                            TransactionFetcher.append_signatures(
+                                os.path.join(self.signature_folder, self.pools[pool_id]),
+                                [[value["signature"], slot, pool_id]])
+                            self.submit(executor, value["signature"], pool_id, slot)
+
+            if time.monotonic() - last_checkpoint >= self.checkpoint_interval:
+                await loop.run_in_executor(None, self.checkpoint)
+                last_checkpoint = time.monotonic()
+
+    async def _run(self, max_seconds=None):
+        loop = asyncio.get_running_loop()
+        deadline = None if max_seconds is None else time.monotonic() + max_seconds
+        failures = 0
+        decode_executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.decode_workers)
+        gap_executor = concurrent.futures.ThreadPoolExecutor(max_workers=min(15, len(self.pools)))
+
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                try:
+                    async with websockets.connect(self.ws_url, max_size=None, ping_interval=20) as ws:
+                        subscriptions = await self._subscribe(ws)
+                        print(f"🔌 已订阅 {len(subscriptions)} 个交易池（{self.ws_url}，{self.commitment}）")
+                        failures = 0
+
+                        # 先订阅再补缺口：补缺口期间的新交易由推送覆盖，不会遗漏
+                        with self._lock:
+                            self._filling.update(self.pools)
+                        for pool_id in self.pools:
+                            gap_executor.submit(self.fill_gap, decode_executor, pool_id)
+
+                        listen = self._listen(ws, subscriptions, decode_executor)
+                        if deadline is None:
+                            await listen
+                        else:
+                            await asyncio.wait_for(listen, timeout=max(0.0, deadline - time.monotonic()))
+                except (websockets.WebSocketException, OSError, ConnectionError, asyncio.TimeoutError) as e:
+                    # Python 3.11 起 asyncio.TimeoutError 就是 TimeoutError，握手超时也会抛出，只有到达截止时间才退出
+                    if isinstance(e, asyncio.TimeoutError) and deadline is not None and time.monotonic() >= deadline:
+                        break
+                    failures += 1
+                    self.reconnects += 1
+                    print(f"⚠️ websocket 连接断开（第 {failures} 次）: {e!r}")
+                    if failures >= self.fallback_after:
+                        # websocket 持续不可用：退回一轮轮询，同样从高水位继续
+                        print("🔁 websocket 不可用，退回轮询")
+                        await loop.run_in_executor(None, self.checkpoint)
+                        try:
+                            await loop.run_in_executor(None, self.follower.poll_once)
+                        except Exception as poll_error:
+                            # 高水位没有推进，下一轮会重新获取这些签名
+                            print(f"⚠️ 轮询失败: {poll_error}")
+                    delay = self.tx_fetcher.endpoint_pool.backoff(failures)
+                    if deadline is not None:
+                        delay = min(delay, max(0.0, deadline - time.monotonic()))
+                    await asyncio.sleep(delay)
+        finally:
+            gap_executor.shutdown(wait=True)
+            decode_executor.shutdown(wait=True)
+            await loop.run_in_executor(None, self.checkpoint)
+
+    def run(self, max_seconds=None):
+        """
+        持续订阅，直到 Ctrl+C（或运行 max_seconds 秒）
+        """
+        if not self.pools:
+            print("⚠️ 没有交易池，跳过订阅模式！")
+            return
+
+        start_time = time.time()
+        try:
+            asyncio.run(self._run(max_seconds))
+        except KeyboardInterrupt:
+            print("\n⏹️ 订阅模式已停止")
+        elapsed_time = time.time() - start_time
+        print(f"\n✅ 订阅模式结束：推送 {self.notifications} 笔，补缺口 {self.gap_filled} 笔，"
+              f"解码 {self.transactions_decoded} 笔，重连 {self.reconnects} 次，耗时 {elapsed_time:.2f} 秒")
+
+
+# ========== 使用示例 ==========
+if __name__ == "__main__":
+    from SOL_fetcher import SolanaFetcher
+
+    rpc_url = CONFIG["rpc_url1"]
+    fetcher = SolanaFetcher(323247000, 323247500, rpc_url)
+    fetcher.subscribe()
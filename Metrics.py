@@ -0,0 +1,342 @@
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import config
+
+CONFIG = config.CONFIG  # 直接使用 CONFIG
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # 秒
+LOCK_WAIT_BUCKETS = (0.00001, 0.0001, 0.001, 0.01, 0.1, 1.0)  # 秒
+
+
+class Counter:
+    """
+    只增不减的计数器，按标签值分别计数
+    """
+
+    def __init__(self, registry, name, help_text, labels=()):
+        self.registry = registry
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}  # 标签值 -> 计数
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, value=1):
+        """
+        :param label_values: 与 labels 一一对应的标签值
+        :param value: 增量
+        """
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + value
+
+    def samples(self):
+        with self._lock:
+            return list(self._values.items())
+
+
+class Gauge:
+    """
+    可增可减的当前值；也可以登记一个回调，导出时才读取（例如队列长度，热路径上没有任何开销）
+    """
+
+    def __init__(self, registry, name, help_text, labels=()):
+        self.registry = registry
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._callbacks = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, *label_values):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self._values[label_values] = value
+
+    def track(self, func, *label_values):
+        """ 导出时调用 func() 作为当前值 """
+        with self._lock:
+            self._callbacks[label_values] = func
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+            callbacks = list(self._callbacks.items())
+        for label_values, func in callbacks:
+            try:
+                values[label_values] = func()
+            except Exception:
+                continue
+        return list(values.items())
+
+
+class Histogram:
+    """
+    固定分桶的直方图（Prometheus 语义：累计分桶 + 总和 + 次数），每次记录只做一次二分查找
+    """
+
+    def __init__(self, registry, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # 标签值 -> [各分桶计数..., +Inf 计数, 总和]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        """
+        :param value: 观测值（耗时以秒计）
+        :param label_values: 与 labels 一一对应的标签值
+        """
+        if not self.registry.enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(label_values)
+            if state is None:
+                state = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def time(self, *label_values):
+        """ 计时上下文：with histogram.time("label"): ... """
+        return _Timer(self, label_values)
+
+    def samples(self):
+        """ :return: [(标签值, (累计分桶计数, 次数, 总和)), ...] """
+        with self._lock:
+            items = [(label_values, list(state)) for label_values, state in self._values.items()]
+        samples = []
+        for label_values, state in items:
+            cumulative, total = [], 0
+            for count in state[:-1]:
+                total += count
+                cumulative.append(total)
+            samples.append((label_values, (cumulative[:-1], total, state[-1])))
+        return samples
+
+
+class _Timer:
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.observe(time.perf_counter() - self.start_time, *self.label_values)
+
+
+class Metrics:
+    """
+    进程内的指标注册表（计数器 / 当前值 / 延迟直方图）：
+    - 各模块在导入时用 Metrics.shared() 登记指标，热路径上只做一次加锁累加
+    - 导出为 Prometheus 文本格式（本地 HTTP 端点 /metrics，另有 /metrics.json），
+      或定期写入 JSON 快照文件（先写 .tmp 再 os.replace）
+    - CONFIG["metrics_enabled"] 为 False 时所有记录直接返回
+    """
+
+    _shared_instance = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, enabled=True, prefix="sol_fetch"):
+        """
+        :param enabled: 是否记录指标
+        :param prefix: 指标名前缀
+        """
+        self.enabled = enabled
+        self.prefix = prefix
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._snapshot_thread = None
+        self._stop_event = threading.Event()
+
+    @classmethod
+    def shared(cls):
+        """
+        进程内共享的注册表（是否启用读取 CONFIG["metrics_enabled"]）
+        """
+        with cls._shared_lock:
+            if cls._shared_instance is None:
+                cls._shared_instance = cls(enabled=CONFIG.get("metrics_enabled", True))
+            return cls._shared_instance
+
+    def _register(self, metric_class, name, *args, **kwargs):
+        name = f"{self.prefix}_{name}"
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = metric_class(self, name, *args, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name, help_text, labels=()):
+        return self._register(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text, labels=()):
+        return self._register(Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram, name, help_text, labels, buckets)
+
+    # ========== 导出 ==========
+
+    @staticmethod
+    def _format_labels(names, values, extra=None):
+        pairs = list(zip(names, values)) + (list(extra.items()) if extra else [])
+        if not pairs:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+                   for _, value in pairs)
+        return "{" + ",".join(f"{name}=\"{value}\"" for (name, _), value in zip(pairs, escaped)) + "}"
+
+    def render(self):
+        """
+        :return: Prometheus 文本格式（text/plain; version=0.0.4）
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            kind = {Counter: "counter", Gauge: "gauge", Histogram: "histogram"}[type(metric)]
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {kind}")
+            for label_values, value in metric.samples():
+                if kind != "histogram":
+                    lines.append(f"{metric.name}{self._format_labels(metric.labels, label_values)} {value}")
+                    continue
+                cumulative, count, total = value
+                for bound, bucket_count in zip(metric.buckets, cumulative):
+                    labels = self._format_labels(metric.labels, label_values, {"le": repr(float(bound))})
+                    lines.append(f"{metric.name}_bucket{labels} {bucket_count}")
+                labels = self._format_labels(metric.labels, label_values, {"le": "+Inf"})
+                lines.append(f"{metric.name}_bucket{labels} {count}")
+                labels = self._format_labels(metric.labels, label_values)
+                lines.append(f"{metric.name}_sum{labels} {total}")
+                lines.append(f"{metric.name}_count{labels} {count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """
+        :return: 可直接 json.dump 的快照 {"timestamp", "metrics": {name: {"type", "help", "samples": [...]}}}
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        result = {}
+        for metric in metrics:
+            kind = {Counter: "counter", Gauge: "gauge", Histogram: "histogram"}[type(metric)]
+            samples = []
+            for label_values, value in metric.samples():
+                sample = {"labels": dict(zip(metric.labels, label_values))}
+                if kind == "histogram":
+                    cumulative, count, total = value
+                    sample.update(count=count, sum=round(total, 6),
+                                  mean=round(total / count, 6) if count else None,
+                                  buckets=dict(zip((str(bound) for bound in metric.buckets), cumulative)))
+                else:
+                    sample["value"] = value
+                samples.append(sample)
+            result[metric.name] = {"type": kind, "help": metric.help_text, "samples": samples}
+        return {"timestamp": time.time(), "metrics": result}
+
+    def write_snapshot(self, snapshot_file):
+        """ 原子写入 JSON 快照 """
+        os.makedirs(os.path.dirname(snapshot_file) or ".", exist_ok=True)
+        tmp_file = snapshot_file + ".tmp"
+        with open(tmp_file, mode="w", encoding="utf-8") as file:
+            json.dump(self.snapshot(), file, indent=1, ensure_ascii=False)
+        os.replace(tmp_file, snapshot_file)
+
+    # ========== 后台导出 ==========
+
+    def start(self, port=None, snapshot_file=None, snapshot_interval=None):
+        """
+        启动导出（可重复调用，已启动的部分不会重复启动）
+        :param port: Prometheus HTTP 端口（默认读取 CONFIG["metrics_port"]，None 表示不启动）
+        :param snapshot_file: JSON 快照文件（默认读取 CONFIG["metrics_snapshot_file"]，None 表示不写）
+        :param snapshot_interval: 快照间隔（秒，默认读取 CONFIG["metrics_snapshot_interval"]）
+        """
+        if not self.enabled:
+            return
+        port = port if port is not None else CONFIG.get("metrics_port")
+        snapshot_file = snapshot_file or CONFIG.get("metrics_snapshot_file")
+        snapshot_interval = snapshot_interval or CONFIG.get("metrics_snapshot_interval", 10)
+
+        with self._lock:
+            if port is not None and self._server is None:
+                self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+                self._server.daemon_threads = True
+                threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True).start()
+                print(f"📈 指标端点: http://127.0.0.1:{self._server.server_port}/metrics")
+
+            if snapshot_file and self._snapshot_thread is None:
+                self._snapshot_thread = threading.Thread(target=self._snapshot_loop, name="MetricsSnapshot",
+                                                         args=(snapshot_file, snapshot_interval), daemon=True)
+                self._snapshot_thread.start()
+                print(f"📈 指标快照每 {snapshot_interval} 秒写入 {snapshot_file}")
+
+    def stop(self):
+        """ 停止 HTTP 端点与快照线程（快照线程退出前会再写一次） """
+        self._stop_event.set()
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+            self._snapshot_thread = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self._stop_event.clear()
+
+    def _snapshot_loop(self, snapshot_file, snapshot_interval):
+        while True:
+            stopped = self._stop_event.wait(snapshot_interval)
+            try:
+                self.write_snapshot(snapshot_file)
+            except OSError as e:
+                print(f"⚠️ 指标快照写入失败: {e}")
+            if stopped:
+                return
+
+    def _handler(self):
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] == "/metrics":
+                    body, content_type = metrics.render().encode(), "text/plain; version=0.0.4; charset=utf-8"
+                elif self.path.split("?")[0] == "/metrics.json":
+                    body, content_type = json.dumps(metrics.snapshot()).encode(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return MetricsHandler
+
+
+# ========== 使用示例 ==========
+if __name__ == "__main__":
+    metrics = Metrics.shared()
+    requests = metrics.counter("example_requests_total", "示例请求数", ("method",))
+    latency = metrics.histogram("example_latency_seconds", "示例请求耗时", ("method",))
+    for _ in range(3):
+        requests.inc("getSlot")
+        with latency.time("getSlot"):
+            time.sleep(0.01)
+    print(metrics.render())
@@ -0,0 +1,607 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import websockets
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+import config
+
+try:
+    import orjson  # 可选：更快的 JSON 编解码，压测时 stand-in 本身不应成为瓶颈
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj):
+        return json.dumps(obj).encode()
+
+CONFIG = config.CONFIG  # 直接使用 CONFIG
+
+WSOL = "So11111111111111111111111111111111111111112"
+USDC = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+USDT = "Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB"
+TOKEN_PROGRAM = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+
+# 与主网一致的 JSON-RPC 错误码（solders 据此解析为 SlotSkippedMessage 等类型）
+SLOT_SKIPPED = -32007
+BLOCK_NOT_AVAILABLE = -32004
+
+
+class RpcError(Exception):
+    """ 以 JSON-RPC error 对象返回给客户端的错误 """
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class SyntheticChain:
+    """
+    确定性的合成链：[start_slot, start_slot + slots) 中每个未跳过的 Slot 有 tx_per_slot 笔交易，
+    每笔交易落在某个交易池上，带有该池两个代币的余额变化。相同参数生成的签名、余额与 blockTime 完全相同。
+    """
+
+    METHODS = ("getSlot", "getBlockTime", "getBlock", "getSignaturesForAddress", "getTransaction")
+
+    def __init__(self, start_slot=320000000, slots=2000, pairs=None, tx_per_slot=4, skip_every=7,
+                 failed_every=10, genesis_time=1740000000, slot_time=0.4, seed=0, head_slot=None):
+        """
+        :param start_slot: 第一个 Slot
+        :param slots: Slot 数（最后一个 Slot 为 start_slot + slots - 1）
+        :param pairs: [(mintA, symbolA, mintB, symbolB, 交易池数), ...]，默认 WSOL/USDC 两个池
+        :param tx_per_slot: 每个区块的交易数
+        :param skip_every: 每多少个 Slot 跳过一个（0 表示不跳过）
+        :param failed_every: 每多少笔交易有一笔失败（0 表示全部成功）
+        :param genesis_time: start_slot 的 blockTime
+        :param slot_time: 每个 Slot 的秒数
+        :param seed: 随机种子（决定签名与交易池地址）
+        :param head_slot: 当前可见的最新 Slot（getSlot 的返回值，默认为最后一个 Slot）；
+                          之后的 Slot 由 advance() 逐步出块，模拟实时增长的链
+        """
+        self.start_slot = start_slot
+        self.end_slot = start_slot + slots - 1
+        self.head_slot = self.end_slot if head_slot is None else head_slot
+        self.tx_per_slot = tx_per_slot
+        self.skip_every = skip_every
+        self.failed_every = failed_every
+        self.genesis_time = genesis_time
+        self.slot_time = slot_time
+        self.seed = seed
+
+        pairs = pairs or [(WSOL, "WSOL", USDC, "USDC", 2)]
+        self.pools = []  # [(pool_id, mintA, symbolA, mintB, symbolB), ...]
+        for pair_index, (mint_a, symbol_a, mint_b, symbol_b, pool_count) in enumerate(pairs):
+            for pool_index in range(pool_count):
+                digest = hashlib.sha256(f"{seed}:pool:{pair_index}:{pool_index}".encode()).digest()
+                self.pools.append((str(Pubkey(digest)), mint_a, symbol_a, mint_b, symbol_b))
+
+        # 签名 -> (slot, index)；交易池 -> 从新到旧的签名列表（getSignaturesForAddress 的顺序）
+        self.transactions = {}
+        self.pool_history = {pool[0]: [] for pool in self.pools}
+        for slot in range(self.end_slot, self.start_slot - 1, -1):
+            if self.is_skipped(slot):
+                continue
+            for index in range(self.tx_per_slot - 1, -1, -1):
+                signature = self.signature(slot, index)
+                self.transactions[signature] = (slot, index)
+                self.pool_history[self.pool_of(slot, index)[0]].append(signature)
+        # 与 pool_history 对齐的升序键 (-slot, -index)，按任意签名（不一定属于该池）二分定位分页位置
+        self.history_keys = {
+            pool_id: [(-self.transactions[signature][0], -self.transactions[signature][1]) for signature in history]
+            for pool_id, history in self.pool_history.items()
+        }
+
+    def is_skipped(self, slot):
+        return bool(self.skip_every) and (slot - self.start_slot) % self.skip_every == self.skip_every - 1
+
+    def block_time(self, slot):
+        return self.genesis_time + int((slot - self.start_slot) * self.slot_time)
+
+    def signature(self, slot, index):
+        return str(Signature(hashlib.sha512(f"{self.seed}:{slot}:{index}".encode()).digest()))
+
+    def pool_of(self, slot, index):
+        digest = hashlib.sha256(f"{self.seed}:{slot}:{index}".encode()).digest()
+        return self.pools[digest[0] % len(self.pools)]
+
+    def is_failed(self, slot, index):
+        return bool(self.failed_every) and (slot * self.tx_per_slot + index) % self.failed_every == 0
+
+    def transaction(self, slot, index):
+        """ 构造一笔交换交易（getTransaction / getBlock 中的格式） """
+        pool_id, mint_a, _, mint_b, _ = self.pool_of(slot, index)
+        signature = self.signature(slot, index)
+        digest = hashlib.sha256(signature.encode()).digest()
+        reserve_a = 10000.0 + digest[1]
+        reserve_b = reserve_a * (150.0 + digest[2] / 10)
+        amount_a = round((digest[3] + 1) / 10, 6) * (1 if digest[4] % 2 else -1)
+        amount_b = round(-amount_a * reserve_b / reserve_a, 6)
+
+        def balance(account_index, mint, amount):
+            return {
+                "accountIndex": account_index, "mint": mint, "owner": pool_id, "programId": TOKEN_PROGRAM,
+                "uiTokenAmount": {"amount": str(int(amount * 1e6)), "decimals": 6,
+                                  "uiAmount": amount, "uiAmountString": str(amount)},
+            }
+
+        failed = self.is_failed(slot, index)
+        return {
+            "transaction": {
+                "signatures": [signature],
+                "message": {
+                    "accountKeys": [pool_id],
+                    "header": {"numRequiredSignatures": 1, "numReadonlySignedAccounts": 0,
+                               "numReadonlyUnsignedAccounts": 0},
+                    "recentBlockhash": "11111111111111111111111111111111",
+                    "instructions": [],
+                    "addressTableLookups": [],
+                },
+            },
+            "meta": {
+                "err": {"InstructionError": [0, {"Custom": 1}]} if failed else None,
+                "status": {"Err": {"InstructionError": [0, {"Custom": 1}]}} if failed else {"Ok": None},
+                "fee": 5000, "preBalances": [1], "postBalances": [1], "innerInstructions": [], "logMessages": [],
+                "preTokenBalances": [balance(1, mint_a, reserve_a), balance(2, mint_b, round(reserve_b, 6))],
+                "postTokenBalances": [
+                    balance(1, mint_a, reserve_a if failed else round(reserve_a + amount_a, 6)),
+                    balance(2, mint_b, round(reserve_b, 6) if failed else round(reserve_b + amount_b, 6)),
+                ],
+                "rewards": [], "loadedAddresses": {"writable": [], "readonly": []}, "computeUnitsConsumed": 30000,
+            },
+            "version": 0,
+        }
+
+    def advance(self, slots=1):
+        """
+        出块：把可见的最新 Slot 向后推进（不超过最后一个 Slot）
+        :return: 新出的 [(slot, [(signature, pool_id, failed), ...]), ...]，跳过的 Slot 不出现
+        """
+        blocks = []
+        for slot in range(self.head_slot + 1, min(self.head_slot + slots, self.end_slot) + 1):
+            self.head_slot = slot
+            if not self.is_skipped(slot):
+                blocks.append((slot, [(self.signature(slot, index), self.pool_of(slot, index)[0],
+                                       self.is_failed(slot, index)) for index in range(self.tx_per_slot)]))
+        return blocks
+
+    def check_slot(self, slot):
+        if slot > self.head_slot or slot < self.start_slot:
+            raise RpcError(BLOCK_NOT_AVAILABLE, f"Block not available for slot {slot}")
+        if self.is_skipped(slot):
+            raise RpcError(SLOT_SKIPPED,
+                           f"Slot {slot} was skipped, or missing due to ledger jump to recent snapshot")
+
+    # ========== JSON-RPC 方法 ==========
+
+    def getSlot(self, params):
+        return self.head_slot
+
+    def getBlockTime(self, params):
+        self.check_slot(params[0])
+        return self.block_time(params[0])
+
+    def getBlock(self, params):
+        slot = params[0]
+        options = params[1] if len(params) > 1 and isinstance(params[1], dict) else {}
+        self.check_slot(slot)
+        block = {
+            "blockhash": "11111111111111111111111111111111",
+            "previousBlockhash": "11111111111111111111111111111111",
+            "parentSlot": slot - 1,
+            "blockTime": self.block_time(slot),
+            "blockHeight": slot - self.start_slot,
+        }
+        details = options.get("transactionDetails") or "full"  # solana-py 未指定时发送 null
+        if details == "full":
+            block["transactions"] = [self.transaction(slot, index) for index in range(self.tx_per_slot)]
+        elif details == "signatures":
+            block["signatures"] = [self.signature(slot, index) for index in range(self.tx_per_slot)]
+        return block
+
+    def getSignaturesForAddress(self, params):
+        options = params[1] if len(params) > 1 and isinstance(params[1], dict) else {}
+        history = self.pool_history.get(params[0], [])
+        keys = self.history_keys.get(params[0], [])
+
+        def position(signature):
+            if signature not in self.transactions:
+                raise RpcError(-32602, f"Invalid param: unknown signature {signature}")
+            slot, index = self.transactions[signature]
+            return -slot, -index
+
+        # before / until 可以是任意交易（例如区块中的第一笔），不要求属于该交易池；head_slot 之后的交易不可见
+        start = bisect.bisect_left(keys, (-self.head_slot, -self.tx_per_slot))
+        if options.get("before"):
+            start = max(start, bisect.bisect_right(keys, position(options["before"])))
+        stop = bisect.bisect_left(keys, position(options["until"])) if options.get("until") else len(history)
+        page = history[start:min(stop, start + (options.get("limit") or 1000))]
+
+        entries = []
+        for signature in page:
+            slot, index = self.transactions[signature]
+            failed = self.is_failed(slot, index)
+            entries.append({
+                "signature": signature, "slot": slot, "blockTime": self.block_time(slot), "memo": None,
+                "err": {"InstructionError": [0, {"Custom": 1}]} if failed else None,
+                "confirmationStatus": "finalized",
+            })
+        return entries
+
+    def getTransaction(self, params):
+        position = self.transactions.get(params[0])
+        if position is None or position[0] > self.head_slot:
+            return None
+        slot, index = position
+        return {"slot": slot, "blockTime": self.block_time(slot), **self.transaction(slot, index)}
+
+    def handle(self, method, params):
+        """ 执行一个 JSON-RPC 方法，返回 result；不支持的方法抛出 RpcError """
+        if method not in self.METHODS:
+            raise RpcError(-32601, "Method not found")
+        return getattr(self, method)(params or [])
+
+    def raydium_pools(self, mint1, mint2):
+        """ Raydium /pools/info/mint 响应（RaydiumPoolFetcher 离线运行时使用） """
+        return {"success": True, "data": {"count": 0, "data": [
+            {"id": pool_id, "mintA": {"address": mint_a, "symbol": symbol_a},
+             "mintB": {"address": mint_b, "symbol": symbol_b}}
+            for pool_id, mint_a, symbol_a, mint_b, symbol_b in self.pools
+            if {mint_a, mint_b} == {mint1, mint2}
+        ]}}
+
+
+class FixtureChain:
+    """
+    录制 / 回放的请求夹具（JSONL，每行 {"method", "params", "response"}）：
+    - 回放：按 (method, params) 精确匹配返回录制的 result / error
+    - 指定 upstream 时，未命中的请求转发到真实节点并追加到夹具文件（录制模式）
+    """
+
+    def __init__(self, fixture_file, upstream=None):
+        """
+        :param fixture_file: 夹具文件路径
+        :param upstream: 录制时转发的真实 RPC 端点（None 表示只回放）
+        """
+        self.fixture_file = fixture_file
+        self.upstream = upstream
+        self._lock = threading.Lock()
+        self._responses = {}
+        if os.path.exists(fixture_file):
+            with open(fixture_file, mode="rb") as file:
+                for line in file:
+                    if line.strip():
+                        entry = _json_loads(line)
+                        self._responses[self.key(entry["method"], entry["params"])] = entry["response"]
+        self._http = httpx.Client(timeout=30) if upstream else None
+        print(f"📼 已加载 {len(self._responses)} 条夹具（{fixture_file}）")
+
+    @staticmethod
+    def key(method, params):
+        return method + json.dumps(params, sort_keys=True, separators=(",", ":"))
+
+    def handle(self, method, params):
+        key = self.key(method, params)
+        response = self._responses.get(key)
+        if response is None and self._http is not None:
+            reply = self._http.post(self.upstream, json={"jsonrpc": "2.0", "id": 0, "method": method,
+                                                         "params": params}).json()
+            response = {"error": reply["error"]} if "error" in reply else {"result": reply.get("result")}
+            with self._lock:
+                self._responses[key] = response
+                with open(self.fixture_file, mode="ab") as file:
+                    file.write(_json_dumps({"method": method, "params": params, "response": response}) + b"\n")
+        if response is None:
+            raise RpcError(-32601, f"No fixture for {method} {json.dumps(params)}")
+        if "error" in response:
+            raise RpcError(response["error"].get("code", -32000), response["error"].get("message", ""))
+        return response["result"]
+
+
+class MockRpcServer:
+    """
+    本地 JSON-RPC stand-in：用合成链或录制夹具响应 getSlot / getBlockTime / getBlock /
+    getSignaturesForAddress / getTransaction（支持批量请求），并可注入延迟、错误与 429 限流，
+    让抓取器的性能测试在离线环境下可重复。
+    """
+
+    def __init__(self, chain=None, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 throttle_rate=0.0, seed=0):
+        """
+        :param chain: SyntheticChain 或 FixtureChain（默认 SyntheticChain()）
+        :param host: 监听地址
+        :param port: 监听端口（0 表示随机空闲端口）
+        :param latency: 每个 HTTP 请求的固定延迟（秒）
+        :param jitter: 在固定延迟之上叠加的 [0, jitter) 均匀随机延迟（秒）
+        :param error_rate: 返回 HTTP 500（JSON-RPC -32603）的概率
+        :param throttle_rate: 返回 HTTP 429 Too Many Requests 的概率
+        :param seed: 故障注入的随机种子
+        """
+        self.chain = chain or SyntheticChain()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self.requests = 0
+        self.calls = {}  # method -> 调用次数
+        self.errors = 0
+        self.throttled = 0
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive，与真实节点一致，客户端连接池才有意义
+            disable_nagle_algorithm = True  # 响应头与响应体分两次写出，否则 keep-alive 连接上每次请求多等约 40ms
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                status, payload = server.respond(body)
+                self.reply(status, payload)
+
+            def do_GET(self):
+                url = urllib.parse.urlparse(self.path)
+                query = dict(urllib.parse.parse_qsl(url.query))
+                if url.path == "/pools/info/mint" and hasattr(server.chain, "raydium_pools"):
+                    self.reply(200, _json_dumps(server.chain.raydium_pools(query.get("mint1"), query.get("mint2"))))
+                else:
+                    self.reply(404, b'{"success":false}')
+
+            def reply(self, status, payload):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.request_queue_size = 1024
+        self.url = f"http://{host}:{self.httpd.server_port}"
+        self._thread = None
+
+    def _call(self, request):
+        method = request.get("method", "")
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        reply = {"jsonrpc": "2.0", "id": request.get("id")}
+        try:
+            reply["result"] = self.chain.handle(method, request.get("params"))
+        except RpcError as e:
+            reply["error"] = {"code": e.code, "message": e.message}
+        return reply
+
+    def respond(self, body):
+        """
+        处理一个 HTTP 请求体（单个请求或批量请求）
+        :return: (HTTP 状态码, 响应字节)
+        """
+        delay = self.latency + (self._random.random() * self.jitter if self.jitter else 0.0)
+        with self._lock:
+            self.requests += 1
+            roll = self._random.random()
+        if delay:
+            time.sleep(delay)
+
+        if roll < self.throttle_rate:
+            with self._lock:
+                self.throttled += 1
+            return 429, b'{"jsonrpc":"2.0","error":{"code":429,"message":"Too Many Requests"},"id":null}'
+        if roll < self.throttle_rate + self.error_rate:
+            with self._lock:
+                self.errors += 1
+            return 500, b'{"jsonrpc":"2.0","error":{"code":-32603,"message":"Internal error"},"id":null}'
+
+        try:
+            request = _json_loads(body)
+        except ValueError:
+            return 400, b'{"jsonrpc":"2.0","error":{"code":-32700,"message":"Parse error"},"id":null}'
+        if isinstance(request, list):
+            return 200, _json_dumps([self._call(item) for item in request])
+        return 200, _json_dumps(self._call(request))
+
+    def start(self):
+        """ 在后台线程中启动服务，返回 self（可直接取 .url） """
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="MockRpcServer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "errors": self.errors, "throttled": self.throttled,
+                    "calls": dict(self.calls)}
+
+
+class MockWebsocketServer:
+    """
+    本地 websocket stand-in：支持 logsSubscribe（mentions 过滤）/ logsUnsubscribe，
+    合成链每次 advance() 出块时向订阅了相应交易池的连接推送 logsNotification；
+    可以断开全部连接、拒绝握手，用于重现断线补缺口与退回轮询。
+    """
+
+    def __init__(self, chain, host="127.0.0.1", port=0):
+        """
+        :param chain: SyntheticChain（与 MockRpcServer 共用，推送的交易可以通过 HTTP 获取）
+        :param host: 监听地址
+        :param port: 监听端口（0 表示随机空闲端口）
+        """
+        self.chain = chain
+        self.host = host
+        self.port = port
+        self.accepting = True  # False 时以 HTTP 503 拒绝握手
+        self.url = None
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._connections = {}  # websocket -> {subscription_id: pool_id}
+        self._next_subscription = 0
+
+        # 统计信息
+        self.subscribes = 0
+        self.notifications = 0
+        self.rejected = 0
+
+    def _process_request(self, path, request_headers):
+        if not self.accepting:
+            self.rejected += 1
+            return 503, [], b"Service Unavailable"
+        return None
+
+    async def _handler(self, ws):
+        subscriptions = self._connections.setdefault(ws, {})
+        try:
+            async for raw in ws:
+                request = _json_loads(raw)
+                reply = {"jsonrpc": "2.0", "id": request.get("id")}
+                params = request.get("params") or []
+                if request.get("method") == "logsSubscribe" and isinstance(params[0], dict):
+                    self._next_subscription += 1
+                    subscriptions[self._next_subscription] = params[0]["mentions"][0]
+                    self.subscribes += 1
+                    reply["result"] = self._next_subscription
+                elif request.get("method") == "logsUnsubscribe":
+                    reply["result"] = subscriptions.pop(params[0], None) is not None
+                else:
+                    reply["error"] = {"code": -32601, "message": "Method not found"}
+                await ws.send(_json_dumps(reply).decode())
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._connections.pop(ws, None)
+
+    async def _publish(self, slots, notify):
+        for slot, transactions in self.chain.advance(slots):
+            if not notify:
+                continue
+            for signature, pool_id, failed in transactions:
+                for ws, subscriptions in list(self._connections.items()):
+                    for subscription_id, subscribed_pool in subscriptions.items():
+                        if subscribed_pool != pool_id:
+                            continue
+                        message = {"jsonrpc": "2.0", "method": "logsNotification", "params": {
+                            "subscription": subscription_id,
+                            "result": {"context": {"slot": slot}, "value": {
+                                "signature": signature, "logs": [],
+                                "err": {"InstructionError": [0, {"Custom": 1}]} if failed else None,
+                            }},
+                        }}
+                        try:
+                            await ws.send(_json_dumps(message).decode())
+                            self.notifications += 1
+                        except websockets.ConnectionClosed:
+                            pass
+
+    async def _disconnect(self):
+        for ws in list(self._connections):
+            await ws.close(code=1001, reason="going away")
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def advance(self, slots=1, notify=True):
+        """
+        合成链出块并推送（在 websocket 事件循环中执行，与推送的顺序一致）
+        :param slots: 出块的 Slot 数
+        :param notify: False 时只出块不推送（模拟断线期间错过的交易）
+        """
+        self._call(self._publish(slots, notify))
+
+    def disconnect(self):
+        """ 断开全部连接（客户端应重连、重新订阅并补缺口） """
+        self._call(self._disconnect())
+
+    def subscriptions(self):
+        """ 当前的订阅数 """
+        return self._call(self._count())
+
+    async def _count(self):
+        return sum(len(subscriptions) for subscriptions in self._connections.values())
+
+    def start(self):
+        """ 在后台线程的事件循环中启动服务，返回 self（可直接取 .url） """
+        async def serve():
+            # 在目标事件循环中创建，服务内部的 Future 才会绑定到该循环
+            return await websockets.serve(self._handler, self.host, self.port, process_request=self._process_request)
+
+        self._loop = asyncio.new_event_loop()
+        self._server = self._loop.run_until_complete(serve())
+        self.url = f"ws://{self.host}:{self._server.sockets[0].getsockname()[1]}"
+        self._thread = threading.Thread(target=self._loop.run_forever, name="MockWebsocketServer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        async def close():
+            self._server.close()
+            await self._server.wait_closed()
+
+        self._call(close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def stats(self):
+        return {"subscribes": self.subscribes, "notifications": self.notifications, "rejected": self.rejected}
+
+
+# ========== 使用示例 ==========
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="本地 Solana JSON-RPC stand-in（合成链 / 录制夹具）")
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--slots", type=int, default=2000, help="合成链的 Slot 数")
+    parser.add_argument("--tx-per-slot", type=int, default=4)
+    parser.add_argument("--fixtures", help="夹具文件（JSONL）；指定后不使用合成链")
+    parser.add_argument("--record", help="录制模式：未命中的请求转发到该 RPC 端点并写入夹具文件")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="额外的随机延迟上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="HTTP 500 的概率")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="HTTP 429 的概率")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        chain = FixtureChain(args.fixtures, upstream=args.record)
+    else:
+        chain = SyntheticChain(slots=args.slots, tx_per_slot=args.tx_per_slot)
+        print(f"⛓️ 合成链：Slot {chain.start_slot} ~ {chain.end_slot}，{len(chain.transactions)} 笔交易")
+        for pool_id, _, symbol_a, _, symbol_b in chain.pools:
+            print(f"   {symbol_a}_{symbol_b}: {pool_id}（{len(chain.pool_history[pool_id])} 笔交易）")
+
+    server = MockRpcServer(chain, port=args.port, latency=args.latency, jitter=args.jitter,
+                           error_rate=args.error_rate, throttle_rate=args.throttle_rate)
+    print(f"🚀 Mock RPC 已启动: {server.url}（Ctrl+C 停止）")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n⏹️ 已停止：{server.stats()}")
@@ -0,0 +1,166 @@
+import concurrent.futures
+import threading
+import time
+import config
+from RpcBudget import RpcBudget, set_owner
+
+CONFIG = config.CONFIG  # 直接使用 CONFIG
+
+
+class PairScheduler:
+    """
+    多个交易对并发处理：每个交易对在自己的线程中依次执行 获取交易池 -> 获取签名 -> 解码（SolanaFetcher.run_pair），
+    互不共享交易池的交易对不再互相等待。
+    - 所有交易对共享一个全局 RPC 并发预算（RpcBudget），名额按交易对公平分配，繁忙的交易对不会饿死其他交易对
+    - 定期输出每个交易对的阶段、RPC 请求数与已写入的 DATA 行数，每个交易对完成时立即汇报
+    """
+
+    STAGE_NAMES = {"waiting": "排队中", "pool": "获取交易池", "signatures": "获取签名", "decode": "解码",
+                   "streaming": "流式抓取+解码", "done": "完成", "failed": "失败"}
+
+    def __init__(self, solana_fetcher, rpc_concurrency=None, max_parallel_pairs=None, report_interval=None):
+        """
+        :param solana_fetcher: SolanaFetcher 实例
+        :param rpc_concurrency: 全局同时在途的 RPC 请求数（默认读取 CONFIG["pair_rpc_concurrency"]）
+        :param max_parallel_pairs: 同时处理的交易对数（默认读取 CONFIG["pair_max_parallel"]，None 表示全部同时处理）
+        :param report_interval: 进度汇报间隔（秒，默认读取 CONFIG["pair_report_interval"]）
+        """
+        self.solana_fetcher = solana_fetcher
+        self.rpc_concurrency = rpc_concurrency or CONFIG.get("pair_rpc_concurrency", 200)
+        self.max_parallel_pairs = max_parallel_pairs or CONFIG.get("pair_max_parallel")
+        self.report_interval = report_interval or CONFIG.get("pair_report_interval", 30)
+
+        self.budget = None
+        self.status = {}  # key -> {"label", "stage", "symbols", "start", "end", "error"}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def pair_key(mint1, mint2):
+        return f"{mint1}/{mint2}"
+
+    def _set_stage(self, key, stage, symbol1=None, symbol2=None):
+        with self._lock:
+            status = self.status[key]
+            status["stage"] = stage
+            if symbol1 is not None:
+                status["symbols"] = (symbol1, symbol2)
+                status["label"] = f"{symbol1}/{symbol2}"
+
+    def _rows_written(self, key):
+        """ 交易对已写入 DATA 的行数（DATA 文件名中两个代币的顺序取决于交易中的余额变动顺序） """
+        symbols = self.status[key]["symbols"]
+        if symbols is None:
+            return 0
+        rows_written = self.solana_fetcher.data_writer.rows_written
+        symbol1, symbol2 = symbols
+        return rows_written.get(f"{symbol1}_{symbol2}.csv", 0) + rows_written.get(f"{symbol2}_{symbol1}.csv", 0)
+
+    def progress(self, key):
+        """
+        :return: 交易对的进度 {"label", "stage", "elapsed", "rpc_requests", "in_flight", "waiting", "rows"}
+        """
+        with self._lock:
+            status = dict(self.status[key])
+        budget_stats = self.budget.stats().get(key, {}) if self.budget is not None else {}
+        if status["start"] is None:
+            elapsed = 0.0
+        else:
+            elapsed = (status["end"] or time.time()) - status["start"]
+        return {
+            "label": status["label"],
+            "stage": status["stage"],
+            "elapsed": round(elapsed, 2),
+            "rpc_requests": budget_stats.get("granted", 0),
+            "in_flight": budget_stats.get("in_flight", 0),
+            "waiting": budget_stats.get("waiting", 0),
+            "rows": self._rows_written(key),
+        }
+
+    def report(self):
+        """ 输出所有交易对的进度 """
+        lines = [f"📊 交易对进度（RPC 预算 {self.rpc_concurrency}，峰值在途 {self.budget.peak_in_flight}）："]
+        for key in self.status:
+            progress = self.progress(key)
+            lines.append(
+                f"   {progress['label']:<20} {self.STAGE_NAMES.get(progress['stage'], progress['stage']):<8} "
+                f"{progress['elapsed']:>9.1f}s  RPC {progress['rpc_requests']}（在途 {progress['in_flight']}，"
+                f"排队 {progress['waiting']}）  DATA {progress['rows']} 行")
+        print("\n".join(lines))
+
+    def _report_loop(self, stop_event):
+        while not stop_event.wait(self.report_interval):
+            self.report()
+
+    def run_pair(self, key, mint1, mint2, engine=None, streaming=False):
+        """ 在工作线程中处理一个交易对，该线程（及其派生的线程池任务）发出的 RPC 请求都计入该交易对 """
+        set_owner(key)
+        with self._lock:
+            self.status[key]["start"] = time.time()
+        return self.solana_fetcher.run_pair(
+            mint1, mint2, engine=engine, streaming=streaming,
+            on_stage=lambda stage, symbol1, symbol2: self._set_stage(key, stage, symbol1, symbol2),
+        )
+
+    def run(self, token_pairs, engine=None, streaming=False):
+        """
+        并发处理所有交易对，全部完成后返回
+        :param token_pairs: [(mint1, mint2), ...]
+        :param engine: 解码引擎（同 SolanaFetcher.run）
+        :param streaming: 是否启用流式模式（同 SolanaFetcher.run）
+        :return: {交易对: 进度}；有交易对失败时，其余交易对完成后抛出第一个异常
+        """
+        token_pairs = list(dict.fromkeys(tuple(pair) for pair in token_pairs))  # 去掉重复的交易对
+        self.status = {
+            self.pair_key(mint1, mint2): {"label": f"{mint1[:6]}…/{mint2[:6]}…", "stage": "waiting", "symbols": None,
+                                          "start": None, "end": None, "error": None}
+            for mint1, mint2 in token_pairs
+        }
+        self.budget = RpcBudget(self.rpc_concurrency)
+        previous_budget = RpcBudget.install(self.budget)
+        max_workers = min(len(token_pairs), self.max_parallel_pairs or len(token_pairs))
+        print(f"🚦 并发处理 {len(token_pairs)} 个交易对（同时 {max_workers} 个，全局 RPC 并发 {self.rpc_concurrency}）")
+
+        stop_event = threading.Event()
+        reporter = threading.Thread(target=self._report_loop, args=(stop_event,), name="PairReporter", daemon=True)
+        reporter.start()
+        start_time = time.time()
+        errors = []
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pair") as executor:
+                futures = {
+                    executor.submit(self.run_pair, self.pair_key(mint1, mint2), mint1, mint2, engine, streaming):
+                        self.pair_key(mint1, mint2)
+                    for mint1, mint2 in token_pairs
+                }
+                for future in concurrent.futures.as_completed(futures):
+                    key = futures[future]
+                    error = future.exception()
+                    with self._lock:
+                        self.status[key]["end"] = time.time()
+                        self.status[key]["stage"] = "done" if error is None else "failed"
+                        self.status[key]["error"] = error
+                    progress = self.progress(key)
+                    if error is None:
+                        print(f"✅ 交易对 {progress['label']} 完成：耗时 {progress['elapsed']:.2f} 秒，"
+                              f"RPC {progress['rpc_requests']} 次，DATA {progress['rows']} 行")
+                    else:
+                        errors.append(error)
+                        print(f"❌ 交易对 {progress['label']} 失败（{progress['elapsed']:.2f} 秒）: {error}")
+        finally:
+            stop_event.set()
+            RpcBudget.install(previous_budget)
+
+        self.report()
+        print(f"🏁 {len(token_pairs) - len(errors)}/{len(token_pairs)} 个交易对完成，总耗时 {time.time() - start_time:.2f} 秒")
+        if errors:
+            raise errors[0]
+        return {key: self.progress(key) for key in self.status}
+
+
+# ========== 使用示例 ==========
+if __name__ == "__main__":
+    from SOL_fetcher import SolanaFetcher
+
+    rpc_url = CONFIG["rpc_url1"]
+    fetcher = SolanaFetcher(323247000, 323247500, rpc_url)
+    PairScheduler(fetcher).run(fetcher.read_input())
@@ -0,0 +1,200 @@
+import concurrent.futures
+import os
+import time
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+import config
+from FetchCheckpoint import FetchCheckpoint
+from TransactionFetcher import TransactionFetcher
+
+CONFIG = config.CONFIG  # 直接使用 CONFIG
+
+
+class PoolFollower:
+    """
+    持续跟踪模式：为每个交易池保存一个高水位（最新已处理的签名与 Slot），
+    定期轮询 getSignaturesForAddress（until=高水位签名），只获取比高水位更新的签名并解码，
+    DATA 写盘后再原子推进高水位。RPC 调用数只与新增交易数成正比，不再反复抓取重叠的 Slot 范围。
+    进程中断时高水位尚未推进，重启后这一轮的签名会重新解码（至少一次）。
+    解码失败（重试耗尽仍获取不到交易）的签名与高水位一起保存为重试列表，之后每轮优先重试，
+    最多 max_decode_attempts 轮。
+    """
+
+    def __init__(self, solana_fetcher, pools, poll_interval=None, page_limit=None, watermark_file=None,
+                 max_decode_attempts=None):
+        """
+        :param solana_fetcher: SolanaFetcher 实例（提供端点池、LogDecoder 与 DataWriter）
+        :param pools: {pool_id: SIGNATURE 文件名}
+        :param poll_interval: 两轮轮询之间的间隔（秒，默认读取 CONFIG["follow_poll_interval"]）
+        :param page_limit: getSignaturesForAddress 每页条数（默认读取 CONFIG["follow_page_limit"]）
+        :param watermark_file: 高水位清单路径（默认 RESULT/CHECKPOINT/watermarks.json）
+        :param max_decode_attempts: 单笔交易最多解码几轮（默认读取 CONFIG["follow_max_decode_attempts"]）
+        """
+        self.solana_fetcher = solana_fetcher
+        self.endpoint_pool = solana_fetcher.TX_SIG_fetcher.endpoint_pool
+        self.slot_index = solana_fetcher.TX_SIG_fetcher.slot_index
+        self.log_decoders = solana_fetcher.log_decoders
+        self.pools = pools
+        self.poll_interval = CONFIG.get("follow_poll_interval", 2) if poll_interval is None else poll_interval
+        self.page_limit = page_limit or CONFIG.get("follow_page_limit", 1000)
+        self.max_decode_attempts = max_decode_attempts or CONFIG.get("follow_max_decode_attempts", 5)
+        self.watermarks = FetchCheckpoint.shared(
+            watermark_file or os.path.join(CONFIG["output_path"], "CHECKPOINT", "watermarks.json"))
+
+        self.signature_folder = os.path.join(CONFIG["output_path"], "SIGNATURE")
+        os.makedirs(self.signature_folder, exist_ok=True)
+
+        # 统计信息
+        self.polls = 0
+        self.rpc_calls = 0
+        self.transactions_decoded = 0
+
+    def watermark(self, pool_id):
+        """
+        交易池的高水位；第一次跟踪时从 SolanaFetcher 的 end_slot 开始（紧接已回填的范围）
+        :return: (signature 或 None, slot)
+        """
+        entry = self.watermarks.get(pool_id)
+        if entry is None:
+            return None, self.solana_fetcher.end_slot
+        return entry["signature"], entry["slot"]
+
+    def retry_list(self, pool_id):
+        """
+        交易池上一轮解码失败、等待重试的签名
+        :return: {signature: 已失败次数}
+        """
+        entry = self.watermarks.get(pool_id)
+        return dict(entry.get("retry") or {}) if entry is not None else {}
+
+    def poll_pool(self, pool_id):
+        """
+        获取交易池在高水位之后的全部新签名（从新到旧分页）
+        :return: (pool_id, [txn, ...] 按从新到旧排列, 签名查询次数)
+        """
+        mark_signature, mark_slot = self.watermark(pool_id)
+        until = Signature.from_string(mark_signature) if mark_signature else None
+        pubkey = Pubkey.from_string(pool_id)
+
+        new_transactions = []
+        before = None
+        calls = 0
+        while True:
+            response = self.endpoint_pool.call(
+                "get_signatures_for_address",
+                pubkey,
+                before=before,
+                until=until,
+                limit=self.page_limit,
+            )
+            calls += 1
+            page = response.value or []
+            # 没有高水位签名时（第一次跟踪）按 Slot 截断
+            fresh = [txn for txn in page if until is not None or txn.slot > mark_slot]
+            new_transactions.extend(fresh)
+            if len(fresh) < self.page_limit:
+                break
+            before = page[-1].signature
+        return pool_id, new_transactions, calls
+
+    def decode(self, entries):
+        """
+        多线程解码新签名，完成后把 DATA 写盘
+        :param entries: [(signature, market_address), ...]
+        :return: 获取失败的 [(signature, market_address), ...]
+        """
+        if not entries:
+            return []
+        max_workers = min(len(entries), len(self.log_decoders) * 100)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            decoded = list(executor.map(
+                lambda item: self.log_decoders[item[0] % len(self.log_decoders)].decode(*item[1]),
+                enumerate(entries),
+            ))
+        self.solana_fetcher.data_writer.flush()
+        failed = [entry for entry, ok in zip(entries, decoded) if not ok]
+        self.transactions_decoded += len(entries) - len(failed)
+        return failed
+
+    def poll_once(self):
+        """
+        一轮轮询：并行获取所有交易池的新签名 -> 写 SIGNATURE -> 解码（含上一轮失败的签名）并写盘 DATA
+        -> 推进高水位，本轮解码失败的签名记入重试列表
+        :return: 本轮新增的签名数
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(15, len(self.pools))) as executor:
+            results = list(executor.map(self.poll_pool, self.pools))
+
+        entries = []
+        retries = {}  # pool_id -> {signature: 已失败次数}
+        for pool_id, transactions, calls in results:
+            self.rpc_calls += calls
+            retries[pool_id] = self.retry_list(pool_id)
+            entries.extend((signature, pool_id) for signature in retries[pool_id])  # 更早的交易先解码
+            if not transactions:
+                continue
+            if self.slot_index is not None:
+                for txn in transactions:
+                    self.slot_index.record(txn.slot, txn.block_time)
+            rows = [[str(txn.signature), txn.slot, pool_id] for txn in transactions if txn.err is None]
+            TransactionFetcher.append_signatures(os.path.join(self.signature_folder, self.pools[pool_id]), rows)
+            entries.extend((row[0], pool_id) for row in reversed(rows))  # 从旧到新解码
+
+        failed = self.decode(entries)
+
+        next_retries = {pool_id: {} for pool_id in retries}
+        for signature, pool_id in failed:
+            attempts = retries[pool_id].get(signature, 0) + 1
+            if attempts >= self.max_decode_attempts:
+                print(f"🚨 交易 {signature}（交易池 {pool_id}）{attempts} 轮解码均失败，放弃")
+                continue
+            next_retries[pool_id][signature] = attempts
+
+        # DATA 已写盘，再推进高水位（每个交易池一次原子写入，失败的签名随高水位一起保存）
+        for pool_id, transactions, _ in results:
+            if transactions:
+                self.watermarks.update(pool_id, transactions[0].signature, transactions[0].slot,
+                                       retry=next_retries[pool_id])
+            elif retries[pool_id] != next_retries[pool_id]:
+                signature, slot = self.watermark(pool_id)
+                self.watermarks.update(pool_id, signature, slot, retry=next_retries[pool_id])
+
+        self.polls += 1
+        return sum(len(transactions) for _, transactions, _ in results)
+
+    def run(self, max_polls=None):
+        """
+        持续轮询，直到 Ctrl+C（或达到 max_polls 轮）
+        """
+        if not self.pools:
+            print("⚠️ 没有交易池，跳过跟踪模式！")
+            return
+
+        print(f"👀 跟踪 {len(self.pools)} 个交易池，每 {self.poll_interval} 秒轮询一次（Ctrl+C 停止）")
+        try:
+            while max_polls is None or self.polls < max_polls:
+                start_time = time.time()
+                try:
+                    new_count = self.poll_once()
+                except Exception as e:
+                    # 高水位没有推进，下一轮会重新获取这些签名
+                    print(f"⚠️ 第 {self.polls + 1} 轮轮询失败: {e}")
+                    new_count = 0
+                elapsed_time = time.time() - start_time
+                if new_count:
+                    print(f"✅ 新增 {new_count} 笔交易，耗时 {elapsed_time:.2f} 秒"
+                          f"（累计解码 {self.transactions_decoded} 笔，{self.rpc_calls} 次签名查询）")
+                time.sleep(max(0.0, self.poll_interval - elapsed_time))
+        except KeyboardInterrupt:
+            print("\n⏹️ 跟踪模式已停止")
+        finally:
+            self.solana_fetcher.data_writer.flush()
+
+
+# ========== 使用示例 ==========
+if __name__ == "__main__":
+    from SOL_fetcher import SolanaFetcher
+
+    rpc_url = CONFIG["rpc_url1"]
+    fetcher = SolanaFetcher(323247000, 323247500, rpc_url)
+    fetcher.follow()
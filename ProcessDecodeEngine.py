@@ -0,0 +1,313 @@
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from tqdm import tqdm
+import config
+from LogDecoder import LogDecoder, COINS, GET_TRANSACTION_CONFIG, _json_loads, DECODE_RETRIES, DECODE_RETRY_SLEEP
+from Metrics import Metrics
+from RpcBudget import bind_context
+from Tracer import Tracer
+
+CONFIG = config.CONFIG  # 直接使用 CONFIG
+
+PROCESS_BATCH_SECONDS = Metrics.shared().histogram("process_decode_batch_seconds", "解码子进程处理一批原始响应的耗时（秒）")
+PROCESS_PENDING = Metrics.shared().gauge("process_decode_pending", "已交给解码子进程、尚未返回的批次数")
+TRACER = Tracer.shared()
+
+
+class _RowCollector:
+    """ 子进程中代替 DataWriter：只收集待写入的行，由主进程交给唯一的 DataWriter 写盘 """
+
+    def __init__(self):
+        self.rows = []
+
+    def submit(self, *row):
+        self.rows.append(row)
+
+    def take(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+
+class _WorkerDecoder(LogDecoder):
+    """ 子进程中只做解析的 LogDecoder：不连接 RPC，不打开 Slot 索引与交易缓存，解析与筛选逻辑与主进程完全相同 """
+
+    def __init__(self):
+        self.log_enabled = False
+        self.coins = dict(COINS)
+        self.data_writer = _RowCollector()
+        self.slot_index = None
+        self.tx_cache = None
+
+
+_worker_decoder = None  # 每个子进程一个
+
+
+def decode_raw_batch(units, keep_raw=False):
+    """
+    在子进程中解析一批 getTransaction 原始响应并计算余额变化（ProcessPoolExecutor 的任务函数，必须位于模块顶层）
+    :param units: [([(signature, market_address), ...], 响应字节), ...]，单个请求的响应为对象，批量请求为数组（id 为下标）
+    :param keep_raw: 是否返回每笔交易的 JSON 字符串（主进程写入交易缓存）
+    :return: (rows, slots, failed, raw_results, elapsed)
+             rows = 待写入 DATA 的行（DataWriter.submit 的参数）
+             slots = [(slot, blockTime), ...]，用于 Slot 索引
+             failed = 需要主进程逐笔重试的 [(signature, market_address), ...]
+             raw_results = {signature: 交易 JSON 字符串}
+    """
+    global _worker_decoder
+    if _worker_decoder is None:
+        _worker_decoder = _WorkerDecoder()
+    decoder = _worker_decoder
+
+    start_time = time.perf_counter()
+    slots, failed, raw_results = [], [], {}
+    for items, raw in units:
+        try:
+            replies = _json_loads(raw)
+        except ValueError:
+            failed.extend(items)  # 响应不是 JSON（例如网关返回的错误页）
+            continue
+        if isinstance(replies, dict):
+            # 单个请求的响应；批量请求被整体拒绝时同样是单个错误对象，全部逐笔重试
+            replies = [replies] if len(items) == 1 else []
+        replies = {reply.get("id"): reply for reply in replies if isinstance(reply, dict)}
+
+        for idx, (transaction_signature, market_address) in enumerate(items):
+            reply = replies.get(idx)
+            if reply is None or "error" in reply:
+                failed.append((transaction_signature, market_address))
+                continue
+            tx_details = reply.get("result")
+            if tx_details is None:
+                continue  # 交易不存在或尚未确认，与线程引擎一样跳过
+            slots.append((tx_details.get("slot"), tx_details.get("blockTime")))
+            if keep_raw:
+                raw_results[transaction_signature] = json.dumps(tx_details, separators=(",", ":"))
+            decoder.save_decoded(transaction_signature, decoder.parse_transaction_json(tx_details, market_address))
+    return decoder.data_writer.take(), slots, failed, raw_results, time.perf_counter() - start_time
+
+
+class ProcessDecodeEngine:
+    """
+    多进程交易解码引擎：
+    - I/O 线程只负责 getTransaction 请求，拿到响应字节后不做解析
+    - 原始响应按批交给 ProcessPoolExecutor，子进程解析 JSON 并计算余额变化，解码吞吐随 CPU 核数增长
+    - 子进程只返回待写入的行，主进程统一交给唯一的 DataWriter 写盘；Slot 索引与交易缓存也只在主进程更新
+    - 请求失败或批量响应中缺失的交易交回 LogDecoder.decode 逐笔重试
+    - 子进程池在进程内共享：PairScheduler 并发处理多个交易对时总进程数仍为 decode_processes，而不是交易对数 x 核数
+    """
+
+    _shared_pool = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, log_decoders, data_writer, processes=None, io_threads=None, rpc_batch_size=None,
+                 process_batch_size=None, max_retries=5, wait_time=1):
+        """
+        :param log_decoders: LogDecoder 列表（共享 EndpointPool，I/O 线程轮流使用）
+        :param data_writer: 唯一的 DataWriter
+        :param processes: 解码子进程数（默认读取 CONFIG["decode_processes"]，None 时为 CPU 核数）
+        :param io_threads: I/O 线程数（默认读取 CONFIG["decode_threads"]，未配置时与线程引擎相同）
+        :param rpc_batch_size: 每个 JSON-RPC 请求包含的交易数（默认读取 CONFIG["rpc_batch_size"]）
+        :param process_batch_size: 每次交给子进程的交易数（默认读取 CONFIG["process_decode_batch_size"]）
+        :param max_retries: 一次请求的最大重试次数，仍失败的交易逐笔重试
+        :param wait_time: 重试的基础等待时间（秒）
+        """
+        self.log_decoders = log_decoders
+        self.data_writer = data_writer
+        self.processes = processes or CONFIG.get("decode_processes") or os.cpu_count() or 1
+        self.rpc_batch_size = max(1, rpc_batch_size or CONFIG.get("rpc_batch_size", 1))
+        self.io_threads = io_threads or CONFIG.get("decode_threads") or max(
+            len(log_decoders), len(log_decoders) * 100 // self.rpc_batch_size)
+        self.process_batch_size = process_batch_size or CONFIG.get("process_decode_batch_size", 200)
+        self.max_retries = max_retries
+        self.wait_time = wait_time
+
+        print(f"ProcessDecodeEngine initialized: {self.io_threads} I/O threads, {self.processes} decode processes")
+
+    @classmethod
+    def shared_pool(cls, processes):
+        """
+        进程内共享的解码子进程池（第一次调用时按 processes 创建，之后的交易对复用，子进程也不必重复启动）；
+        子进程异常退出导致进程池损坏时重新创建
+        """
+        with cls._shared_lock:
+            if cls._shared_pool is None or cls._shared_pool._broken:
+                # spawn 启动的子进程不继承主进程的线程（DataWriter、HTTP 连接池等），各平台行为一致
+                cls._shared_pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+            return cls._shared_pool
+
+    @classmethod
+    def shutdown_shared(cls):
+        """ 关闭共享的子进程池（解释器退出时也会自动关闭） """
+        with cls._shared_lock:
+            if cls._shared_pool is not None:
+                cls._shared_pool.shutdown()
+                cls._shared_pool = None
+
+    def fetch_raw(self, log_decoder, items):
+        """
+        获取一组交易的原始响应字节（单个或批量请求）
+        :param items: [(signature, market_address), ...]
+        :return: 响应字节，重试后仍失败时返回 None
+        """
+        if len(items) == 1:
+            payload = {"jsonrpc": "2.0", "id": 0, "method": "getTransaction",
+                       "params": [items[0][0], GET_TRANSACTION_CONFIG]}
+            method = "getTransaction"
+        else:
+            payload = [{"jsonrpc": "2.0", "id": idx, "method": "getTransaction",
+                        "params": [transaction_signature, GET_TRANSACTION_CONFIG]}
+                       for idx, (transaction_signature, _) in enumerate(items)]
+            method = "getTransaction:batch"
+
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                return log_decoder.rpc_request(payload, tokens=len(items), raw=True)
+            except Exception as e:
+                log_decoder.log(f"❌ Error fetching {len(items)} transactions (attempt {attempt}/{self.max_retries}): {e}")
+                if attempt < self.max_retries:
+                    delay = log_decoder.endpoint_pool.backoff(attempt, self.wait_time)
+                    DECODE_RETRIES.inc(method)
+                    DECODE_RETRY_SLEEP.inc(method, value=delay)
+                    time.sleep(delay)
+        return None
+
+    def _fetch(self, log_decoder, items, fetched):
+        """ I/O 线程：缓存命中的交易直接解码，其余获取原始响应后连同缓存命中数放入 fetched 队列 """
+        raw, cached = None, 0
+        try:
+            with TRACER.span("fetch_raw", category="rpc", sample=True, size=len(items)):
+                if log_decoder.tx_cache is not None:
+                    missing = []
+                    for transaction_signature, market_address in items:
+                        if transaction_signature in log_decoder.tx_cache:
+                            log_decoder.decode(transaction_signature, market_address)
+                            cached += 1
+                        else:
+                            missing.append((transaction_signature, market_address))
+                    items = missing
+                if items:
+                    raw = self.fetch_raw(log_decoder, items)
+        finally:
+            fetched.put((items, raw, cached))  # 异常时 raw 为 None，交易逐笔重试
+
+    def _handle_decoded(self, future, size, retry, progress):
+        """ 主线程：子进程的结果交给唯一的 DataWriter，记录 Slot 索引与交易缓存，失败的交易逐笔重试 """
+        rows, slots, failed, raw_results, elapsed = future.result()
+        PROCESS_BATCH_SECONDS.observe(elapsed)
+        with TRACER.span("handle_decoded", category="decode", sample=True, rows=len(rows)):
+            for row in rows:
+                self.data_writer.submit(*row)
+            log_decoder = self.log_decoders[0]
+            if log_decoder.slot_index is not None:
+                for slot, block_time in slots:
+                    log_decoder.slot_index.record(slot, block_time)
+            if log_decoder.tx_cache is not None:
+                for transaction_signature, tx_details in raw_results.items():
+                    log_decoder.tx_cache.put(transaction_signature, tx_details)
+        for item in failed:
+            retry(item)
+        progress.update(size - len(failed))
+
+    def run(self, tx_signatures):
+        """
+        解码全部交易签名（阻塞直到完成）
+        :param tx_signatures: [(signature, market_address), ...]
+        """
+        if not tx_signatures:
+            print("⚠️ 没有符合条件的交易签名，跳过解码！")
+            return
+
+        start_time = time.time()
+        chunks = iter(enumerate(
+            tx_signatures[i:i + self.rpc_batch_size] for i in range(0, len(tx_signatures), self.rpc_batch_size)))
+        keep_raw = self.log_decoders[0].tx_cache is not None
+        fetched = queue.Queue()
+        progress = tqdm(total=len(tx_signatures), desc="Overall Progress", position=0, leave=True,
+                        dynamic_ncols=True, unit="tx")
+
+        processes = self.shared_pool(self.processes)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.io_threads, thread_name_prefix="fetch") as io:
+            retries = []
+
+            def retry(item):
+                """ 逐笔重试：走 LogDecoder 的单笔路径（更多次重试），结果同样写入 DataWriter """
+                def decode(transaction_signature, market_address):
+                    log_decoder.decode(transaction_signature, market_address)
+                    progress.update(1)
+
+                log_decoder = self.log_decoders[len(retries) % len(self.log_decoders)]
+                retries.append(io.submit(bind_context(decode), *item))
+
+            def submit_fetch():
+                """ 提交下一个请求，没有剩余的交易时返回 False """
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return False
+                idx, items = chunk
+                log_decoder = self.log_decoders[idx % len(self.log_decoders)]
+                io.submit(bind_context(self._fetch), log_decoder, items, fetched)
+                return True
+
+            decoding = {}  # future -> 交易数
+            PROCESS_PENDING.track(lambda: len(decoding))
+
+            def submit_decode(units, size):
+                """ 交给子进程解码；在途批次过多时先处理已完成的批次（背压，避免原始响应堆积在内存中） """
+                while len(decoding) >= self.processes * 2:
+                    done, _ = concurrent.futures.wait(decoding, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in done:
+                        self._handle_decoded(future, decoding.pop(future), retry, progress)
+                decoding[processes.submit(decode_raw_batch, units, keep_raw)] = size
+
+            # 同时在途的请求数为 I/O 线程数的两倍，保证线程始终有活可干而响应不会无限堆积
+            in_flight = sum(submit_fetch() for _ in range(self.io_threads * 2))
+            units, unit_size = [], 0
+            while in_flight:
+                items, raw, cached = fetched.get()
+                in_flight -= 1
+                in_flight += submit_fetch()
+                progress.update(cached)
+                if raw is None:
+                    for item in items:
+                        retry(item)
+                    continue
+                units.append((items, raw))
+                unit_size += len(items)
+                if unit_size >= self.process_batch_size:
+                    submit_decode(units, unit_size)
+                    units, unit_size = [], 0
+            if units:
+                submit_decode(units, unit_size)
+
+            for future in concurrent.futures.as_completed(list(decoding)):
+                self._handle_decoded(future, decoding.pop(future), retry, progress)
+            concurrent.futures.wait(retries)
+            for future in retries:
+                future.result()
+        progress.close()
+
+        elapsed_time = time.time() - start_time
+        print(f"\n✅ 多进程解码完成，共处理 {len(tx_signatures)} 笔交易（逐笔重试 {len(retries)} 笔），"
+              f"耗时 {elapsed_time:.2f} 秒")
+
+
+# ========== 使用示例 ==========
+if __name__ == "__main__":
+    from DataWriter import DataWriter
+
+    rpc_urls = [CONFIG[key] for key in CONFIG if key.startswith("rpc_url")]
+    log_decoders = [LogDecoder(url, log_enabled=False) for url in rpc_urls]
+    with DataWriter() as data_writer:
+        for log_decoder in log_decoders:
+            log_decoder.data_writer = data_writer
+        tx_signatures = [
+            ("4jTXnYnXPrpgi1QYsVqUZQVFa9Nk5C1rWbrsyzbuf4Ymgdmd8iAkQNLAxfEQKSeLSZUTFTJJNFyvp3THR74TFwob",
+             "8sLbNZoA1cfnvMJLPfp98ZLAnFSYCFApfJKMbiXNLwxj"),
+        ]
+        ProcessDecodeEngine(log_decoders, data_writer).run(tx_signatures)
@@ -0,0 +1,176 @@
+import asyncio
+import random
+import re
+import threading
+import time
+import httpx
+import config
+
+CONFIG = config.CONFIG  # 直接使用 CONFIG
+
+
+def is_throttle_error(error):
+    """
+    判断异常是否表示节点限流或过载（HTTP 429 / 超时），沿异常链逐层检查
+    """
+    for _ in range(10):  # 异常链深度上限
+        if error is None:
+            return False
+        if isinstance(error, httpx.TimeoutException):
+            return True
+        if isinstance(error, httpx.HTTPStatusError) and error.response.status_code in (429, 503):
+            return True
+        message = str(error)
+        # 429 需单独成词：Slot 编号中也可能出现这三个数字（如 "Slot 320001429 was skipped"）
+        if re.search(r"\b429\b", message) or "Too Many Requests" in message or "rate limit" in message.lower():
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class RateLimiter:
+    """
+    单个 RPC 端点的令牌桶限速器，速率按 AIMD 自适应：
+    - 第一次限流之前为慢启动：每次成功请求速率加 1，满速时约每秒翻倍，很快达到 max_rate 或节点的真实上限
+    - 之后每次成功请求线性增加速率（加性增）
+    - 遇到 429 / 超时按比例降低速率（乘性减），并清空令牌桶让所有线程一起暂停
+    同一端点的所有组件（LogDecoder / TransactionFetcher / SolanaSlotFinder）共享同一个实例。
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, endpoint, initial_rate=50.0, min_rate=1.0, max_rate=500.0, increase_step=1.0,
+                 decrease_factor=0.5, decrease_cooldown=1.0, max_backoff=30.0, slow_start=True):
+        """
+        :param endpoint: RPC 端点（仅用于日志）
+        :param initial_rate: 初始速率（请求/秒）
+        :param min_rate: 最低速率
+        :param max_rate: 最高速率（服务商的额度上限）
+        :param increase_step: 满速运行时每秒增加的速率
+        :param decrease_factor: 限流时速率乘以该系数
+        :param decrease_cooldown: 两次降速之间的最短间隔（秒），避免同一波 429 连续降速
+        :param max_backoff: 单次重试等待的上限（秒）
+        :param slow_start: 第一次限流之前是否按乘性增长（False 时从一开始就是加性增）
+        """
+        self.endpoint = endpoint
+        self.rate = float(initial_rate)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.increase_step = float(increase_step)
+        self.decrease_factor = float(decrease_factor)
+        self.decrease_cooldown = float(decrease_cooldown)
+        self.max_backoff = float(max_backoff)
+        self.slow_start = bool(slow_start)
+
+        self._lock = threading.Lock()
+        self._tokens = 1.0
+        self._last_refill = time.monotonic()
+        self._last_decrease = 0.0
+
+        # 统计信息
+        self.total_requests = 0
+        self.total_throttled = 0
+
+    @classmethod
+    def for_endpoint(cls, endpoint):
+        """
+        获取端点共享的限速器，参数来自 CONFIG["rate_limits"]：
+        "default" 为默认值，可用 CONFIG 中的端点键名（如 "rpc_url1"）或 URL 单独覆盖
+        """
+        endpoint = str(endpoint)
+        with cls._instances_lock:
+            if endpoint not in cls._instances:
+                rate_limits = CONFIG.get("rate_limits", {})
+                options = dict(rate_limits.get("default", {}))
+                for key, value in CONFIG.items():
+                    if key.startswith("rpc_url") and value == endpoint:
+                        options.update(rate_limits.get(key, {}))
+                options.update(rate_limits.get(endpoint, {}))
+                cls._instances[endpoint] = cls(endpoint, **options)
+            return cls._instances[endpoint]
+
+    def _reserve(self, tokens):
+        """ 预留令牌，返回需要等待的秒数（令牌允许为负，即排队） """
+        with self._lock:
+            now = time.monotonic()
+            capacity = max(1.0, self.rate)  # 最多积攒 1 秒的令牌
+            self._tokens = min(capacity, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            self._tokens -= tokens
+            self.total_requests += tokens
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self, tokens=1):
+        """
+        阻塞直到获得令牌
+        :param tokens: 本次请求消耗的令牌数（批量请求按其中的调用数计）
+        """
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=1):
+        """
+        acquire 的异步版本
+        """
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_success(self):
+        """ 慢启动时每次成功加 1（满速时每秒约翻倍）；之后为加性增，满速时每秒约增加 increase_step """
+        with self._lock:
+            step = 1.0 if self.slow_start else self.increase_step / max(self.rate, 1.0)
+            self.rate = min(self.max_rate, self.rate + step)
+
+    def on_throttle(self):
+        """ 乘性减：降低速率并清空令牌桶 """
+        with self._lock:
+            self.total_throttled += 1
+            self.slow_start = False  # 已经探到节点的上限，之后只做加性增
+            now = time.monotonic()
+            if now - self._last_decrease < self.decrease_cooldown:
+                return
+            self._last_decrease = now
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._tokens = min(self._tokens, 0.0)
+        print(f"⚠️ RPC 限流，{self.endpoint} 速率降至 {self.rate:.1f} req/s")
+
+    def record_result(self, error=None):
+        """
+        根据请求结果调整速率：error 为 None 表示成功
+        """
+        if error is None:
+            self.on_success()
+        elif is_throttle_error(error):
+            self.on_throttle()
+
+    def call(self, func, *args, tokens=1, **kwargs):
+        """
+        通过限速器执行一次 RPC 调用，并根据结果调整速率
+        """
+        self.acquire(tokens)
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self.record_result(e)
+            raise
+        self.record_result()
+        return result
+
+    def backoff(self, attempt, base=1.0):
+        """
+        计算第 attempt 次失败后的重试等待时间：指数退避 + 随机抖动，上限 max_backoff
+        """
+        delay = min(self.max_backoff, base * (2 ** (attempt - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+
+# ========== 使用示例 ==========
+if __name__ == "__main__":
+    limiter = RateLimiter("local-test", initial_rate=20)
+    start_time = time.time()
+    for _ in range(40):
+        limiter.call(lambda: None)
+    print(f"40 次调用耗时 {time.time() - start_time:.2f} 秒，当前速率 {limiter.rate:.1f} req/s")
@@ -3,6 +3,7 @@ import json
 import csv
 import os
 import config
+from RpcTransport import RpcTransport
 from collections import defaultdict
 
 CONFIG = config.CONFIG  # 直接使用 CONFIG
@@ -58,7 +59,7 @@ class RaydiumPoolFetcher:
 
         try:
             print(f"🔍 发送请求到 Raydium API: {url}")
-            response = requests.get(url, params=params, timeout=10)
+            response = RpcTransport.shared().http_session.get(url, params=params, timeout=10)  # 复用连接
             response.raise_for_status()  # 如果 HTTP 状态码非 200，抛出异常
 
             data = response.json()
@@ -0,0 +1,227 @@
+import asyncio
+import collections
+import contextlib
+import contextvars
+import threading
+
+# 当前请求属于哪个任务（例如交易对），由 PairScheduler 设置；线程池中的任务需用 bind_context 传递
+_current_owner = contextvars.ContextVar("rpc_budget_owner", default=None)
+
+
+def current_owner():
+    return _current_owner.get()
+
+
+def set_owner(owner):
+    """ 设置当前上下文（线程 / asyncio 任务）发出的 RPC 请求所属的任务 """
+    return _current_owner.set(owner)
+
+
+def bind_context(func):
+    """
+    把当前上下文（预算归属、追踪 Span 等 contextvars）绑定到 func，交给线程池执行时沿用提交者的上下文。
+    每次调用都会复制一份上下文，同一个返回值只能在一个线程中同时运行。
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(func, *args, **kwargs)
+
+
+class _ThreadWaiter:
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+
+    def grant(self):
+        self.granted = True
+        self.event.set()
+
+
+class _AsyncWaiter:
+    def __init__(self, loop):
+        self.loop = loop
+        self.future = loop.create_future()
+        self.granted = False
+
+    def grant(self):
+        self.granted = True
+        self.loop.call_soon_threadsafe(lambda: self.future.done() or self.future.set_result(None))
+
+
+class RpcBudget:
+    """
+    全局 RPC 并发预算：所有在途 RPC 请求（线程与 asyncio 引擎）共享 limit 个名额。
+    名额不足时按任务（owner，例如交易对）排队，释放的名额优先给在途请求最少的任务（最大最小公平），
+    同一任务内先到先得，繁忙的交易对不会饿死其他交易对。
+    通过 RpcBudget.install() 启用后，EndpointPool 与 AsyncDecodeEngine 的每次请求都会经过预算。
+    """
+
+    active = None  # 当前启用的预算（None 表示不限制）
+
+    def __init__(self, limit):
+        """
+        :param limit: 同时在途的 RPC 请求数上限
+        """
+        self.limit = max(1, int(limit))
+        self._lock = threading.Lock()
+        self._in_flight = collections.Counter()  # owner -> 在途请求数
+        self._total_in_flight = 0
+        self._waiters = collections.OrderedDict()  # owner -> deque(waiter)，按开始等待的先后排列
+
+        # 统计信息
+        self.granted = collections.Counter()  # owner -> 已获得的名额数
+        self.peak_in_flight = 0
+
+    @classmethod
+    def install(cls, budget):
+        """ 启用（budget 为 None 时关闭）全局预算，返回之前的预算 """
+        previous, cls.active = cls.active, budget
+        return previous
+
+    def _grant(self, owner, waiter=None):
+        """ 分配一个名额（调用方持有锁） """
+        self._in_flight[owner] += 1
+        self._total_in_flight += 1
+        self.granted[owner] += 1
+        self.peak_in_flight = max(self.peak_in_flight, self._total_in_flight)
+        if waiter is not None:
+            waiter.grant()
+
+    def _dispatch(self):
+        """ 把空闲名额分给在途请求最少的排队任务（调用方持有锁） """
+        while self._total_in_flight < self.limit and self._waiters:
+            # min 遇到相同值时取第一个，即等待最久的任务
+            owner = min(self._waiters, key=lambda o: self._in_flight[o])
+            queue = self._waiters[owner]
+            waiter = queue.popleft()
+            if not queue:
+                del self._waiters[owner]
+            else:
+                self._waiters.move_to_end(owner)  # 同样的在途数下轮到其他任务
+            self._grant(owner, waiter)
+
+    def _enqueue(self, owner, waiter):
+        """ 有空闲名额且无人排队时直接分配，否则排队；返回是否已分配（调用方持有锁） """
+        if self._total_in_flight < self.limit and not self._waiters:
+            self._grant(owner)
+            return True
+        self._waiters.setdefault(owner, collections.deque()).append(waiter)
+        return False
+
+    def _cancel(self, owner, waiter):
+        """ 等待被取消：已分配则归还，否则移出队列 """
+        with self._lock:
+            if waiter.granted:
+                self._release_locked(owner)
+                return
+            queue = self._waiters.get(owner)
+            if queue is not None and waiter in queue:
+                queue.remove(waiter)
+                if not queue:
+                    del self._waiters[owner]
+
+    def acquire(self, owner=None):
+        """ 阻塞直到获得一个名额 """
+        waiter = _ThreadWaiter()
+        with self._lock:
+            if self._enqueue(owner, waiter):
+                return
+        try:
+            waiter.event.wait()
+        except BaseException:
+            self._cancel(owner, waiter)
+            raise
+
+    async def acquire_async(self, owner=None):
+        """ acquire 的异步版本（不阻塞事件循环） """
+        waiter = _AsyncWaiter(asyncio.get_running_loop())
+        with self._lock:
+            if self._enqueue(owner, waiter):
+                return
+        try:
+            await waiter.future
+        except BaseException:
+            self._cancel(owner, waiter)
+            raise
+
+    def _release_locked(self, owner):
+        self._in_flight[owner] -= 1
+        if self._in_flight[owner] <= 0:
+            del self._in_flight[owner]
+        self._total_in_flight -= 1
+        self._dispatch()
+
+    def release(self, owner=None):
+        with self._lock:
+            self._release_locked(owner)
+
+    def stats(self):
+        """ 各任务的在途 / 排队 / 累计请求数 """
+        with self._lock:
+            owners = set(self._in_flight) | set(self._waiters) | set(self.granted)
+            return {
+                owner: {
+                    "in_flight": self._in_flight.get(owner, 0),
+                    "waiting": len(self._waiters.get(owner, ())),
+                    "granted": self.granted.get(owner, 0),
+                }
+                for owner in owners
+            }
+
+
+@contextlib.contextmanager
+def rpc_slot():
+    """ 在全局预算中占用一个名额（未启用预算时不做任何事） """
+    budget = RpcBudget.active
+    if budget is None:
+        yield
+        return
+    owner = _current_owner.get()
+    budget.acquire(owner)
+    try:
+        yield
+    finally:
+        budget.release(owner)
+
+
+@contextlib.asynccontextmanager
+async def rpc_slot_async():
+    """ rpc_slot 的异步版本 """
+    budget = RpcBudget.active
+    if budget is None:
+        yield
+        return
+    owner = _current_owner.get()
+    await budget.acquire_async(owner)
+    try:
+        yield
+    finally:
+        budget.release(owner)
+
+
+# ========== 使用示例 ==========
+if __name__ == "__main__":
+    import concurrent.futures
+    import time
+
+    budget = RpcBudget(4)
+    RpcBudget.install(budget)
+
+    finished = {}
+
+    def request(owner):
+        set_owner(owner)
+        with rpc_slot():
+            time.sleep(0.01)
+        finished[owner] = time.time()
+
+    # 繁忙的交易对（60 个线程、200 个请求）与安静的交易对（10 个线程、20 个请求）各用自己的线程池，
+    # 安静的交易对仍能分到一半名额，约 0.1 秒完成，而不是排在繁忙交易对之后
+    start_time = time.time()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=60) as busy, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=10) as quiet:
+        futures = [busy.submit(request, "WSOL/USDC") for _ in range(200)]
+        futures += [quiet.submit(request, "WSOL/USDT") for _ in range(20)]
+        concurrent.futures.wait(futures)
+    for owner, finished_time in finished.items():
+        print(f"{owner}: {finished_time - start_time:.2f}s")
+    print(budget.stats(), f"peak={budget.peak_in_flight}")
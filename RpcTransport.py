@@ -0,0 +1,125 @@
+import atexit
+import threading
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from solana.rpc.api import Client
+from solana.rpc.async_api import AsyncClient
+import config
+
+CONFIG = config.CONFIG  # 直接使用 CONFIG
+
+
+class RpcTransport:
+    """
+    进程内共享的 HTTP 传输层：
+    - 所有 Solana RPC Client 共用一个 httpx.Client（keep-alive 连接池，可选 HTTP/2），
+      同一节点的请求复用已建立的 TCP / TLS 连接，不再每个组件各建一套连接
+    - RaydiumPoolFetcher 等普通 HTTP 请求共用一个 requests.Session
+    - 连接池大小与超时由 CONFIG 中的 rpc_* 配置项控制
+    """
+
+    _shared_instance = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_connections=None, max_keepalive_connections=None, keepalive_expiry=None,
+                 http2=None, connect_timeout=None, read_timeout=None):
+        """
+        :param max_connections: 连接池最大连接数（默认读取 CONFIG["rpc_pool_max_connections"]）
+        :param max_keepalive_connections: 最多保持的空闲连接数（默认读取 CONFIG["rpc_pool_max_keepalive"]）
+        :param keepalive_expiry: 空闲连接保留时间（秒）
+        :param http2: 是否启用 HTTP/2（需要安装 h2，未安装时自动退回 HTTP/1.1）
+        :param connect_timeout: 建立连接超时（秒）
+        :param read_timeout: 读取超时（秒）
+        """
+        self.max_connections = max_connections or CONFIG.get("rpc_pool_max_connections", 200)
+        self.max_keepalive_connections = max_keepalive_connections or CONFIG.get("rpc_pool_max_keepalive", 200)
+        self.keepalive_expiry = keepalive_expiry or CONFIG.get("rpc_keepalive_expiry", 60)
+        self.http2 = CONFIG.get("rpc_http2", False) if http2 is None else http2
+        self.connect_timeout = connect_timeout or CONFIG.get("rpc_connect_timeout", 5)
+        self.read_timeout = read_timeout or CONFIG.get("rpc_read_timeout", 30)
+
+        if self.http2:
+            try:
+                import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+            except ImportError:
+                print("⚠️ 未安装 h2（pip install httpx[http2]），RPC 连接使用 HTTP/1.1")
+                self.http2 = False
+
+        self.session = httpx.Client(
+            http2=self.http2,
+            limits=self.limits(),
+            timeout=self.timeout(),
+        )
+
+        self.http_session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=self.max_keepalive_connections)
+        self.http_session.mount("https://", adapter)
+        self.http_session.mount("http://", adapter)
+
+        self._closed = False
+        atexit.register(self.close)
+
+    @classmethod
+    def shared(cls):
+        """
+        获取进程内共享的传输层
+        """
+        with cls._shared_lock:
+            if cls._shared_instance is None:
+                cls._shared_instance = cls()
+            return cls._shared_instance
+
+    def limits(self, max_connections=None):
+        """ 连接池限制（异步客户端可按自身并发数覆盖 max_connections） """
+        max_connections = max_connections or self.max_connections
+        return httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(max_connections, self.max_keepalive_connections),
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeout(self):
+        return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+
+    def client(self, rpc_url):
+        """
+        创建使用共享连接池的同步 Solana Client
+        """
+        client = Client(rpc_url, timeout=self.read_timeout)
+        client._provider.session.close()
+        client._provider.session = self.session
+        return client
+
+    async def async_client(self, rpc_url, max_connections=None):
+        """
+        创建异步 Solana Client（需在使用它的事件循环中 await）。httpx.AsyncClient 绑定事件循环，无法与同步连接池共享，
+        但沿用同样的 HTTP/2、keep-alive 与超时配置
+        :param max_connections: 连接池上限（通常等于该端点的并发数）
+        """
+        client = AsyncClient(rpc_url, timeout=self.read_timeout)
+        await client._provider.session.aclose()  # 替换 solana-py 自带的会话前先关闭，与同步 client() 一致
+        client._provider.session = httpx.AsyncClient(
+            http2=self.http2,
+            limits=self.limits(max_connections),
+            timeout=self.timeout(),
+        )
+        return client
+
+    def close(self):
+        """ 关闭连接池（可重复调用） """
+        if self._closed:
+            return
+        self._closed = True
+        self.session.close()
+        self.http_session.close()
+
+
+# ========== 使用示例 ==========
+if __name__ == "__main__":
+    transport = RpcTransport.shared()
+    rpc_urls = [CONFIG[key] for key in CONFIG if key.startswith("rpc_url")]
+    clients = [transport.client(url) for url in rpc_urls]
+    print(f"{len(clients)} 个 Client 共用一个连接池（HTTP/2: {transport.http2}）")
+    for client in clients:
+        print(client.get_slot().value)
@@ -7,18 +7,35 @@ from tqdm import tqdm  # ✅ 进度条库
 from SolanaSlotFinder import SolanaSlotFinder
 from RaydiumPoolFetcher import RaydiumPoolFetcher
 from TransactionFetcher import TransactionFetcher
-from LogDecoder import LogDecoder
+from LogDecoder import LogDecoder, is_retryable_rpc_error
+from AsyncDecodeEngine import AsyncDecodeEngine
+from ProcessDecodeEngine import ProcessDecodeEngine
+from BlockScanner import BlockScanner
+from IngestPlanner import IngestPlanner
+from PoolFollower import PoolFollower
+from LogSubscriber import LogSubscriber
+from DataWriter import DataWriter
+from CandleBuilder import CandleBuilder
+from Metrics import Metrics
+from Tracer import Tracer, traced
+from RpcBudget import bind_context
+from PairScheduler import PairScheduler
 import concurrent.futures
 import threading
+import queue
 from solders.pubkey import Pubkey
 import time
 import logging
 import httpx
 from solana.exceptions import SolanaRpcException
+from solana.rpc.core import RPCException
 
 
 CONFIG = config.CONFIG  # 直接使用 CONFIG
 
+STREAM_QUEUE = Metrics.shared().gauge("stream_queue_size", "流式模式下等待解码的签名数")
+TRACER = Tracer.shared()
+
 
 class SolanaFetcher:
     """
@@ -37,6 +54,7 @@ class SolanaFetcher:
         """
         self.start_slot = start_slot
         self.end_slot = end_slot
+        self.slot_partitions = [(start_slot, end_slot)]  # 按时间窗口切分的 Slot 区间
         self.rpc_url = rpc_url
         self.slot_finder = SolanaSlotFinder(rpc_url)
         self.TX_SIG_fetcher = TransactionFetcher.from_slots(self.rpc_url, self.slot_finder, self.start_slot, self.end_slot)
@@ -50,11 +68,19 @@ class SolanaFetcher:
         # **创建多个 LogDecoder 实例**
         self.log_decoders = [LogDecoder(url) for url in self.rpc_urls]
 
-        print(f"✅ 初始化 {len(self.log_decoders)} 个 LogDecoder 实例，均衡负载 Solana 节点")
+        print(f"✅ 初始化 {len(self.log_decoders)} 个 LogDecoder 实例，按延迟均衡负载 Solana 节点")
+
+        # **所有 LogDecoder 共用一个后台写入线程，解码线程不再读写 DATA 文件**
+        self.data_writer = DataWriter()
+        for log_decoder in self.log_decoders:
+            log_decoder.data_writer = self.data_writer
 
         # 常见稳定币符号
         self.stable_symbols = {"USDC", "USDT", "USDD"}
 
+        # 按 CONFIG 启动指标导出（Prometheus 端点 / JSON 快照），未配置时只在内存中累计
+        Metrics.shared().start()
+
     @classmethod
     def from_datetime(cls, start_datetime, end_datetime,rpc_url):
         """
@@ -68,11 +94,47 @@ class SolanaFetcher:
         start_timestamp = int(start_datetime.timestamp())
         end_timestamp = int(end_datetime.timestamp())
         slot_finder = SolanaSlotFinder(rpc_url)
-        start_slot = slot_finder.find_closest_slot(start_timestamp)
-        end_slot = slot_finder.find_closest_slot(end_timestamp)
+        start_slot, end_slot = slot_finder.find_closest_slots([start_timestamp, end_timestamp])
 
         return cls(start_slot, end_slot, rpc_url)
 
+    @classmethod
+    def from_datetime_windows(cls, start_datetime, end_datetime, window, rpc_url):
+        """
+        使用时间范围 + 窗口大小初始化 SolanaFetcher，并把范围切分为连续的 Slot 区间
+        :param start_datetime: 起始时间（datetime 对象）
+        :param end_datetime: 结束时间（datetime 对象）
+        :param window: 窗口大小（datetime.timedelta，例如 1 小时）
+        :param rpc_url: Solana RPC 端点
+        :return: SolanaFetcher 实例，`slot_partitions` 为每个窗口的 (start_slot, end_slot)
+        """
+        if window.total_seconds() <= 0:
+            raise ValueError("❌ 窗口大小必须为正数")
+
+        boundaries = []
+        current = start_datetime
+        while current < end_datetime:
+            boundaries.append(int(current.timestamp()))
+            current += window
+        boundaries.append(int(end_datetime.timestamp()))
+
+        # 一次性解析所有边界，探测结果在边界之间共享
+        slot_finder = SolanaSlotFinder(rpc_url)
+        boundary_slots = slot_finder.find_closest_slots(boundaries)
+
+        # 相邻窗口互不重叠：每个窗口截止到下一个边界 Slot 的前一个 Slot，最后一个窗口包含结束 Slot
+        partitions = []
+        for idx in range(len(boundary_slots) - 1):
+            window_start = boundary_slots[idx]
+            window_end = boundary_slots[idx + 1] - (1 if idx + 1 < len(boundary_slots) - 1 else 0)
+            if window_end >= window_start:
+                partitions.append((window_start, window_end))
+
+        instance = cls(boundary_slots[0], boundary_slots[-1], rpc_url)
+        instance.slot_partitions = partitions
+        print(f"✅ {start_datetime} ~ {end_datetime} 切分为 {len(partitions)} 个 Slot 区间")
+        return instance
+
 
     def read_input(self):
         """
@@ -97,6 +159,7 @@ class SolanaFetcher:
         border = "=" * 50
         print(f"\n{border}\n <<<<<<<<<< {message}  >>>>>>>>>> \n{border}\n")
 
+    @traced("fetch_pool")
     def fetch_pool_by_token(self, mint1, mint2):
         """
         获取 Raydium 流动性池数据
@@ -125,11 +188,21 @@ class SolanaFetcher:
                     pool_ids.append(row["pool_id"])
         return pool_ids
 
-    def fetch_transactions_for_pool(self, symbol1, symbol2):
+    def fetch_transactions_for_pool(self, symbol1, symbol2, on_page=None, slot_ranges=None, parts=None):
         """
-        读取 `POOL_symbol1_symbol2.csv` 获取 `pool_id` 并使用多线程查询交易
+        读取 `POOL_symbol1_symbol2.csv` 获取 `pool_id` 并使用多线程查询交易。
+        每个交易池的 Slot 范围切分为 parts 个子区间，各自从自己的边界游标同时分页，
+        单个活跃交易池不再只占用一个线程；结果写入同一个 SIGNATURE 文件并去重。
+        :param on_page: 可选回调，每获取一页签名就调用一次（流式模式使用）
+        :param slot_ranges: 可选的 Slot 区间列表（例如抓取计划中逐笔抓取的子区间），默认为 self.slot_partitions
+                            （from_datetime_windows 的时间窗口）；都由覆盖整个运行范围的 self.TX_SIG_fetcher 抓取，
+                            区间末尾不是运行范围末尾时以下一个 Slot 的区块为游标，区间的最后一个 Slot 不会遗漏
+        :param parts: 每个交易池的子区间数（默认读取 CONFIG["pool_fetch_parts"]），平均分给各个时间窗口
         """
         file_name = f"{symbol1}_{symbol2}.csv"
+        slot_ranges = slot_ranges or self.slot_partitions
+        tx_fetcher = self.TX_SIG_fetcher
+        parts = parts or CONFIG.get("pool_fetch_parts", 4)
 
         # 读取 `POOL_symbol1_symbol2.csv` 获取 `pool_id`
         market_address_list = self.read_pool_file(symbol1, symbol2)
@@ -137,46 +210,80 @@ class SolanaFetcher:
         # 线程数设为 `15`
         max_threads = 15
 
-        def fetch_for_market(market_address):
-            """单独处理一个市场地址的交易获取"""
+        def fetch_for_market(market_address, slot_range):
+            """单独处理一个市场地址在一个子区间内的交易获取，重试耗尽时抛出异常"""
             attempt = 0
             max_retries = 5  # 最大重试次数
 
-            while attempt < max_retries:
+            while True:
                 try:
                     logging.info(
                         f"Fetching transactions for Market Address: {market_address} (Attempt {attempt + 1}/{max_retries})")
 
-                    # 发送请求
-                    self.TX_SIG_fetcher.fetch_transactions(market_address,file_name)
+                    # 发送请求（失败重试时从断点清单中的游标继续，不再从头分页）
+                    with TRACER.span("paginate_pool", pool=market_address, slot_range=slot_range, attempt=attempt + 1):
+                        tx_fetcher.fetch_transactions(market_address, file_name, on_page=on_page,
+                                                      slot_range=slot_range)
 
                     # 成功获取数据，跳出重试循环
                     break
 
-                except (httpx.ReadTimeout, SolanaRpcException) as e:
-                    logging.warning(f"Request failed: {e}. Retrying... (Attempt {attempt + 1})")
-
-                    # 计算指数退避时间：2^attempt 秒（最大 32 秒）
-                    wait_time = min(2 ** attempt, 32)
-                    time.sleep(wait_time)
-
+                except (httpx.HTTPError, SolanaRpcException, RPCException) as e:
+                    # 参数错误等永久的 JSON-RPC 错误重试也不会成功
+                    if isinstance(e, RPCException) and not is_retryable_rpc_error(e.args[0] if e.args else None):
+                        raise
                     attempt += 1
+                    if attempt >= max_retries:
+                        logging.error(
+                            f"Failed to fetch transactions for {market_address} {slot_range} after {max_retries} attempts.")
+                        raise
+                    logging.warning(f"Request failed: {getattr(e, 'error_msg', e)}. Retrying... (Attempt {attempt})")
+
+                    # 指数退避 + 抖动（最大 32 秒），限流由端点共享的 RateLimiter 统一调节
+                    wait_time = tx_fetcher.endpoint_pool.backoff(attempt)
+                    time.sleep(min(wait_time, 32))
+
+        # **每个 (交易池, 子区间) 是一个任务，使用 `ThreadPoolExecutor` 进行多线程查询**
+        # 每个时间窗口至少一个子区间，窗口边界也是子区间边界（同一边界 Slot 的游标只请求一次）
+        parts_per_range = max(1, parts // len(slot_ranges))
+        tasks = [
+            (market_address, slot_range)
+            for market_address in market_address_list
+            for partition in slot_ranges
+            for slot_range in tx_fetcher.split_slot_range(parts_per_range, partition)
+        ]
+        with TRACER.span("fetch_signatures", pair=file_name, tasks=len(tasks)), \
+                concurrent.futures.ThreadPoolExecutor(max_workers=max_threads) as executor:
+            # bind_context：工作线程沿用当前交易对的 RPC 预算归属与追踪上下文
+            futures = [executor.submit(bind_context(fetch_for_market), *task) for task in tasks]
+            # 逐个取结果：重试耗尽的子区间抛出异常而不是被静默丢弃（断点清单保留游标，重新运行时继续）
+            for future in futures:
+                future.result()
+
+    def read_existing_data_signatures(self, symbol1, symbol2):
+        """
+        读取 `DATA/symbol1_symbol2.csv` 与 `DATA/symbol2_symbol1.csv` 中已解码的交易签名
+        """
+        data_file1 = os.path.join(CONFIG["output_path"], "DATA", f"{symbol1}_{symbol2}.csv")
+        data_file2 = os.path.join(CONFIG["output_path"], "DATA", f"{symbol2}_{symbol1}.csv")
+
+        # 读取 datafile1 和 datafile2，如果不存在则返回空 DataFrame
+        def load_data_file(file_path):
+            return pd.read_csv(file_path, usecols=["Signature"]) if os.path.exists(file_path) else pd.DataFrame(
+                columns=["Signature"])
 
-            if attempt == max_retries:
-                logging.error(
-                    f"Failed to fetch transactions for {market_address} after {max_retries} attempts. Skipping...")
+        df_data1 = load_data_file(data_file1)
+        df_data2 = load_data_file(data_file2)
 
-        # **使用 `ThreadPoolExecutor` 进行多线程查询**
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_threads) as executor:
-            executor.map(fetch_for_market, market_address_list)
+        # 合并 data_file1 和 data_file2 的 Signature
+        return set(df_data1["Signature"]).union(set(df_data2["Signature"]))
 
+    @traced("read_signatures")
     def read_signatures_file(self, symbol1, symbol2):
         """
         读取 `SIGNATURE_symbol1_symbol2.csv` 并返回符合 slot 过滤条件的交易签名
         """
         sig_file = os.path.join(CONFIG["output_path"], "SIGNATURE", f"{symbol1}_{symbol2}.csv")
-        data_file1 = os.path.join(CONFIG["output_path"], "DATA", f"{symbol1}_{symbol2}.csv")
-        data_file2 = os.path.join(CONFIG["output_path"], "DATA", f"{symbol2}_{symbol1}.csv")
 
         if not os.path.exists(sig_file):
             print(f"❌ 签名文件未找到: {sig_file}")
@@ -184,16 +291,7 @@ class SolanaFetcher:
 
         print(f"🔍 读取交易签名文件: {sig_file}")
 
-        # 读取 datafile1 和 datafile2，如果不存在则返回空 DataFrame
-        def load_data_file(file_path):
-            return pd.read_csv(file_path, usecols=["Signature"]) if os.path.exists(file_path) else pd.DataFrame(
-                columns=["Signature"])
-
-        df_data1 = load_data_file(data_file1)
-        df_data2 = load_data_file(data_file2)
-
-        # 合并 data_file1 和 data_file2 的 Signature
-        existing_signatures = set(df_data1["Signature"]).union(set(df_data2["Signature"]))
+        existing_signatures = self.read_existing_data_signatures(symbol1, symbol2)
 
         # 读取 sig_file 并进行过滤
         filtered_signatures = []
@@ -211,15 +309,23 @@ class SolanaFetcher:
 
         return filtered_signatures
 
-    def process_signatures_in_batches(self, tx_signatures):
+    @traced("decode")
+    def process_signatures_in_batches(self, tx_signatures, rpc_batch_size=None, max_workers=None):
         """
         多线程处理交易签名，并分配到不同的 LogDecoder（Solana RPC 端点）
+        :param tx_signatures: [(signature, market_address), ...]
+        :param rpc_batch_size: 每个 JSON-RPC 批量请求包含的交易数（默认读取 CONFIG["rpc_batch_size"]，1 表示逐笔请求）
+        :param max_workers: 解码线程数（默认读取 CONFIG["decode_threads"]，未配置时为每个 LogDecoder 100 个请求在途）
         """
         if not tx_signatures:
             print("⚠️ 没有符合条件的交易签名，跳过解码！")
             return
 
-        N = len(self.log_decoders) * 100  # 最大线程数
+        rpc_batch_size = max(1, rpc_batch_size or CONFIG.get("rpc_batch_size", 1))
+
+        # 批量请求时每个线程同时处理 rpc_batch_size 笔交易，线程数相应减少，保持在途交易数不变
+        N = max_workers or CONFIG.get("decode_threads") or max(len(self.log_decoders),
+                                                               len(self.log_decoders) * 100 // rpc_batch_size)  # 最大线程数
         total_tasks = len(tx_signatures)
 
         # **1️⃣ 创建全局进度条**
@@ -241,50 +347,332 @@ class SolanaFetcher:
                 start_time = time.time()
                 print(f"\n✅ 已建立 {thread_id} 号线程，使用 RPC {log_decoder.solana_client._provider.endpoint_uri}")
 
-                for transaction_signature, market_address in batch:
-                    log_decoder.decode(transaction_signature, market_address)
-                    with lock:
-                        global_progress.update(1)
+                with TRACER.span("decode_batch", thread_id=thread_id, size=len(batch)):
+                    if rpc_batch_size > 1:
+                        for i in range(0, len(batch), rpc_batch_size):
+                            rpc_batch = batch[i:i + rpc_batch_size]
+                            with TRACER.span("decode_rpc_batch", category="decode", sample=True, size=len(rpc_batch)):
+                                log_decoder.decode_batch(rpc_batch)
+                            with lock:
+                                global_progress.update(len(rpc_batch))
+                    else:
+                        for transaction_signature, market_address in batch:
+                            with TRACER.span("decode_tx", category="decode", sample=True):
+                                log_decoder.decode(transaction_signature, market_address)
+                            with lock:
+                                global_progress.update(1)
 
                 elapsed_time = time.time() - start_time
                 print(f"\n✅ 线程 {thread_id} 处理完成，共处理 {len(batch)} 笔交易，耗时 {elapsed_time:.2f} 秒")
 
             # **4️⃣ 提交任务**
             for idx, batch in enumerate(batches):
-                log_decoder = self.log_decoders[idx % len(self.log_decoders)]  # 轮询选择不同的 RPC 节点
-                futures.append(executor.submit(process_batch, batch, idx, log_decoder))
+                # LogDecoder 共享 EndpointPool，每个请求实际发往此刻最快的健康节点
+                log_decoder = self.log_decoders[idx % len(self.log_decoders)]
+                futures.append(executor.submit(bind_context(process_batch), batch, idx, log_decoder))
 
             # **5️⃣ 等待所有线程完成**
             concurrent.futures.wait(futures)
             global_progress.close()
 
-    def run(self):
+    @traced("streaming")
+    def process_signatures_streaming(self, symbol1, symbol2, queue_size=None, rpc_batch_size=None):
         """
-        运行 SolanaFetcher，处理所有 `mint1, mint2` 交易对
+        流式处理：签名抓取与解码同时进行。
+        每获取一页签名就放入有界队列，解码线程立即消费；队列满时抓取线程阻塞（背压）。
+        签名 CSV 仍照常写入。
+        :param queue_size: 队列容量（默认读取 CONFIG["stream_queue_size"]）
+        :param rpc_batch_size: 每个 JSON-RPC 批量请求包含的交易数（默认读取 CONFIG["rpc_batch_size"]）
         """
-        self.print_stage_header("SOL_FETCHER STARTING")
+        queue_size = queue_size or CONFIG.get("stream_queue_size", 10000)
+        rpc_batch_size = max(1, rpc_batch_size or CONFIG.get("rpc_batch_size", 1))
+        N = max(len(self.log_decoders), len(self.log_decoders) * 100 // rpc_batch_size)  # 解码线程数
+
+        existing_signatures = self.read_existing_data_signatures(symbol1, symbol2)
+        task_queue = queue.Queue(maxsize=queue_size)
+        STREAM_QUEUE.track(task_queue.qsize)
+        seen_lock = threading.Lock()
+
+        global_progress = tqdm(desc="Streaming Progress", position=0, leave=True, dynamic_ncols=True, unit="tx")
+        progress_lock = threading.Lock()
+
+        def on_page(entries):
+            """ 抓取线程回调：去重后入队，队列满时阻塞 """
+            for entry in entries:
+                with seen_lock:
+                    if entry[0] in existing_signatures:
+                        continue
+                    existing_signatures.add(entry[0])  # 重试时同一页会再次出现
+                task_queue.put(entry)
+
+        def consume(log_decoder):
+            """ 解码线程：不断从队列取签名解码，遇到结束标记退出 """
+            finished = False
+            while not finished:
+                # 批量模式下尽量凑满一个批次，但不等待；每个线程只取走一个结束标记
+                batch = []
+                entry = task_queue.get()
+                while entry is not None:
+                    batch.append(entry)
+                    if len(batch) >= rpc_batch_size:
+                        break
+                    try:
+                        entry = task_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                finished = entry is None
+                if not batch:
+                    continue
 
-        # 获取所有交易对
-        token_pairs = self.read_input()
+                with TRACER.span("decode_batch", category="decode", sample=True, size=len(batch)):
+                    if rpc_batch_size > 1:
+                        log_decoder.decode_batch(batch)
+                    else:
+                        for transaction_signature, market_address in batch:
+                            log_decoder.decode(transaction_signature, market_address)
+                with progress_lock:
+                    global_progress.update(len(batch))
 
-        for mint1, mint2 in token_pairs:
-            self.print_stage_header("FETCHING POOL")
-            symbol1, symbol2 = self.fetch_pool_by_token(mint1, mint2)
+        start_time = time.time()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=N) as executor:
+            consumers = [
+                executor.submit(bind_context(consume), self.log_decoders[idx % len(self.log_decoders)])
+                for idx in range(N)
+            ]
+            try:
+                # 断点续传时，之前已写入 SIGNATURE 但尚未解码的签名不会再出现在分页中，先入队
+                sig_file = os.path.join(CONFIG["output_path"], "SIGNATURE", f"{symbol1}_{symbol2}.csv")
+                if os.path.exists(sig_file):
+                    on_page(self.read_signatures_file(symbol1, symbol2))
+                self.fetch_transactions_for_pool(symbol1, symbol2, on_page=on_page)
+            finally:
+                # 每个解码线程一个结束标记
+                for _ in consumers:
+                    task_queue.put(None)
+            concurrent.futures.wait(consumers)
+        global_progress.close()
+
+        elapsed_time = time.time() - start_time
+        print(f"\n✅ 流式处理完成，共解码 {global_progress.n} 笔交易，耗时 {elapsed_time:.2f} 秒")
+
+    @traced("decode_async")
+    def process_signatures_async(self, tx_signatures):
+        """
+        使用 asyncio 引擎解码交易签名：单事件循环 + 每个端点有界并发 + 单一写入者
+        """
+        engine = AsyncDecodeEngine(self.rpc_urls, self.log_decoders[0])
+        engine.run(tx_signatures)
 
-            # 识别非稳定币
-            unstable_symbol = symbol1 if symbol2 in self.stable_symbols else symbol2
-            self.print_stage_header(f"SUCCESS FETCH POOL BY {symbol1} {symbol2}")
+    @traced("decode_processes")
+    def process_signatures_processes(self, tx_signatures):
+        """
+        使用多进程引擎解码交易签名：I/O 线程只获取原始响应，子进程批量解析，结果交给唯一的 DataWriter
+        """
+        engine = ProcessDecodeEngine(self.log_decoders, self.data_writer)
+        engine.run(tx_signatures)
+
+    @traced("block_scan")
+    def process_block_scan(self, slot_ranges=None):
+        """
+        区块扫描模式：逐个 Slot 获取完整区块，一遍提取 RESULT/POOL 中所有交易池的交易
+        :param slot_ranges: 要扫描的 Slot 区间列表（默认为 self.slot_partitions）
+        :return: 重新扫描后仍获取失败的 Slot 列表
+        """
+        failed_slots = []
+        for start_slot, end_slot in slot_ranges or self.slot_partitions:
+            scanner = BlockScanner(start_slot, end_slot, self.log_decoders[0])
+            failed = scanner.run()
+            if failed:
+                # 临时故障的 Slot 再扫描一次
+                print(f"🔁 重新扫描 {len(failed)} 个获取失败的 Slot")
+                failed = scanner.run(slots=failed)
+            failed_slots.extend(failed)
+        self.data_writer.flush()
+        if failed_slots:
+            print(f"🚨 {len(failed_slots)} 个 Slot 仍获取失败，其中的交易未写入，请稍后重新运行区块扫描")
+        return failed_slots
+
+    def plan_ingest(self, token_symbols):
+        """
+        对每个 Slot 子区间采样交易密度，选择区块扫描或逐笔抓取（计划会输出到日志）
+        :param token_symbols: [(symbol1, symbol2), ...]
+        :return: IngestPlanner.plan() 的结果
+        """
+        pools = {}
+        for symbol1, symbol2 in token_symbols:
+            for pool_id in self.read_pool_file(symbol1, symbol2):
+                pools[pool_id] = f"{symbol1}_{symbol2}"
+        return IngestPlanner(self.log_decoders[0]).plan(pools, self.slot_partitions)
+
+    @traced("run_planned")
+    def run_planned(self, token_symbols, engine):
+        """
+        按抓取计划执行：区块扫描的子区间一次覆盖所有交易对，其余子区间逐个交易对抓取签名后解码
+        """
+        self.print_stage_header("PLANNING")
+        plan = self.plan_ingest(token_symbols)
+
+        block_ranges = [(entry["start_slot"], entry["end_slot"]) for entry in plan if entry["mode"] == "blocks"]
+        signature_ranges = [(entry["start_slot"], entry["end_slot"]) for entry in plan if entry["mode"] == "signatures"]
 
-            # 获取交易签名
-            self.print_stage_header("FETCHING TX")
-            self.fetch_transactions_for_pool(symbol1, symbol2)
-            self.print_stage_header("FETCH TX SUCCESS")
+        if block_ranges:
+            self.print_stage_header("BLOCK SCAN")
+            self.process_block_scan(block_ranges)
+
+        if not signature_ranges:
+            return
+        for symbol1, symbol2 in token_symbols:
+            self.print_stage_header(f"FETCHING TX {symbol1} {symbol2}")
+            self.fetch_transactions_for_pool(symbol1, symbol2, slot_ranges=signature_ranges)
 
-            #
             self.print_stage_header("DECODING TX LOGS")
             tx_signatures = self.read_signatures_file(symbol1, symbol2)
+            if engine == "async":
+                self.process_signatures_async(tx_signatures)
+            elif engine == "processes":
+                self.process_signatures_processes(tx_signatures)
+            else:
+                self.process_signatures_in_batches(tx_signatures)
+            self.data_writer.flush()
+
+    def read_all_pools(self):
+        """
+        获取所有交易对的交易池
+        :return: {pool_id: SIGNATURE 文件名}
+        """
+        pools = {}
+        for mint1, mint2 in self.read_input():
+            self.print_stage_header("FETCHING POOL")
+            symbol1, symbol2 = self.fetch_pool_by_token(mint1, mint2)
+            for pool_id in self.read_pool_file(symbol1, symbol2):
+                pools[pool_id] = f"{symbol1}_{symbol2}.csv"
+            self.print_stage_header(f"SUCCESS FETCH POOL BY {symbol1} {symbol2}")
+        return pools
+
+    def follow(self, poll_interval=None, max_polls=None):
+        """
+        持续跟踪模式：获取所有交易对的交易池后，只轮询每个交易池高水位之后的新签名并解码，
+        第一次跟踪从 end_slot 之后开始（可先用 run() 回填历史范围）
+        :param poll_interval: 轮询间隔（秒，默认读取 CONFIG["follow_poll_interval"]）
+        :param max_polls: 最多轮询多少轮（默认一直运行，Ctrl+C 停止）
+        """
+        self.print_stage_header("SOL_FETCHER FOLLOW MODE")
+        pools = self.read_all_pools()
+        self.print_stage_header("FOLLOWING NEW TX")
+        PoolFollower(self, pools, poll_interval=poll_interval).run(max_polls=max_polls)
+
+    def subscribe(self, ws_url=None, max_seconds=None):
+        """
+        推送模式：websocket logsSubscribe 订阅所有交易池，收到通知立即解码；
+        （重新）连接后从高水位补齐缺口，与 follow() 共用高水位，websocket 不可用时退回轮询
+        :param ws_url: websocket 端点（默认读取 CONFIG["ws_url"]）
+        :param max_seconds: 最多运行多少秒（默认一直运行，Ctrl+C 停止）
+        """
+        self.print_stage_header("SOL_FETCHER SUBSCRIBE MODE")
+        pools = self.read_all_pools()
+        self.print_stage_header("SUBSCRIBING NEW TX")
+        LogSubscriber(self, pools, ws_url=ws_url).run(max_seconds=max_seconds)
+
+    @traced("SolanaFetcher.run")
+    def run(self, engine=None, streaming=False, block_scan=None):
+        """
+        运行 SolanaFetcher，处理所有 `mint1, mint2` 交易对
+        :param engine: 解码引擎，"threads"（线程池）、"async"（asyncio）或 "processes"（多进程解析），
+                       默认读取 CONFIG["decode_engine"]
+        :param streaming: 是否启用流式模式（签名抓取与解码同时进行，使用线程解码）
+        :param block_scan: True 使用区块扫描模式，"auto" 按采样的交易密度逐个子区间选择区块扫描或逐笔抓取，
+                           默认读取 CONFIG["block_scan_enabled"]
+        """
+        engine = engine or CONFIG.get("decode_engine", "threads")
+        block_scan = CONFIG.get("block_scan_enabled", False) if block_scan is None else block_scan
+        self.print_stage_header("SOL_FETCHER STARTING")
+
+        # 获取所有交易对
+        token_pairs = self.read_input()
+
+        if block_scan:
+            # 先获取全部交易池，再用一遍区块扫描覆盖所有交易对
+            token_symbols = []
+            for mint1, mint2 in token_pairs:
+                self.print_stage_header("FETCHING POOL")
+                symbol1, symbol2 = self.fetch_pool_by_token(mint1, mint2)
+                token_symbols.append((symbol1, symbol2))
+                self.print_stage_header(f"SUCCESS FETCH POOL BY {symbol1} {symbol2}")
+            if block_scan == "auto":
+                self.run_planned(token_symbols, engine)
+            else:
+                self.print_stage_header("BLOCK SCAN")
+                self.process_block_scan()
+            self.print_stage_header("BLOCK SCAN SUCCESS")
+        elif CONFIG.get("pair_scheduler_enabled", True) and len(token_pairs) > 1:
+            # 多个交易对共享全局 RPC 预算并发处理
+            PairScheduler(self).run(token_pairs, engine=engine, streaming=streaming)
+        else:
+            for mint1, mint2 in token_pairs:
+                self.run_pair(mint1, mint2, engine=engine, streaming=streaming)
+        ProcessDecodeEngine.shutdown_shared()  # 所有交易对共用的解码子进程不再需要
+
+        if CONFIG.get("candles_enabled", True):
+            self.build_candles()
+
+    def build_candles(self, rebuild=False):
+        """
+        由 RESULT/DATA 增量构建各交易对的 OHLCV / VWAP K 线（RESULT/CANDLE）
+        :param rebuild: 忽略已有状态，全部重建
+        """
+        self.data_writer.flush()
+        self.print_stage_header("BUILDING CANDLES")
+        return CandleBuilder().build(rebuild=rebuild)
+
+    @traced("pair")
+    def run_pair(self, mint1, mint2, engine=None, streaming=False, on_stage=None):
+        """
+        处理一个交易对：获取交易池 -> 获取交易签名 -> 解码
+        :param engine: 解码引擎（同 run）
+        :param streaming: 是否启用流式模式（同 run）
+        :param on_stage: 可选回调 on_stage(stage, symbol1, symbol2)，每进入一个阶段调用一次（PairScheduler 用于汇报进度）
+        :return: (symbol1, symbol2)
+        """
+        engine = engine or CONFIG.get("decode_engine", "threads")
+        on_stage = on_stage or (lambda stage, symbol1, symbol2: None)
+
+        on_stage("pool", None, None)
+        self.print_stage_header("FETCHING POOL")
+        symbol1, symbol2 = self.fetch_pool_by_token(mint1, mint2)
+
+        # 识别非稳定币
+        unstable_symbol = symbol1 if symbol2 in self.stable_symbols else symbol2
+        self.print_stage_header(f"SUCCESS FETCH POOL BY {symbol1} {symbol2}")
+
+        if streaming:
+            on_stage("streaming", symbol1, symbol2)
+            self.print_stage_header("STREAMING TX FETCH + DECODE")
+            self.process_signatures_streaming(symbol1, symbol2)
+            with TRACER.span("flush_data"):
+                self.data_writer.flush()
+            self.print_stage_header("STREAMING SUCCESS")
+            return symbol1, symbol2
+
+        # 获取交易签名
+        on_stage("signatures", symbol1, symbol2)
+        self.print_stage_header("FETCHING TX")
+        self.fetch_transactions_for_pool(symbol1, symbol2)
+        self.print_stage_header("FETCH TX SUCCESS")
+
+        #
+        on_stage("decode", symbol1, symbol2)
+        self.print_stage_header("DECODING TX LOGS")
+        tx_signatures = self.read_signatures_file(symbol1, symbol2)
+        if engine == "async":
+            self.process_signatures_async(tx_signatures)
+        elif engine == "processes":
+            self.process_signatures_processes(tx_signatures)
+        else:
             self.process_signatures_in_batches(tx_signatures)
-            self.print_stage_header("DECODING TX SUCCESS")
+        with TRACER.span("flush_data"):
+            self.data_writer.flush()
+        self.print_stage_header("DECODING TX SUCCESS")
+        return symbol1, symbol2
 
 # ========== 主函数 ========== #
 if __name__ == "__main__":
@@ -0,0 +1,281 @@
+import atexit
+import bisect
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import config
+
+CONFIG = config.CONFIG  # 直接使用 CONFIG
+
+
+class SlotIndex:
+    """
+    Slot ↔ blockTime 的持久化稀疏索引：
+    - 磁盘上是按 slot 升序排列的定长记录 (slot, blockTime)，通过 mmap 只读映射后二分查找
+    - 新记录先进入内存缓冲（按 slot / blockTime 有序维护，查找同样是二分），flush 时与磁盘记录归并并原子替换文件；
+      每次写盘使用唯一的临时文件，多个进程同时写盘不会交错写入同一个文件
+    - blockTime 为 SKIPPED 的记录表示该 Slot 已确认被跳过
+    """
+
+    RECORD = struct.Struct("<qq")  # (slot, blockTime)，每条 16 字节
+    SKIPPED = -1
+
+    _shared_instances = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, index_file=None, flush_threshold=50000):
+        """
+        :param index_file: 索引文件路径（默认 RESULT/INDEX/slot_index.bin）
+        :param flush_threshold: 内存缓冲达到多少条记录时自动写盘
+        """
+        self.index_file = index_file or os.path.join(CONFIG["output_path"], "INDEX", "slot_index.bin")
+        os.makedirs(os.path.dirname(self.index_file) or ".", exist_ok=True)
+        self.flush_threshold = flush_threshold
+
+        self._lock = threading.RLock()
+        self._pending = {}  # slot -> blockTime，尚未写盘的记录
+        self._pending_slots = []  # 缓冲中的全部 slot（升序）
+        self._pending_times = []  # 缓冲中的有效记录 (blockTime, slot)（升序）
+        self._file = None
+        self._mmap = None
+        self._count = 0
+        self._open()
+
+        atexit.register(self.flush)
+
+    @classmethod
+    def shared(cls, index_file=None):
+        """
+        获取进程内共享的索引实例（同一路径只打开一次）
+        """
+        index_file = index_file or os.path.join(CONFIG["output_path"], "INDEX", "slot_index.bin")
+        with cls._shared_lock:
+            if index_file not in cls._shared_instances:
+                cls._shared_instances[index_file] = cls(index_file)
+            return cls._shared_instances[index_file]
+
+    def _open(self):
+        """ 只读映射索引文件 """
+        if not os.path.exists(self.index_file) or os.path.getsize(self.index_file) < self.RECORD.size:
+            return
+        self._file = open(self.index_file, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._count = len(self._mmap) // self.RECORD.size
+
+    def _close(self):
+        """ 释放映射（Windows 下替换文件前必须先关闭） """
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._count = 0
+
+    def _record_at(self, position):
+        return self.RECORD.unpack_from(self._mmap, position * self.RECORD.size)
+
+    def _iter_records(self):
+        for position in range(self._count):
+            yield self._record_at(position)
+
+    def __len__(self):
+        with self._lock:
+            return self._count + len(self._pending)
+
+    def record(self, slot, block_time):
+        """
+        记录一个 (slot, blockTime) 锚点，blockTime 为 None 时忽略
+        """
+        if slot is None or block_time is None:
+            return
+        slot, block_time = int(slot), int(block_time)
+        with self._lock:
+            previous = self._pending.get(slot)
+            if previous == block_time:
+                return
+            if previous is None:
+                bisect.insort(self._pending_slots, slot)
+            elif previous != self.SKIPPED:
+                del self._pending_times[bisect.bisect_left(self._pending_times, (previous, slot))]
+            self._pending[slot] = block_time
+            bisect.insort(self._pending_times, (block_time, slot))
+            if len(self._pending) >= self.flush_threshold:
+                self.flush()
+
+    def record_skipped(self, slot):
+        """
+        记录一个已确认被跳过的 Slot
+        """
+        slot = int(slot)
+        with self._lock:
+            if slot in self._pending:
+                return
+            self._pending[slot] = self.SKIPPED
+            bisect.insort(self._pending_slots, slot)
+            if len(self._pending) >= self.flush_threshold:
+                self.flush()
+
+    def flush(self):
+        """
+        将内存缓冲与磁盘记录归并后原子写回索引文件
+        """
+        with self._lock:
+            if not self._pending:
+                return
+            pending = sorted(self._pending.items())
+
+            # 重新映射磁盘上的最新版本（其他进程可能已经写盘），归并后写入本次独有的临时文件
+            self._close()
+            self._open()
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(self.index_file) or ".", suffix=".tmp",
+                                             prefix=os.path.basename(self.index_file) + ".", delete=False) as file:
+                tmp_file = file.name
+                try:
+                    # 同一 slot 同时出现在缓冲与磁盘时，归并顺序中最后一条的 blockTime 最大，
+                    # 因此保留最后一条即可让有效时间覆盖跳过标记
+                    previous = None
+                    for record in heapq.merge(pending, self._iter_records()):
+                        if previous is not None and record[0] != previous[0]:
+                            file.write(self.RECORD.pack(*previous))
+                        previous = record
+                    if previous is not None:
+                        file.write(self.RECORD.pack(*previous))
+                except BaseException:
+                    file.close()
+                    os.remove(tmp_file)
+                    raise
+
+            self._close()
+            os.replace(tmp_file, self.index_file)
+            self._pending.clear()
+            self._pending_slots.clear()
+            self._pending_times.clear()
+            self._open()
+
+    def _lookup_mapped(self, slot, default=None):
+        """ 在 mmap 中二分查找 slot """
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            mid_slot, mid_time = self._record_at(mid)
+            if mid_slot == slot:
+                return mid_time
+            if mid_slot < slot:
+                low = mid + 1
+            else:
+                high = mid
+        return default
+
+    def lookup(self, slot):
+        """
+        查询 slot 的 blockTime：返回时间戳、SKIPPED 或 None（未知）
+        """
+        with self._lock:
+            if slot in self._pending:
+                return self._pending[slot]
+            return self._lookup_mapped(slot)
+
+    def _valid_at_or_before(self, position):
+        """ 从 position 向左找到最近的有效（非跳过）记录 """
+        while position >= 0:
+            slot, block_time = self._record_at(position)
+            if block_time != self.SKIPPED:
+                return position, slot, block_time
+            position -= 1
+        return None
+
+    def _mapped_position(self, slot):
+        """ mmap 中首个 slot >= 给定 slot 的记录位置 """
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            if self._record_at(mid)[0] < slot:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def _mapped_bracket(self, target_timestamp):
+        """ 仅在 mmap 记录中查找区间 """
+        if self._count == 0:
+            return None, None
+
+        # 二分查找首个 blockTime >= 目标的有效记录（跳过的记录按其左侧有效记录比较）
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            valid = self._valid_at_or_before(mid)
+            if valid is not None and valid[2] >= target_timestamp:
+                high = mid
+            else:
+                low = mid + 1
+
+        upper = None
+        position = low
+        while position < self._count:
+            slot, block_time = self._record_at(position)
+            if block_time != self.SKIPPED:
+                upper = (slot, block_time)
+                break
+            position += 1
+
+        lower = None
+        valid = self._valid_at_or_before(low - 1)
+        if valid is not None:
+            lower = (valid[1], valid[2])
+        return lower, upper
+
+    def bracket(self, target_timestamp):
+        """
+        根据已知锚点（包括尚未写盘的记录）给出目标时间所在的区间。
+        :param target_timestamp: 目标时间（Unix 时间戳）
+        :return: (lower, upper, exact)
+                 lower = (slot, blockTime < 目标) 或 None
+                 upper = (slot, blockTime >= 目标) 或 None
+                 exact 为 True 表示两者之间的 Slot 均已确认跳过，upper 即为首个时间 >= 目标的 Slot
+        """
+        with self._lock:
+            lower, upper = self._mapped_bracket(target_timestamp)
+
+            # 缓冲中的有效记录按 (blockTime, slot) 有序：二分得到两侧最近的记录
+            position = bisect.bisect_left(self._pending_times, (target_timestamp,))
+            if position > 0:
+                block_time, slot = self._pending_times[position - 1]
+                if lower is None or slot > lower[0]:
+                    lower = (slot, block_time)
+            if position < len(self._pending_times):
+                block_time, slot = self._pending_times[position]
+                if upper is None or slot < upper[0]:
+                    upper = (slot, block_time)
+
+            exact = False
+            if lower is not None and upper is not None:
+                # 两个锚点之间已知的记录只可能是跳过标记；数量等于 Slot 差值时区间已无未知 Slot
+                known_between = self._mapped_position(upper[0]) - self._mapped_position(lower[0] + 1)
+                start = bisect.bisect_right(self._pending_slots, lower[0])
+                stop = bisect.bisect_left(self._pending_slots, upper[0])
+                known_between += sum(
+                    1 for slot in self._pending_slots[start:stop] if self._lookup_mapped(slot) is None
+                )
+                exact = upper[0] - lower[0] - 1 == known_between
+
+            return lower, upper, exact
+
+    def close(self):
+        """
+        写盘并释放映射
+        """
+        with self._lock:
+            self.flush()
+            self._close()
+
+
+# ========== 使用示例 ==========
+if __name__ == "__main__":
+    index = SlotIndex.shared()
+    print(f"索引文件: {index.index_file}，已知锚点: {len(index)}")
+    print(index.bracket(1740614400))
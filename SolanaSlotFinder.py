@@ -1,21 +1,36 @@
 import datetime
-import time
-from solana.rpc.api import Client
+import math
 from solana.rpc.core import RPCException
+import config
+from SlotIndex import SlotIndex
+from EndpointPool import EndpointPool
+
+CONFIG = config.CONFIG  # 直接使用 CONFIG
 
 class SolanaSlotFinder:
-    def __init__(self, rpc_url):
+    SLOT_SECONDS = 0.4  # Solana 出块间隔约 400ms
+    MAX_SKIP_PROBE = 16  # 遇到跳过的 Slot 时，向两侧最多探测的距离
+
+    def __init__(self, rpc_url, search_mode="interpolation", slot_index=None):
         """
         初始化 Solana 客户端
+        :param rpc_url: Solana RPC 端点
+        :param search_mode: Slot 查找方式，"interpolation"（插值查找，默认）或 "binary"（二分查找）
+        :param slot_index: SlotIndex 实例（默认使用共享的持久化索引，CONFIG["slot_index_enabled"] 为 False 时不使用）
         """
-        self.solana_client = Client(rpc_url)
+        self.endpoint_pool = EndpointPool.for_url(rpc_url)
+        self.solana_client = self.endpoint_pool.client_for(rpc_url)
+        self.search_mode = search_mode
+        if slot_index is None and CONFIG.get("slot_index_enabled", True):
+            slot_index = SlotIndex.shared()
+        self.slot_index = slot_index
         print(f"SolanaSlotFinder initial success by node: {rpc_url}",)
 
     def get_latest_slot(self):
         """
         获取最新的 Slot，确保返回整数值。
         """
-        latest_slot_response = self.solana_client.get_slot()
+        latest_slot_response = self.endpoint_pool.call("get_slot")
         if hasattr(latest_slot_response, "value"):
             return latest_slot_response.value
         raise ValueError(f"Unexpected get_slot() response: {latest_slot_response}")
@@ -23,24 +38,94 @@ class SolanaSlotFinder:
     def get_block_time(self, slot):
         """
         获取某个 slot 的 Unix 时间戳，并处理跳过的 Slot 错误。
+        已在索引中的 Slot 直接返回，RPC 探测结果会写回索引。
+        """
+        block_time = self.probe_block_time(slot)
+        return None if block_time == SlotIndex.SKIPPED else block_time
+
+    def probe_block_time(self, slot):
         """
-        time.sleep(0.02)
+        与 get_block_time 相同，但区分两种没有时间戳的情况
+        :return: 时间戳；Slot 被跳过时返回 SlotIndex.SKIPPED；没有区块可用（早于最早可用区块 / 历史已清理）时返回 None
+        """
+        if self.slot_index is not None:
+            known = self.slot_index.lookup(slot)
+            if known is not None:
+                return known
+
         try:
-            result = self.solana_client.get_block_time(slot)
+            result = self.endpoint_pool.call("get_block_time", slot)
             if hasattr(result, "value") and isinstance(result.value, int):
+                if self.slot_index is not None:
+                    self.slot_index.record(slot, result.value)
                 return result.value
         except RPCException as e:
             if "SlotSkippedMessage" in str(e):
-                return None  # 跳过该 Slot
+                if self.slot_index is not None:
+                    self.slot_index.record_skipped(slot)
+                return SlotIndex.SKIPPED  # 跳过该 Slot
         return None  # 未找到时间信息
 
+    def probe_nearby(self, slot, low, high):
+        """
+        探测 slot 的时间戳；若该 Slot 被跳过，则在 (low, high) 开区间内向两侧交替探测最近的有效 Slot。
+        :param slot: 期望探测的 Slot
+        :param low: 探测下界（不含）
+        :param high: 探测上界（不含）
+        :return: (有效 Slot, 时间戳)，区间内未找到时返回 None
+        """
+        for distance in range(self.MAX_SKIP_PROBE + 1):
+            for candidate in ((slot,) if distance == 0 else (slot + distance, slot - distance)):
+                if low < candidate < high:
+                    block_time = self.get_block_time(candidate)
+                    if block_time is not None:
+                        return candidate, block_time
+            if slot + distance >= high - 1 and slot - distance <= low + 1:
+                break  # 区间已全部探测完
+        return None
+
+    def probe_upward(self, slot, high):
+        """
+        从 slot 向上探测第一个有效区块（最多 MAX_SKIP_PROBE 个被跳过的 Slot，且 < high）；
+        遇到没有区块可用的 Slot 立即停止：它之下的历史同样不可用，不必继续探测
+        :return: ((有效 Slot, 时间戳) 或 None, 最后探测的 Slot)
+        """
+        candidate = slot
+        for candidate in range(slot, min(slot + self.MAX_SKIP_PROBE + 1, high)):
+            block_time = self.probe_block_time(candidate)
+            if block_time is None:
+                break
+            if block_time != SlotIndex.SKIPPED:
+                return (candidate, block_time), candidate
+        return None, candidate
+
     def find_closest_slot(self, target_timestamp):
         """
-        使用二分查找找到最接近目标时间的 Solana Slot。
+        找到最接近目标时间的 Solana Slot。
         :param target_timestamp: 目标时间（Unix 时间戳）
         :return: 最接近的 slot
         """
         print("find_closest_slot of:", target_timestamp)
+        if self.search_mode == "binary":
+            closest_slot = self.binary_search_slot(target_timestamp)
+        elif self.slot_index is not None:
+            # 先从索引取区间：已无未知 Slot 时直接作答，否则只用 RPC 细化该区间
+            lower, upper, exact = self.slot_index.bracket(target_timestamp)
+            if exact:
+                closest_slot = upper[0]
+            else:
+                closest_slot = self.interpolation_search_slot(target_timestamp, lower, upper)
+        else:
+            closest_slot = self.interpolation_search_slot(target_timestamp)
+        print(f"Closest slot to {target_timestamp}: {closest_slot}")
+        return closest_slot
+
+    def binary_search_slot(self, target_timestamp):
+        """
+        使用二分查找找到最接近目标时间的 Solana Slot。
+        :param target_timestamp: 目标时间（Unix 时间戳）
+        :return: 最接近的 slot
+        """
         latest_slot = self.get_latest_slot()
         start_slot, end_slot = 1, latest_slot
         closest_slot, closest_time_diff = None, float("inf")
@@ -62,9 +147,154 @@ class SolanaSlotFinder:
             else:
                 end_slot = mid_slot - 1
 
-        print(f"Closest slot to {target_timestamp}: {closest_slot}")
         return closest_slot
 
+    def latest_anchor(self):
+        """
+        获取最新的有效区块锚点 (slot, block_time)
+        """
+        latest_slot = self.get_latest_slot()
+        anchor = self.probe_nearby(latest_slot, 0, latest_slot + 1)
+        if anchor is None:
+            raise ValueError(f"No confirmed block found near latest slot {latest_slot}")
+        return anchor
+
+    def interpolation_search_slot(self, target_timestamp, lower=None, upper=None):
+        """
+        利用 ~400ms 的出块节奏与已探测锚点之间的割线插值，查找首个时间戳 >= 目标时间的 Slot。
+        :param target_timestamp: 目标时间（Unix 时间戳）
+        :param lower: 可选的已知下界锚点 (slot, block_time)，要求 block_time < 目标时间
+        :param upper: 可选的已知上界锚点 (slot, block_time)，要求 block_time >= 目标时间
+        :return: 首个时间戳 >= 目标时间的 slot（目标晚于最新区块时返回最新有效 slot）
+        """
+        lower, upper = self.search_bracket(target_timestamp, lower, upper)
+        return (upper or lower)[0]
+
+    def search_bracket(self, target_timestamp, lower=None, upper=None):
+        """
+        插值查找的核心：始终维护区间 lower = (slot, time < 目标)，upper = (slot, time >= 目标)，
+        两者之间没有未探测的有效 Slot 时 upper 即为精确结果。
+        :return: 收敛后的 (lower, upper)；目标晚于最新区块时 upper 为 None，早于最早区块时 lower 为 None
+        """
+        if upper is None:
+            upper = self.latest_anchor()
+            if upper[1] < target_timestamp:
+                return upper, None  # 目标时间晚于最新区块
+
+        # 1️⃣ 按出块节奏外推到目标附近，未越过目标时倍增余量，直到找到下界；
+        #    探测落在没有区块可用的区域（早于最早可用区块 / 历史已清理）时，改为在 (floor, upper) 之间二分，向上收缩
+        margin = None
+        floor = 0  # (0, floor] 中已确认没有可用区块
+        bisecting = False
+        while lower is None:
+            if upper[0] - floor <= 1:
+                return None, upper  # upper 之下没有可用区块：目标早于最早的可用区块
+            if bisecting:
+                guess = (floor + upper[0]) // 2
+                anchor, probed = self.probe_upward(guess, upper[0])
+                if anchor is None:
+                    floor = probed
+                    continue
+            else:
+                estimate = math.ceil((upper[1] - target_timestamp) / self.SLOT_SECONDS)
+                margin = max(2, estimate // 50) if margin is None else margin * 2
+                guess = max(upper[0] - estimate - margin, floor + 1)
+                block_time = self.probe_block_time(guess)
+                if block_time is None:
+                    floor, bisecting = guess, True  # 不可用的历史是连续的：guess 及其之下都没有区块
+                    continue
+                if block_time == SlotIndex.SKIPPED:
+                    anchor = self.probe_nearby(guess, floor, upper[0])
+                else:
+                    anchor = (guess, block_time)
+                if anchor is None:
+                    # guess 附近全部被跳过或不可用：按连续缺失的历史处理
+                    floor, bisecting = min(guess + self.MAX_SKIP_PROBE, upper[0] - 1), True
+                    continue
+            if anchor[1] < target_timestamp:
+                lower = anchor
+            elif guess == floor + 1:
+                return None, anchor  # 从 floor 之上逐个向上探测到的第一个区块
+            else:
+                upper = anchor
+
+        # 2️⃣ 在 (lower, ceiling) 之间用割线插值收缩区间，收缩不足一半时退回二分；
+        #    [ceiling, upper) 是已确认被跳过的 Slot，不再探测
+        previous_width = None
+        ceiling = upper[0]
+        while ceiling - lower[0] > 1:
+            width = ceiling - lower[0]
+            if previous_width is not None and width * 2 > previous_width:
+                guess = (lower[0] + ceiling) // 2
+            else:
+                span = max(upper[1] - lower[1], 1)
+                # 以 (目标 - 0.5s) 插值，使估计落在目标秒的第一个 Slot 附近
+                fraction = (target_timestamp - 0.5 - lower[1]) / span
+                guess = lower[0] + int(round(fraction * (upper[0] - lower[0])))
+            guess = min(max(guess, lower[0] + 1), ceiling - 1)
+            previous_width = width
+
+            anchor = self.probe_nearby(guess, lower[0], ceiling)
+            if anchor is None:
+                # guess 两侧 MAX_SKIP_PROBE 内全部被跳过：从这段之后逐段向上找第一个有效 Slot
+                skipped_from = max(lower[0] + 1, guess - self.MAX_SKIP_PROBE)
+                scan_from = guess + self.MAX_SKIP_PROBE + 1
+                while anchor is None and scan_from < ceiling:
+                    anchor = self.probe_nearby(scan_from, scan_from - 1, ceiling)  # 只向上探测
+                    scan_from += self.MAX_SKIP_PROBE + 1
+                if anchor is None or anchor[1] >= target_timestamp:
+                    # [skipped_from, anchor) 之间没有有效 Slot，只需继续查找 (lower, skipped_from)
+                    upper = anchor or upper
+                    ceiling = skipped_from
+                    continue
+            if anchor[1] < target_timestamp:
+                lower = anchor
+            else:
+                upper = anchor
+                ceiling = anchor[0]
+
+        return lower, upper
+
+    def find_closest_slots(self, target_timestamps):
+        """
+        一次性解析多个目标时间对应的 Slot（如按小时切分的边界）。
+        按时间升序依次查找：上一个结果作为下一个目标的下界，最新区块只探测一次，
+        所有探测都会写入 Slot 索引供后续查找共享。
+        :param target_timestamps: 目标时间列表（Unix 时间戳，建议已排序）
+        :return: 与输入顺序一一对应的 slot 列表
+        """
+        print(f"find_closest_slots of {len(target_timestamps)} timestamps")
+        if self.search_mode == "binary":
+            return [self.find_closest_slot(ts) for ts in target_timestamps]
+
+        resolved = {}
+        lower = latest = None
+        for target_timestamp in sorted(set(target_timestamps)):
+            upper = None
+            if self.slot_index is not None:
+                index_lower, upper, exact = self.slot_index.bracket(target_timestamp)
+                if exact:
+                    resolved[target_timestamp] = upper[0]
+                    lower = index_lower
+                    continue
+                if index_lower is not None and (lower is None or index_lower[0] > lower[0]):
+                    lower = index_lower
+
+            if upper is None:
+                if latest is None:
+                    latest = self.latest_anchor()
+                upper = latest
+            if upper[1] < target_timestamp:
+                resolved[target_timestamp] = upper[0]  # 目标时间晚于最新区块
+                continue
+
+            lower, upper = self.search_bracket(target_timestamp, lower, upper)
+            resolved[target_timestamp] = upper[0]
+
+        slots = [resolved[ts] for ts in target_timestamps]
+        print(f"Resolved {len(slots)} slots: {slots[0] if slots else None} ... {slots[-1] if slots else None}")
+        return slots
+
 # 使用示例
 if __name__ == "__main__":
     rpc_url = "https://wild-boldest-rain.solana-mainnet.quiknode.pro/b95f33839916945a42159c53ceab4d7468a51a69/"
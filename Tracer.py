@@ -0,0 +1,239 @@
+import asyncio
+import atexit
+import contextvars
+import functools
+import json
+import os
+import random
+import threading
+import time
+import config
+
+CONFIG = config.CONFIG  # 直接使用 CONFIG
+
+# 当前上下文中的 Span 状态：None 表示没有父 Span，True 表示父 Span 正在记录，False 表示父 Span 被采样丢弃
+_current_span = contextvars.ContextVar("trace_span", default=None)
+
+
+class _NullSpan:
+    """ 未启用追踪或父 Span 已丢弃时使用，不做任何事 """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _DroppedSpan:
+    """ 被采样丢弃的 Span：子 Span 随之丢弃，保证记录下来的调用树是完整的 """
+
+    def __enter__(self):
+        self._token = _current_span.set(False)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _current_span.reset(self._token)
+        return False
+
+
+class _Span:
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self._token = _current_span.set(True)
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = time.perf_counter_ns()
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.args = dict(self.args, error=exc_type.__name__)
+        self.tracer.record(self.name, self.category, self._start, end - self._start, self.args)
+        return False
+
+
+class Tracer:
+    """
+    阶段级追踪（可选开启）：记录每个线程 / asyncio 任务中嵌套的 Span，导出为 Chrome trace 格式的 trace.json，
+    可直接在 Perfetto（ui.perfetto.dev）或 about://tracing 中打开。
+    - 阶段 Span（交易池获取、签名分页、解码阶段等）总是记录
+    - 高频 Span（每页、每批、每笔交易、每次写盘）按 CONFIG["trace_sample_rate"] 采样，丢弃时其子 Span 一并丢弃
+    - 事件数达到 CONFIG["trace_max_events"] 后不再记录，避免长时间回填产生过大的文件
+    """
+
+    _shared_instance = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, enabled=False, trace_file=None, sample_rate=1.0, max_events=500000):
+        """
+        :param enabled: 是否记录
+        :param trace_file: 输出文件（默认 RESULT/TRACE/trace.json）
+        :param sample_rate: 高频 Span 的采样率（0 ~ 1）
+        :param max_events: 最多记录的事件数
+        """
+        self.enabled = enabled
+        self.trace_file = trace_file or os.path.join(CONFIG["output_path"], "TRACE", "trace.json")
+        self.sample_rate = sample_rate
+        self.max_events = max_events
+
+        self._events = []  # (name, category, start_ns, duration_ns, tid, args)
+        self._thread_names = {}  # tid -> 线程 / 任务名
+        self._task_ids = {}  # id(task) -> 合成的 tid
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+        self.dropped_events = 0
+
+    @classmethod
+    def shared(cls):
+        """
+        进程内共享的追踪器（参数读取 CONFIG["trace_enabled"] / ["trace_file"] / ["trace_sample_rate"] / ["trace_max_events"]），
+        启用时在进程退出前自动写出 trace.json
+        """
+        if cls._shared_instance is not None:
+            return cls._shared_instance  # 热路径上不加锁
+        with cls._shared_lock:
+            if cls._shared_instance is None:
+                cls._shared_instance = cls(
+                    enabled=CONFIG.get("trace_enabled", False),
+                    trace_file=CONFIG.get("trace_file"),
+                    sample_rate=CONFIG.get("trace_sample_rate", 1.0),
+                    max_events=CONFIG.get("trace_max_events", 500000),
+                )
+                if cls._shared_instance.enabled:
+                    atexit.register(cls._shared_instance.save)
+            return cls._shared_instance
+
+    def span(self, name, category="stage", sample=False, **args):
+        """
+        创建一个 Span：with tracer.span("decode_batch", rows=100): ...
+        :param name: 名称
+        :param category: 分类（Perfetto 中可按分类筛选）
+        :param sample: 是否为高频 Span（按 sample_rate 采样）
+        :param args: 附加信息，显示在 Span 详情中
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        parent = _current_span.get()
+        if parent is False:
+            return NULL_SPAN
+        if sample and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return _DroppedSpan()
+        return _Span(self, name, category, args)
+
+    def _tid(self):
+        """ 线程中为线程 ID；asyncio 任务中为每个任务合成的 ID，使并发的协程各占一行 """
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is None:
+            tid = threading.get_ident()
+            if tid not in self._thread_names:
+                self._thread_names[tid] = threading.current_thread().name
+            return tid
+        tid = self._task_ids.get(id(task))
+        if tid is None:
+            with self._lock:
+                tid = self._task_ids.setdefault(id(task), -(len(self._task_ids) + 1))
+                self._thread_names[tid] = f"task {task.get_name()}"
+        return tid
+
+    def record(self, name, category, start_ns, duration_ns, args):
+        """ 记录一个完整的 Span（Chrome trace 的 "X" 事件） """
+        tid = self._tid()
+        with self._lock:
+            if len(self._events) >= self.max_events:
+                self.dropped_events += 1
+                return
+            self._events.append((name, category, start_ns, duration_ns, tid, args))
+
+    def save(self, trace_file=None):
+        """
+        写出 Chrome trace 格式的 JSON（原子替换）
+        :return: 文件路径，没有事件时返回 None
+        """
+        trace_file = trace_file or self.trace_file
+        with self._lock:
+            events = list(self._events)
+            thread_names = dict(self._thread_names)
+        if not events:
+            return None
+
+        pid = os.getpid()
+        trace_events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}}
+            for tid, thread_name in thread_names.items()
+        ]
+        trace_events.extend(
+            {"name": name, "cat": category, "ph": "X", "pid": pid, "tid": tid,
+             "ts": (start_ns - self._origin) / 1000, "dur": duration_ns / 1000, "args": args}
+            for name, category, start_ns, duration_ns, tid, args in events
+        )
+
+        os.makedirs(os.path.dirname(trace_file) or ".", exist_ok=True)
+        tmp_file = trace_file + ".tmp"
+        with open(tmp_file, mode="w", encoding="utf-8") as file:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms",
+                       "otherData": {"sample_rate": self.sample_rate, "dropped_events": self.dropped_events}},
+                      file, default=str)
+        os.replace(tmp_file, trace_file)
+        print(f"🧭 追踪数据已写入 {trace_file}（{len(events)} 个 Span，超出上限未记录 {self.dropped_events} 个），"
+              f"可在 https://ui.perfetto.dev 打开")
+        return trace_file
+
+
+def traced(name=None, category="stage", sample=False):
+    """
+    装饰器：把函数的每次调用记录为一个 Span（支持普通函数与协程函数），未启用追踪时几乎没有开销
+    :param name: Span 名称（默认为函数的 __qualname__）
+    """
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with Tracer.shared().span(span_name, category, sample):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Tracer.shared().span(span_name, category, sample):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# ========== 使用示例 ==========
+if __name__ == "__main__":
+    import tempfile
+
+    tracer = Tracer(enabled=True, trace_file=os.path.join(tempfile.mkdtemp(), "trace.json"), sample_rate=0.5)
+
+    def work(idx):
+        with tracer.span("batch", batch=idx):
+            for item in range(5):
+                with tracer.span("item", category="decode", sample=True, item=item):
+                    time.sleep(0.001)
+
+    with tracer.span("run"):
+        threads = [threading.Thread(target=work, args=(idx,)) for idx in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    tracer.save()
@@ -0,0 +1,161 @@
+import gzip
+import json
+import os
+import threading
+import config
+
+CONFIG = config.CONFIG  # 直接使用 CONFIG
+
+
+class TransactionCache:
+    """
+    getTransaction 原始响应的本地磁盘缓存：
+    - 以交易签名为键（签名本身就是交易内容的哈希），按签名前缀分片存放为 gzip 压缩的 JSON
+    - 总大小超过上限时按最近访问时间（文件 mtime）淘汰最旧的条目（LRU）
+    """
+
+    SUFFIX = ".json.gz"
+
+    _shared_instances = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, cache_folder=None, max_bytes=None, shard_prefix_length=2):
+        """
+        :param cache_folder: 缓存目录（默认 RESULT/CACHE/TX）
+        :param max_bytes: 缓存大小上限（字节，默认读取 CONFIG["tx_cache_max_bytes"]）
+        :param shard_prefix_length: 分片目录使用的签名前缀长度
+        """
+        self.cache_folder = cache_folder or os.path.join(CONFIG["output_path"], "CACHE", "TX")
+        os.makedirs(self.cache_folder, exist_ok=True)
+        self.max_bytes = max_bytes or CONFIG.get("tx_cache_max_bytes", 2 * 1024 ** 3)
+        self.shard_prefix_length = shard_prefix_length
+
+        self._lock = threading.Lock()
+        self._total_bytes = None  # 首次写入时扫描统计
+
+    @classmethod
+    def shared(cls, cache_folder=None):
+        """
+        获取进程内共享的缓存实例
+        """
+        cache_folder = cache_folder or os.path.join(CONFIG["output_path"], "CACHE", "TX")
+        with cls._shared_lock:
+            if cache_folder not in cls._shared_instances:
+                cls._shared_instances[cache_folder] = cls(cache_folder)
+            return cls._shared_instances[cache_folder]
+
+    def _path(self, signature):
+        shard = signature[:self.shard_prefix_length]
+        return os.path.join(self.cache_folder, shard, signature + self.SUFFIX)
+
+    def __contains__(self, signature):
+        return os.path.exists(self._path(signature))
+
+    def get(self, signature):
+        """
+        读取缓存的交易 JSON
+        :param signature: 交易签名字符串
+        :return: 交易 JSON（dict），未命中时返回 None
+        """
+        path = self._path(signature)
+        try:
+            with gzip.open(path, "rb") as file:
+                tx_details = json.loads(file.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError):
+            # 文件损坏（例如写入中断）时视为未命中并删除
+            self._remove(path)
+            return None
+
+        try:
+            os.utime(path)  # 刷新访问时间，供 LRU 淘汰使用
+        except OSError:
+            pass
+        return tx_details
+
+    def put(self, signature, tx_details):
+        """
+        写入一条交易
+        :param signature: 交易签名字符串
+        :param tx_details: 交易 JSON（dict 或 JSON 字符串）
+        """
+        if tx_details is None:
+            return
+        raw = tx_details if isinstance(tx_details, str) else json.dumps(tx_details, separators=(",", ":"))
+        data = gzip.compress(raw.encode("utf-8"), compresslevel=6)
+
+        path = self._path(signature)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as file:
+                file.write(data)
+            previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"❌ 写入交易缓存失败: {e}")
+            self._remove(tmp_path)
+            return
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_total_bytes()
+            else:
+                self._total_bytes += len(data) - previous_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def iter_signatures(self):
+        """
+        遍历缓存中的全部签名
+        """
+        for shard in os.scandir(self.cache_folder):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(self.SUFFIX):
+                    yield entry.name[:-len(self.SUFFIX)]
+
+    def _iter_entries(self):
+        for shard in os.scandir(self.cache_folder):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(self.SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    yield stat.st_mtime, stat.st_size, entry.path
+
+    def _scan_total_bytes(self):
+        return sum(size for _, size, _ in self._iter_entries())
+
+    def _evict(self):
+        """ 按 mtime 从旧到新删除，直到总大小降到上限的 90% """
+        target_bytes = int(self.max_bytes * 0.9)
+        entries = sorted(self._iter_entries())
+        self._total_bytes = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in entries:
+            if self._total_bytes <= target_bytes:
+                break
+            if self._remove(path):
+                self._total_bytes -= size
+                evicted += 1
+        print(f"🧹 交易缓存超过上限，已淘汰 {evicted} 条，当前 {self._total_bytes / 1024 ** 2:.1f} MB")
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+# ========== 使用示例 ==========
+if __name__ == "__main__":
+    cache = TransactionCache.shared()
+    print(f"缓存目录: {cache.cache_folder}，共 {sum(1 for _ in cache.iter_signatures())} 笔交易")
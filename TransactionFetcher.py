@@ -1,25 +1,58 @@
+import concurrent.futures
 import csv
+import json
 import os
 import datetime
+import threading
+import httpx
 import config
-from solana.rpc.api import Client
 from SolanaSlotFinder import SolanaSlotFinder
+from SlotIndex import SlotIndex
+from EndpointPool import EndpointPool
+from FetchCheckpoint import FetchCheckpoint
+from Metrics import Metrics
+from Tracer import Tracer
 from solders.pubkey import Pubkey  # 导入 Pubkey
+from solders.signature import Signature
 from solana.rpc.types import Commitment
+from solana.rpc.core import RPCException
+from solana.exceptions import SolanaRpcException
+from solders.rpc.config import RpcBlockConfig
+from solders.rpc.requests import GetBlock
+from solders.transaction_status import TransactionDetails, UiTransactionEncoding
 
 
 CONFIG = config.CONFIG  # 直接使用 CONFIG
 
+MAX_BOUNDARY_PROBE = 16  # 边界 Slot 被跳过时，向后最多探测的 Slot 数
+SKIPPED_SLOT_ERRORS = {-32007, -32009}  # Slot 被跳过 / 长期存储中被跳过：该 Slot 没有区块，可以探测下一个
+# 边界区块只需要签名列表，不下载完整交易
+GET_BOUNDARY_BLOCK_CONFIG = RpcBlockConfig(encoding=UiTransactionEncoding.Json,
+                                           transaction_details=TransactionDetails.Signatures, rewards=False,
+                                           max_supported_transaction_version=0)
+
+SIGNATURE_PAGES = Metrics.shared().counter("signature_pages_total", "getSignaturesForAddress 分页数", ("pool",))
+SIGNATURES_FETCHED = Metrics.shared().counter("signatures_fetched_total", "分页获取到的签名数", ("pool",))
+TRACER = Tracer.shared()
+
 
 class TransactionFetcher:
+    _file_lock = threading.Lock()  # 多个线程 / 子区间写同一个 SIGNATURE 文件时共用
+    _existing_signatures = {}  # output_file -> set(signature)，每个文件只读取一次
+    _boundary_lock = threading.Lock()
+    _boundary_signatures = {}  # slot -> Future(第一笔交易签名)，所有交易池与子区间共用，同一 Slot 只请求一次
+
     def __init__(self, rpc_url, slot_finder, start_slot, end_slot):
         """
         初始化交易查询器（不再绑定 file_name）
         """
-        self.solana_client = Client(rpc_url)
+        self.endpoint_pool = EndpointPool.for_url(rpc_url)
+        self.solana_client = self.endpoint_pool.client_for(rpc_url)
         self.slot_finder = slot_finder
         self.start_slot = start_slot
         self.end_slot = end_slot
+        self.slot_index = SlotIndex.shared() if CONFIG.get("slot_index_enabled", True) else None
+        self.checkpoint = FetchCheckpoint.shared() if CONFIG.get("fetch_checkpoint_enabled", True) else None
 
         # **文件输出目录**
         self.output_folder = os.path.join(CONFIG["output_path"], "SIGNATURE")
@@ -37,7 +70,8 @@ class TransactionFetcher:
         :param end_slot: 结束 Slot
         """
         instance = cls.__new__(cls)  # 直接创建实例，不调用 __init__
-        instance.solana_client = Client(rpc_url)
+        instance.endpoint_pool = EndpointPool.for_url(rpc_url)
+        instance.solana_client = instance.endpoint_pool.client_for(rpc_url)
         instance.slot_finder = slot_finder
         instance.start_slot = start_slot
         instance.end_slot = end_slot
@@ -45,6 +79,8 @@ class TransactionFetcher:
         instance.end_datetime = None
         instance.start_timestamp = None
         instance.end_timestamp = None
+        instance.slot_index = SlotIndex.shared() if CONFIG.get("slot_index_enabled", True) else None
+        instance.checkpoint = FetchCheckpoint.shared() if CONFIG.get("fetch_checkpoint_enabled", True) else None
 
         # **文件输出目录**
         instance.output_folder = os.path.join(CONFIG["output_path"], "SIGNATURE")
@@ -54,121 +90,256 @@ class TransactionFetcher:
 
         return instance  # **不在这里设置 `file_name`**
 
-    def fetch_transactions_by_signature(self, market_pubkey, signature, limit, market_address):
+    def fetch_transactions_by_signature(self, market_pubkey, signature, limit, market_address, on_page=None,
+                                        start_slot=None, end_slot=None, output_file=None, checkpoint_key=None):
         """
-        获取交易签名，并返回获取到的交易数据中最旧的 slot。
+        从参考签名开始向更早的交易逐页获取签名（迭代分页，长区间不受递归深度限制），
+        返回获取到的交易数据中最旧的 slot。
 
         :param market_pubkey: 交易市场的公钥
         :param signature: 参考的交易签名
         :param limit: 获取交易的数量限制
         :param market_address: 市场地址
-        :return: response.value 中最后一条交易的 slot，如果没有交易则返回 None
+        :param on_page: 可选回调，每页保存后以 [(signature, market_address), ...]（成功且在 Slot 范围内）调用
+        :param start_slot: 起始 Slot（默认 self.start_slot，并行分段抓取时为子区间）
+        :param end_slot: 结束 Slot（默认 self.end_slot）
+        :param output_file: SIGNATURE 文件路径（默认 self.output_file）
+        :param checkpoint_key: 断点清单中的键，每保存一页就记录新的游标（None 表示不记录）
+        :return: 最后一页中最旧交易的 slot，如果没有交易则返回 None
         """
-        response = self.solana_client.get_signatures_for_address(
-            market_pubkey,
-            before=signature,
-            limit=limit,
-        )
-
-        transactions = response.value
-        if not transactions:
-            print("⚠️ 没有找到更多的交易记录")
-            return None  # 返回 None 以指示没有找到交易
-
-        # 先保存数据
-        self.save_transactions(transactions, self.start_slot, self.end_slot, market_address)
-
-        # 返回最旧交易的 slot
-        last_transaction_slot = transactions[-1].slot  # 获取最后一条交易的 slot
-        last_transaction_signature = transactions[-1].signature
-        if(last_transaction_slot >= self.start_slot and last_transaction_slot <= self.end_slot):
-            self.fetch_transactions_by_signature(market_pubkey, last_transaction_signature, limit, market_address)
-        else:
-            return
-
+        start_slot = self.start_slot if start_slot is None else start_slot
+        end_slot = self.end_slot if end_slot is None else end_slot
+        last_transaction_slot = None
+
+        while True:
+            with TRACER.span("getSignaturesForAddress", category="rpc", sample=True, pool=market_address):
+                response = self.endpoint_pool.call(
+                    "get_signatures_for_address",
+                    market_pubkey,
+                    before=signature,
+                    limit=limit,
+                )
+
+            transactions = response.value
+            SIGNATURE_PAGES.inc(market_address)
+            if not transactions:
+                print("⚠️ 没有找到更多的交易记录")
+                break
+            SIGNATURES_FETCHED.inc(market_address, value=len(transactions))
+
+            # 签名列表自带 (slot, blockTime)，顺带写入 Slot 索引
+            if self.slot_index is not None:
+                for txn in transactions:
+                    self.slot_index.record(txn.slot, txn.block_time)
+
+            # 先保存数据
+            with TRACER.span("write_signatures", category="io", sample=True, rows=len(transactions)):
+                self.save_transactions(transactions, start_slot, end_slot, market_address, output_file)
+
+            # 流式模式：把本页有效签名立即交给下游解码
+            if on_page is not None:
+                on_page([
+                    (str(txn.signature), market_address)
+                    for txn in transactions
+                    if txn.err is None and start_slot <= txn.slot <= end_slot
+                ])
+
+            # 本页已落盘，记录游标：之后的重试 / 重启从这里继续
+            last_transaction_slot = transactions[-1].slot  # 获取最后一条交易的 slot
+            signature = transactions[-1].signature
+            if self.checkpoint is not None and checkpoint_key is not None:
+                self.checkpoint.update(checkpoint_key, signature, last_transaction_slot)
+
+            if not start_slot <= last_transaction_slot <= end_slot:
+                break
+
+        if self.checkpoint is not None and checkpoint_key is not None:
+            self.checkpoint.mark_done(checkpoint_key)
+        return last_transaction_slot
+
+    def split_slot_range(self, parts, slot_range=None):
+        """
+        把 [start_slot, end_slot] 切分为 parts 个连续、互不重叠的子区间
+        :param slot_range: 可选的 (start_slot, end_slot)，默认为整个范围（例如按时间窗口切分的某个窗口）
+        :return: [(sub_start, sub_end), ...]
+        """
+        start_slot, end_slot = slot_range or (self.start_slot, self.end_slot)
+        total = end_slot - start_slot + 1
+        parts = max(1, min(parts, total))
+        boundaries = [start_slot + total * idx // parts for idx in range(parts)] + [end_slot + 1]
+        return [(boundaries[idx], boundaries[idx + 1] - 1) for idx in range(parts)]
 
-    def fetch_transactions(self, market_address,file_name,limit=1000):
+    def get_boundary_signature(self, slot):
+        """
+        获取某个 Slot 区块中的第一笔交易签名，作为 before 游标（返回该区块之前的全部交易）。
+        Slot 被跳过时向后探测：中间的 Slot 没有区块，不会漏掉交易。
+        结果按 Slot 缓存：各交易池的同一个子区间边界相同，只请求一次
+        """
+        with self._boundary_lock:
+            future = self._boundary_signatures.get(slot)
+            owner = future is None
+            if owner:
+                future = self._boundary_signatures[slot] = concurrent.futures.Future()
+        if owner:
+            try:
+                future.set_result(self._fetch_boundary_signature(slot))
+            except Exception as e:
+                with self._boundary_lock:
+                    self._boundary_signatures.pop(slot, None)  # 失败不缓存，下次重新请求
+                future.set_exception(e)
+        return future.result()
+
+    def _fetch_boundary_signature(self, slot):
+        """
+        getBlock（transactionDetails="signatures"）取区块的第一笔交易签名。
+        只有 Slot 被跳过（SKIPPED_SLOT_ERRORS）时才探测下一个 Slot；限流、HTTP 错误与其他 JSON-RPC 错误直接抛出，
+        由调用方重试，不会把子区间当作没有交易
+        """
+        for probe_slot in range(slot, slot + MAX_BOUNDARY_PROBE + 1):
+            body = GetBlock(probe_slot, GET_BOUNDARY_BLOCK_CONFIG)
+
+            def post(endpoint):
+                provider = endpoint.client._provider
+                try:
+                    raw = provider.make_request_unparsed(body)
+                except httpx.HTTPError as e:
+                    # 与 Client 的请求一致包装为 SolanaRpcException（429 / 5xx / 超时均可重试）
+                    raise SolanaRpcException(e, provider.make_request_unparsed, provider, body) from e
+                reply = json.loads(raw)
+                if "error" in reply:
+                    raise RPCException(reply["error"])
+                return reply.get("result") or {}
+
+            try:
+                block = self.endpoint_pool.request(post, method="getBlock")
+            except RPCException as e:
+                error = e.args[0] if e.args else None
+                if not isinstance(error, dict) or error.get("code") not in SKIPPED_SLOT_ERRORS:
+                    raise
+                print(f"⚠️ Slot {probe_slot} 没有区块（{error.get('message')}），尝试下一个 Slot")
+                continue
+
+            signatures = block.get("signatures") or []
+            if signatures:
+                return Signature.from_string(signatures[0])
+            print(f"⚠️ Slot {probe_slot} 的区块没有交易，尝试下一个 Slot")
+        raise RuntimeError(f"❌ Slot {slot} ~ {slot + MAX_BOUNDARY_PROBE} 均没有可用的区块，无法确定边界游标")
+
+    def fetch_transactions(self, market_address,file_name,limit=1000, on_page=None, slot_range=None):
         """
         查询指定时间范围内的交易，并存入 CSV（去重插入）
         :param market_address: 目标账户地址
         :param limit: 每次查询的最大交易数
+        :param on_page: 可选回调，每获取一页签名就调用一次（见 fetch_transactions_by_signature）
+        :param slot_range: 可选的子区间 (start_slot, end_slot)，由 split_slot_range 生成，可在多个线程中并行抓取
         """
         market_pubkey = Pubkey.from_string(market_address)  # 在方法内解析 market_address
-        self.output_file = os.path.join(self.output_folder, file_name)  # **动态设置输出文件路径**
-
-        print(f"Fetching transactions from Market Address: {market_address}")
-
-        # 获取 Slot 的交易
-        response = self.solana_client.get_block(
-            self.end_slot,
-            encoding="json",
-            max_supported_transaction_version=0  # 解决版本不兼容问题
-        )
-
-        transactions = response.value.transactions
-        signatures = [txn.transaction.signatures[0] for txn in transactions if hasattr(txn.transaction, "signatures")]
-
-        if not signatures:
-            print("⚠️ No transactions found in the block.")
+        output_file = os.path.join(self.output_folder, file_name)  # **动态设置输出文件路径**
+        self.output_file = output_file
+        start_slot, end_slot = slot_range or (self.start_slot, self.end_slot)
+
+        # 断点续传：该 (交易池, 子区间) 已完成则跳过，中断过则从上次保存的游标继续
+        checkpoint_key = FetchCheckpoint.key(market_address, start_slot, end_slot)
+        entry = self.checkpoint.get(checkpoint_key) if self.checkpoint is not None else None
+        if entry is not None and entry["done"] and os.path.exists(output_file):
+            print(f"⏭️ {market_address} (Slot {start_slot} ~ {end_slot}) 已抓取完成（断点清单），跳过")
+            return
+        if entry is not None and entry.get("signature"):
+            print(f"🔁 Resuming {market_address} (Slot {start_slot} ~ {end_slot}) from Slot {entry['slot']}"
+                  f"（已完成 {entry['pages']} 页）")
+            self.fetch_transactions_by_signature(market_pubkey, Signature.from_string(entry["signature"]), limit,
+                                                 market_address, on_page, start_slot, end_slot, output_file,
+                                                 checkpoint_key)
             return
 
-        first_signature = signatures[0]
+        print(f"Fetching transactions from Market Address: {market_address} (Slot {start_slot} ~ {end_slot})")
+
+        # 子区间以下一个 Slot 的区块为游标，保证 end_slot 本身被完整包含、与下一个子区间既不重叠也不遗漏；
+        # 最后一个子区间与原来一样以 end_slot 的区块为游标
+        boundary_slot = end_slot + 1 if end_slot < self.end_slot else end_slot
+        first_signature = self.get_boundary_signature(boundary_slot)
 
         # 获取 `first_signature` 之前的交易签名
 
-        self.fetch_transactions_by_signature(market_pubkey, first_signature, limit, market_address)
+        self.fetch_transactions_by_signature(market_pubkey, first_signature, limit, market_address, on_page,
+                                             start_slot, end_slot, output_file, checkpoint_key)
 
 
         # 处理并存储交易数据
         #self.save_transactions(response.value, self.start_slot, self.end_slot, market_address)
 
 
-    def save_transactions(self, transactions, start_slot, end_slot, market_address):
+    def save_transactions(self, transactions, start_slot, end_slot, market_address, output_file=None):
         """
-        读取已有交易数据，去重后插入新交易
+        读取已有交易数据，去重后插入新交易（线程安全，多个子区间可同时写同一文件）
         :param transactions: Solana 交易列表
         :param start_slot: 起始 Slot
         :param end_slot: 结束 Slot
         :param market_address: 当前交易市场地址
+        :param output_file: SIGNATURE 文件路径（默认 self.output_file）
         """
         if not transactions:
             print("⚠️ No transactions found.")
             return 0
 
-        # 读取已有交易签名，避免重复插入
-        existing_signatures = set()
-        if os.path.exists(self.output_file):
-            with open(self.output_file, mode='r', newline='') as file:
-                reader = csv.reader(file)
-                next(reader, None)  # 跳过 CSV 头部
-                existing_signatures = {row[0] for row in reader}  # 读取已有交易的 signature
+        output_file = output_file or self.output_file
 
-        # 追加模式写入新交易
-        new_entries = 0
+        # 遍历 transactions 并仅存储交易成功 & slot 在范围内的记录
+        rows = []
         last_slot = None  # 记录 Slot 范围
-
-        with open(self.output_file, mode='a', newline='') as file:
-            writer = csv.writer(file)
-
-            # 如果文件为空，先写入头部
-            if os.stat(self.output_file).st_size == 0:
-                writer.writerow(["Signature", "Slot", "Market_Address"])  # 新增 `Market Address`
-
-            # 遍历 transactions 并仅存储交易成功 & slot 在范围内的记录
-            for txn in transactions:
-                sig = str(txn.signature).strip().replace("\n", "").replace("Signature(", "").replace(")",
+        for txn in transactions:
+            sig = str(txn.signature).strip().replace("\n", "").replace("Signature(", "").replace(")",
 "")  # **处理转义符**
-                last_slot = txn.slot  # 更新最后一条交易的 slot
-                if txn.err is None:
-                    if start_slot <= txn.slot <= end_slot:
-                        if sig not in existing_signatures:
-                            writer.writerow([txn.signature, txn.slot, market_address])
-                            new_entries += 1
+            last_slot = txn.slot  # 更新最后一条交易的 slot
+            if txn.err is None:
+                if start_slot <= txn.slot <= end_slot:
+                    rows.append([sig, txn.slot, market_address])
+
+        new_entries = self.append_signatures(output_file, rows)
 
         # 打印存储信息
-        print(f"✅ {new_entries} new transactions saved to {self.output_file} | Last Slot :{last_slot}")
+        print(f"✅ {new_entries} new transactions saved to {output_file} | Last Slot :{last_slot}")
         return new_entries
 
+    @classmethod
+    def append_signatures(cls, output_file, rows):
+        """
+        去重后追加签名行到 SIGNATURE 文件（线程安全）
+        :param output_file: SIGNATURE 文件路径
+        :param rows: [[signature, slot, market_address], ...]
+        :return: 新写入的行数
+        """
+        with cls._file_lock:
+            # 读取已有交易签名，避免重复插入（每个文件只读取一次，之后在内存中维护）
+            if output_file not in cls._existing_signatures:
+                existing_signatures = set()
+                if os.path.exists(output_file):
+                    with open(output_file, mode='r', newline='') as file:
+                        reader = csv.reader(file)
+                        next(reader, None)  # 跳过 CSV 头部
+                        existing_signatures = {row[0] for row in reader if row}  # 读取已有交易的 signature
+                cls._existing_signatures[output_file] = existing_signatures
+            existing_signatures = cls._existing_signatures[output_file]
+
+            new_rows = []
+            for row in rows:
+                if row[0] not in existing_signatures:
+                    existing_signatures.add(row[0])
+                    new_rows.append(row)
+            if not new_rows:
+                return 0
+
+            # 追加模式写入新交易
+            with open(output_file, mode='a', newline='') as file:
+                writer = csv.writer(file)
+
+                # 如果文件为空，先写入头部
+                if os.stat(output_file).st_size == 0:
+                    writer.writerow(["Signature", "Slot", "Market_Address"])  # 新增 `Market Address`
+
+                writer.writerows(new_rows)
+            return len(new_rows)
+
 
 # ========== 使用示例 ==========
 if __name__ == "__main__":
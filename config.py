@@ -3,4 +3,58 @@ CONFIG = {
     "rpc_url2":  "https://lingering-fragrant-hexagon.solana-mainnet.quiknode.pro/e27d3b258cfb3d3c3f808767fe98ed8fa189e38e/",
     "input_path": "INPUT",
     "output_path": "RESULT",  # 新增的配置项
+    "slot_index_enabled": True,  # 是否启用 Slot ↔ blockTime 持久化索引（RESULT/INDEX/slot_index.bin）
+    "rpc_batch_size": 1,  # 每个 getTransaction JSON-RPC 批量请求包含的交易数，大于 1 时启用批量请求
+    "decode_engine": "threads",  # 解码引擎："threads"（线程池）、"async"（asyncio）或 "processes"（I/O 线程 + 多进程解析）
+    "decode_threads": None,  # 线程池解码的线程数，None 时为每个 LogDecoder 100 // rpc_batch_size 个
+    "decode_processes": None,  # 多进程引擎的解码子进程数，None 时为 CPU 核数
+    "process_decode_batch_size": 200,  # 多进程引擎每次交给子进程解析的交易数
+    "async_concurrency_per_endpoint": 20,  # asyncio 引擎下每个 RPC 端点同时在途的请求数（约为目标速率 x RPC 往返延迟，过大时请求在节点排队，延迟与重试反而上升）
+    "stream_queue_size": 10000,  # 流式模式下签名队列容量（背压阈值）
+    "writer_batch_size": 500,  # DataWriter 缓冲多少行后批量写盘
+    "writer_flush_interval": 1.0,  # DataWriter 最长多少秒写盘一次
+    "tx_cache_enabled": False,  # 是否缓存 getTransaction 原始响应（RESULT/CACHE/TX），可离线重新解码
+    "tx_cache_max_bytes": 2 * 1024 ** 3,  # 交易缓存大小上限（字节），超过后按 LRU 淘汰
+    "pool_fetch_parts": 4,  # 每个交易池的 Slot 范围切分为多少个子区间并行分页
+    "fetch_checkpoint_enabled": True,  # 签名分页断点续传：每页记录游标到 RESULT/CHECKPOINT/signatures.json
+    "follow_poll_interval": 2,  # 跟踪模式（SolanaFetcher.follow）两轮轮询之间的间隔（秒）
+    "follow_page_limit": 1000,  # 跟踪模式下 getSignaturesForAddress 每页条数
+    "follow_max_decode_attempts": 5,  # 跟踪模式下单笔交易最多解码几轮，仍失败时放弃（失败的签名保存在高水位清单中）
+    "ws_url": None,  # 推送模式（SolanaFetcher.subscribe）的 websocket 端点，None 时由 rpc_url1 换成 wss:// 得到
+    "ws_commitment": "finalized",  # logsSubscribe 的确认级别（与 getTransaction 保持一致）
+    "ws_decode_workers": 50,  # 推送模式下的解码线程数
+    "ws_checkpoint_interval": 5,  # 推送模式下多少秒推进一次高水位
+    "ws_fallback_after": 3,  # websocket 连续多少次连接失败后退回轮询
+    "pair_scheduler_enabled": True,  # input.csv 中有多个交易对时并发处理（共享全局 RPC 预算），False 时逐个处理
+    "pair_rpc_concurrency": 200,  # 并发处理交易对时全局同时在途的 RPC 请求数，按交易对公平分配
+    "pair_max_parallel": None,  # 同时处理的交易对数，None 表示全部同时处理
+    "pair_report_interval": 30,  # 交易对进度汇报间隔（秒）
+    "block_scan_enabled": False,  # 区块扫描模式：True（逐个 Slot 调用 getBlock，一遍覆盖所有交易池）/ False / "auto"（按交易密度规划）
+    "block_scan_workers": 32,  # 区块扫描时同时请求的区块数
+    "planner_subrange_slots": 9000,  # "auto" 模式下规划的子区间大小（约 1 小时）
+    "planner_tx_bytes": 4000,  # 单笔交易 JSON 的大约字节数，用于估算传输量
+    "planner_bytes_per_call": 100000,  # 多少字节的传输代价相当于一次 RPC 调用
+    "endpoint_pool_enabled": True,  # 是否在全部 rpc_url* 端点之间按延迟 / 错误率负载均衡
+    "endpoint_weights": {"rpc_url1": 1.0, "rpc_url2": 1.0},  # 端点权重，越大分到的请求越多
+    "endpoint_eject_cooldown": 30,  # 故障端点被剔除后多少秒重新加入
+    "rpc_pool_max_connections": 200,  # 共享 HTTP 连接池的最大连接数（所有 RPC Client 共用）
+    "rpc_pool_max_keepalive": 200,  # 连接池保持的空闲连接数
+    "rpc_keepalive_expiry": 60,  # 空闲连接保留时间（秒）
+    "rpc_http2": False,  # 是否启用 HTTP/2（需要 pip install httpx[http2]，未安装时自动使用 HTTP/1.1）
+    "rpc_connect_timeout": 5,  # 建立连接超时（秒）
+    "rpc_read_timeout": 30,  # 读取超时（秒）
+    "metrics_enabled": True,  # 是否记录指标（RPC 调用 / 重试 / 分页 / 锁等待 / 写盘行数）
+    "metrics_port": None,  # Prometheus 指标端口（http://127.0.0.1:<port>/metrics），None 表示不启动
+    "metrics_snapshot_file": None,  # 定期写入的 JSON 指标快照（如 "RESULT/METRICS/metrics.json"），None 表示不写
+    "metrics_snapshot_interval": 10,  # JSON 快照间隔（秒）
+    "candles_enabled": True,  # SolanaFetcher.run 结束后由 RESULT/DATA 增量构建 OHLCV / VWAP K 线（RESULT/CANDLE）
+    "candle_intervals": {"1s": 1, "1m": 60, "1h": 3600},  # K 线周期名 -> 秒数
+    "trace_enabled": False,  # 是否记录阶段级追踪（退出时写出 Chrome trace 格式的 trace.json，可用 Perfetto 打开）
+    "trace_file": None,  # 追踪文件路径，None 时为 RESULT/TRACE/trace.json
+    "trace_sample_rate": 1.0,  # 高频 Span（每页 / 每笔交易 / 每次写盘）的采样率，长时间回填可设为 0.01
+    "trace_max_events": 500000,  # 最多记录的 Span 数（约 60MB），超出后不再记录
+    # 每个 RPC 端点的自适应限速（AIMD 令牌桶，第一次 429 之前慢启动：满速时每秒翻倍），可用 "rpc_url1" 等键名单独覆盖
+    "rate_limits": {
+        "default": {"initial_rate": 50, "min_rate": 1, "max_rate": 500},
+    },
 }
@@ -0,0 +1,308 @@
+"""
+端到端吞吐量基准：在本地 MockRpcServer（独立进程，带网络延迟）上运行抓取器的各个阶段，
+输出每秒交易数、p50 / p95 / p99 延迟与峰值内存，并写入 JSON，便于比较不同提交、线程数、批量大小与解码引擎。
+
+场景（每个场景在独立子进程中运行，峰值内存与进程内共享状态互不影响）：
+1. slot_search：SolanaSlotFinder 按时间戳查找 Slot（不使用 Slot 索引）
+2. pagination：SolanaFetcher.fetch_transactions_for_pool 签名分页并写入 SIGNATURE
+3. decode：解码合成链上的全部成功交易并写入 DATA（CONFIG["decode_engine"] 决定引擎）
+4. full_run：完整的 SolanaFetcher.run()（交易池 -> 签名 -> 解码）
+
+运行：
+python samplecode/benchmark_suite.py                                   # 全部场景，默认参数
+python samplecode/benchmark_suite.py decode --sweep rpc_batch_size=1,10,50
+python samplecode/benchmark_suite.py decode --sweep decode_engine=threads,async,processes --latency 0.05
+python samplecode/benchmark_suite.py full_run --set decode_threads=50 --set 'rate_limits={"default":{"initial_rate":2000,"max_rate":5000}}'
+结果默认写入 RESULT/BENCH/bench_<提交>_<时间>.json
+"""
+import argparse
+import csv
+import datetime
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import config
+
+CONFIG = config.CONFIG  # 直接使用 CONFIG
+
+SCENARIOS = ["slot_search", "pagination", "decode", "full_run"]
+WSOL = "So11111111111111111111111111111111111111112"
+USDC = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+
+
+def peak_rss_mb():
+    """ 当前进程的峰值常驻内存（MB）；平台不支持时返回 None """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / 1024 / (1024 if sys.platform == "darwin" else 1), 1)  # macOS 单位为字节，Linux 为 KB
+    except ImportError:
+        pass
+    try:
+        import psutil
+        memory = psutil.Process().memory_info()
+        return round(getattr(memory, "peak_wset", memory.rss) / 1024 ** 2, 1)  # Windows 提供 peak_wset
+    except ImportError:
+        return None
+
+
+def percentiles(samples):
+    """ 延迟样本（秒）-> {"p50", "p95", "p99"}（毫秒） """
+    if not samples:
+        return None
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1000, [50, 95, 99])
+    return {"p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2),
+            "samples": len(samples)}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args):
+    """ 在独立进程中启动 MockRpcServer（避免与被测代码争抢 GIL），等待端口可用 """
+    port = free_port()
+    command = [sys.executable, os.path.join(ROOT, "MockRpcServer.py"), "--port", str(port),
+               "--slots", str(args.slots), "--tx-per-slot", str(args.tx_per_slot),
+               "--latency", str(args.latency), "--jitter", str(args.jitter),
+               "--error-rate", str(args.error_rate), "--throttle-rate", str(args.throttle_rate)]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("❌ MockRpcServer 启动超时")
+
+
+# ========== 场景（在子进程中执行） ==========
+
+def run_scenario(name, url, args, overrides):
+    """
+    在当前（子）进程中运行一个场景
+    :return: 指标字典
+    """
+    output_path = tempfile.mkdtemp(prefix="bench_")
+    CONFIG.update(overrides)
+    CONFIG.update({
+        "rpc_url1": url, "rpc_url2": url, "output_path": output_path, "input_path": output_path,
+        "slot_index_enabled": False, "fetch_checkpoint_enabled": False, "tx_cache_enabled": False,
+    })
+    for key in [key for key in CONFIG if key.startswith("rpc_url") and key not in ("rpc_url1", "rpc_url2")]:
+        del CONFIG[key]
+    with open(os.path.join(output_path, "input.csv"), mode="w", newline="") as file:
+        csv.writer(file).writerows([["mint1", "mint2"], [WSOL, USDC]])
+
+    from EndpointPool import EndpointPool
+    from LogDecoder import LogDecoder
+    from MockRpcServer import SyntheticChain
+    from RaydiumPoolFetcher import RaydiumPoolFetcher
+    from SOL_fetcher import SolanaFetcher
+    from SolanaSlotFinder import SolanaSlotFinder
+
+    RaydiumPoolFetcher.RAYDIUM_API_BASE_URL = url
+    chain = SyntheticChain(slots=args.slots, tx_per_slot=args.tx_per_slot)
+    start_slot, end_slot = chain.start_slot + 1, chain.end_slot - 1
+
+    # 每次 RPC 的耗时（包括异步引擎，它同样通过 EndpointPool.record 上报）
+    rpc_latencies = []
+    record = EndpointPool.record
+
+    def timed_record(self, endpoint, latency, *args, **kwargs):
+        rpc_latencies.append(latency)
+        return record(self, endpoint, latency, *args, **kwargs)
+
+    EndpointPool.record = timed_record
+
+    # 每笔交易的解码耗时（线程引擎 / 流式模式）
+    item_latencies = []
+    decode_transaction = LogDecoder.decode_transaction
+
+    def timed_decode_transaction(self, *a, **kw):
+        started = time.perf_counter()
+        try:
+            return decode_transaction(self, *a, **kw)
+        finally:
+            item_latencies.append(time.perf_counter() - started)
+
+    LogDecoder.decode_transaction = timed_decode_transaction
+
+    def count_rows(folder):
+        folder = os.path.join(output_path, folder)
+        if not os.path.isdir(folder):
+            return 0
+        total = 0
+        for file_name in os.listdir(folder):
+            with open(os.path.join(folder, file_name), newline="") as file:
+                total += max(0, sum(1 for _ in file) - 1)
+        return total
+
+    started = time.perf_counter()
+    if name == "slot_search":
+        slot_finder = SolanaSlotFinder(url)
+        # 目标时间避开链的起点，只测量常规查找（最早可用区块附近的正确性由 slot_search_check.py 检查）
+        first_slot = chain.start_slot + args.slots // 10
+        targets = np.linspace(chain.block_time(first_slot), chain.block_time(end_slot), args.searches).astype(int)
+        for target in targets:
+            search_started = time.perf_counter()
+            slot_finder.find_closest_slot(int(target))
+            item_latencies.append(time.perf_counter() - search_started)
+        items = len(targets)
+    else:
+        fetcher = SolanaFetcher(start_slot, end_slot, url)
+        for log_decoder in fetcher.log_decoders:
+            log_decoder.log_enabled = False
+        fetcher.data_writer.log_enabled = False
+        started = time.perf_counter()  # 不计入初始化
+
+        if name == "pagination":
+            fetcher.fetch_pool_by_token(WSOL, USDC)
+            fetcher.fetch_transactions_for_pool("WSOL", "USDC")
+            items = count_rows("SIGNATURE")
+        elif name == "decode":
+            tx_signatures = [
+                (signature, chain.pool_of(slot, index)[0])
+                for signature, (slot, index) in chain.transactions.items()
+                if start_slot <= slot <= end_slot and not chain.is_failed(slot, index)
+            ]
+            if CONFIG.get("decode_engine") == "async":
+                fetcher.process_signatures_async(tx_signatures)
+            elif CONFIG.get("decode_engine") == "processes":
+                fetcher.process_signatures_processes(tx_signatures)
+            else:
+                fetcher.process_signatures_in_batches(tx_signatures)
+            fetcher.data_writer.flush()
+            items = count_rows("DATA")
+        elif name == "full_run":
+            fetcher.run()
+            items = count_rows("DATA")
+        else:
+            raise ValueError(f"未知场景: {name}")
+    elapsed = time.perf_counter() - started
+
+    shutil.rmtree(output_path, ignore_errors=True)
+    return {
+        "items": items,
+        "seconds": round(elapsed, 3),
+        "items_per_second": round(items / elapsed, 1) if elapsed else None,
+        "item_latency_ms": percentiles(item_latencies),
+        "rpc_latency_ms": percentiles(rpc_latencies),
+        "rpc_calls": len(rpc_latencies),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_in_subprocess(name, url, args, overrides):
+    """ 在新的 Python 进程中运行场景，读取其最后一行输出的 JSON 结果 """
+    command = [sys.executable, os.path.abspath(__file__), "--child", name, "--url", url,
+               "--overrides", json.dumps(overrides)] + [
+        f"--{key.replace('_', '-')}={getattr(args, key)}" for key in ("slots", "tx_per_slot", "searches")]
+    result = subprocess.run(command, capture_output=True, text=True, encoding="utf-8", errors="replace")
+    for line in reversed(result.stdout.splitlines()):
+        if line.startswith("BENCH_RESULT "):
+            return json.loads(line[len("BENCH_RESULT "):])
+    print(result.stdout[-2000:], result.stderr[-2000:])
+    return {"error": f"exit code {result.returncode}"}
+
+
+def parse_value(text):
+    """ --set / --sweep 的值按 JSON 解析，解析失败时作为字符串 """
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+# ========== 主函数 ========== #
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SOL_FETCH 端到端基准（本地 MockRpcServer）")
+    parser.add_argument("scenarios", nargs="*", default=SCENARIOS, help=f"要运行的场景，默认全部：{SCENARIOS}")
+    parser.add_argument("--slots", type=int, default=2000, help="合成链的 Slot 数")
+    parser.add_argument("--tx-per-slot", type=int, default=4, help="每个区块的交易数")
+    parser.add_argument("--searches", type=int, default=20, help="slot_search 场景的查找次数")
+    parser.add_argument("--latency", type=float, default=0.02, help="模拟的网络延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.01, help="额外的随机延迟上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="HTTP 500 的概率")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="HTTP 429 的概率")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="覆盖 CONFIG（值按 JSON 解析）")
+    parser.add_argument("--sweep", metavar="KEY=V1,V2", help="对一个 CONFIG 项的多个取值分别运行")
+    parser.add_argument("--output", help="结果 JSON 路径（默认 RESULT/BENCH/bench_<提交>_<时间>.json）")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    parser.add_argument("--overrides", default="{}", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        metrics = run_scenario(args.child, args.url, args, json.loads(args.overrides))
+        print("BENCH_RESULT " + json.dumps(metrics))
+        sys.exit(0)
+
+    base_overrides = {}
+    for item in args.set:
+        key, _, value = item.partition("=")
+        base_overrides[key] = parse_value(value)
+    variants = [base_overrides]
+    if args.sweep:
+        key, _, values = args.sweep.partition("=")
+        variants = [{**base_overrides, key: parse_value(value)} for value in values.split(",")]
+
+    server, url = start_server(args)
+    print(f"🚀 MockRpcServer: {url}（{args.slots} 个 Slot x {args.tx_per_slot} 笔，延迟 {args.latency * 1000:.0f}ms）")
+    results = []
+    try:
+        for scenario in args.scenarios:
+            for overrides in variants:
+                print(f"⏱️ {scenario} {json.dumps(overrides) if overrides else ''} ...", flush=True)
+                metrics = run_in_subprocess(scenario, url, args, overrides)
+                results.append({"scenario": scenario, "overrides": overrides, **metrics})
+                if "error" in metrics:
+                    print(f"❌ {scenario} 失败: {metrics['error']}")
+                    continue
+                latency = metrics["item_latency_ms"] or metrics["rpc_latency_ms"] or {}
+                print(f"   {metrics['items']} 项 / {metrics['seconds']:.2f} 秒 = {metrics['items_per_second']}/s"
+                      f" | p50 {latency.get('p50')}ms p95 {latency.get('p95')}ms p99 {latency.get('p99')}ms"
+                      f" | RPC {metrics['rpc_calls']} 次 | 峰值内存 {metrics['peak_rss_mb']} MB")
+    finally:
+        server.terminate()
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "server": {key: getattr(args, key) for key in
+                   ("slots", "tx_per_slot", "latency", "jitter", "error_rate", "throttle_rate")},
+        "results": results,
+    }
+    output_file = args.output or os.path.join(
+        ROOT, CONFIG["output_path"], "BENCH", f"bench_{commit}_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    with open(output_file, mode="w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2, ensure_ascii=False)
+    print(f"\n✅ 结果已写入 {output_file}")
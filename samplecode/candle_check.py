@@ -0,0 +1,103 @@
+"""
+K 线增量路径（CandleBuilder）的本地检查：在临时目录中分三次追加合成的 DATA 行，
+1. 第一次构建：新交易对，全量写入
+2. 第二次构建：新成交与上次最大 BlockTime 在同一秒（需要合并最后一根 K 线），DATA 末尾留一行未写完的半行
+3. 第三次构建：补全半行并继续追加
+后两次必须走追加路径（K 线文件被原地截断追加，而不是原子替换成新文件），
+最终结果与另一个目录中的全量重建逐字节一致。
+
+运行：
+python samplecode/candle_check.py [每批成交笔数]
+"""
+import filecmp
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CandleBuilder import CandleBuilder
+from DataWriter import DataWriter
+
+START_TIME = 1740000000
+INTERVALS = {"1s": 1, "1m": 60, "1h": 3600}
+
+
+def make_rows(rng, first_time, count):
+    """
+    合成的逐笔余额变动（与 DATA 一致记录绝对值）：WSOL_USDC.csv 与 USDC_WSOL.csv 两个文件（同一交易对），价格带很多位小数
+    :return: ({DATA 文件名: [行文本, ...]}, 最后一笔的 BlockTime)
+    """
+    rows = {"WSOL_USDC.csv": [], "USDC_WSOL.csv": []}
+    block_time = first_time
+    for index in range(count):
+        block_time += rng.choice((0, 0, 1, 1, 2, 45))
+        amount = rng.uniform(0.001, 50)
+        quote = amount * rng.uniform(140, 160)
+        signature = f"{block_time}-{index}-{rng.random()}"
+        # 同一秒的成交只写入一个文件，两种构建方式下同一秒内的先后顺序一致
+        if block_time % 7 == 3:
+            rows["USDC_WSOL.csv"].append(f"{signature},USDC,{quote!r},WSOL,{amount!r},{block_time}\n")
+        else:
+            rows["WSOL_USDC.csv"].append(f"{signature},WSOL,{amount!r},USDC,{quote!r},{block_time}\n")
+    return rows, block_time
+
+
+def append_rows(data_folder, rows):
+    for file_name, lines in rows.items():
+        path = os.path.join(data_folder, file_name)
+        with open(path, mode="a", newline="") as file:
+            if file.tell() == 0:
+                file.write(",".join(DataWriter.HEADER) + "\n")
+            file.write("".join(lines))
+
+
+def candle_inodes(builder):
+    return {interval: os.stat(builder.candle_file("WSOL", "USDC", interval)).st_ino for interval in INTERVALS}
+
+
+if __name__ == "__main__":
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = random.Random(0)
+    root = tempfile.mkdtemp(prefix="candle_")
+    data_folder = os.path.join(root, "DATA")
+    os.makedirs(data_folder)
+    builder = CandleBuilder(data_folder, os.path.join(root, "CANDLE"), INTERVALS, log_enabled=False)
+
+    # 1. 新交易对：全量写入
+    rows, last_time = make_rows(rng, START_TIME, batch_size)
+    append_rows(data_folder, rows)
+    processed = builder.build()
+    inodes = candle_inodes(builder)
+    print(f"✅ 第一次构建：{processed}")
+
+    # 2. 与上次最大 BlockTime 同一秒的新成交 + 未写完的半行
+    rows, last_time = make_rows(rng, last_time, batch_size)
+    partial_line = rows["WSOL_USDC.csv"].pop()
+    rows["WSOL_USDC.csv"].append(partial_line[:len(partial_line) // 2])
+    append_rows(data_folder, rows)
+    processed = builder.build()
+    assert candle_inodes(builder) == inodes, "第二次构建没有走追加路径"
+    print(f"✅ 第二次构建（追加，末尾半行留到下次）：{processed}")
+
+    # 3. 补全半行并继续追加
+    rows, last_time = make_rows(rng, last_time, batch_size)
+    rows["WSOL_USDC.csv"].insert(0, partial_line[len(partial_line) // 2:])
+    append_rows(data_folder, rows)
+    processed = builder.build()
+    assert candle_inodes(builder) == inodes, "第三次构建没有走追加路径"
+    print(f"✅ 第三次构建（追加）：{processed}")
+
+    # 与全量重建比较
+    reference = CandleBuilder(data_folder, os.path.join(root, "REBUILD"), INTERVALS, log_enabled=False)
+    reference.build(rebuild=True)
+    for interval in INTERVALS:
+        incremental_file = builder.candle_file("WSOL", "USDC", interval)
+        rebuild_file = reference.candle_file("WSOL", "USDC", interval)
+        assert filecmp.cmp(incremental_file, rebuild_file, shallow=False), f"{interval} K 线与全量重建不一致"
+        with open(incremental_file) as file:
+            print(f"✅ {interval}: {sum(1 for _ in file) - 1} 根 K 线，与全量重建逐字节一致")
+
+    shutil.rmtree(root, ignore_errors=True)
@@ -0,0 +1,117 @@
+"""
+解码路径微基准：从 getTransaction 响应字节到解析结果，比较三种方式的 CPU 开销（无需 RPC）
+1. 旧路径：solana-py 反序列化为 solders 对象 -> to_json() -> json.loads -> parse_transaction_json
+2. solders 字段：solana-py 反序列化为 solders 对象 -> 直接读取 meta.pre_token_balances 等字段
+   （solders 的每次属性访问都会复制整个子对象，实测并不比旧路径快，因此未采用）
+3. 快速路径：原始响应字节 -> orjson（未安装时为 json）-> parse_transaction_json（decode_transaction 当前使用）
+
+运行：python samplecode/decode_benchmark.py [交易笔数]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from solders.pubkey import Pubkey
+from solders.rpc.responses import GetTransactionResp
+from solders.signature import Signature
+from LogDecoder import LogDecoder, _json_loads
+
+WSOL = "So11111111111111111111111111111111111111112"
+USDC = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+TOKEN_PROGRAM = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+
+
+def build_transaction(signature, market_address, other_balances=12, log_lines=40):
+    """
+    构造一笔与真实 Raydium 交换规模相近的交易 JSON：
+    目标池的两个代币余额 + 其他账户的余额 + 若干日志
+    """
+    def balance(index, mint, owner, amount):
+        return {
+            "accountIndex": index, "mint": mint, "owner": owner, "programId": TOKEN_PROGRAM,
+            "uiTokenAmount": {"amount": str(int(amount * 1e6)), "decimals": 6,
+                              "uiAmount": amount, "uiAmountString": str(amount)},
+        }
+
+    others = [(str(Pubkey.new_unique()), str(Pubkey.new_unique())) for _ in range(other_balances)]
+    pre = [balance(1, WSOL, market_address, 1000.0), balance(2, USDC, market_address, 150000.0)]
+    post = [balance(1, WSOL, market_address, 1001.5), balance(2, USDC, market_address, 149780.0)]
+    for idx, (mint, owner) in enumerate(others, start=3):
+        pre.append(balance(idx, mint, owner, 10.0 + idx))
+        post.append(balance(idx, mint, owner, 9.0 + idx))
+
+    account_keys = [market_address] + [str(Pubkey.new_unique()) for _ in range(20)]
+    return {
+        "slot": 320000000, "blockTime": 1740595456, "version": 0,
+        "transaction": {
+            "signatures": [signature],
+            "message": {
+                "accountKeys": account_keys,
+                "header": {"numRequiredSignatures": 1, "numReadonlySignedAccounts": 0,
+                           "numReadonlyUnsignedAccounts": 10},
+                "recentBlockhash": "11111111111111111111111111111111",
+                "instructions": [{"programIdIndex": 2, "accounts": list(range(18)), "data": "3Bxs4h24hBtQy9rw",
+                                  "stackHeight": None}],
+                "addressTableLookups": [],
+            },
+        },
+        "meta": {
+            "err": None, "fee": 5000, "preBalances": [1] * len(account_keys), "postBalances": [1] * len(account_keys),
+            "innerInstructions": [], "rewards": [], "status": {"Ok": None},
+            "logMessages": [f"Program log: instruction {i}" for i in range(log_lines)],
+            "preTokenBalances": pre, "postTokenBalances": post,
+            "loadedAddresses": {"writable": [], "readonly": []}, "computeUnitsConsumed": 30000,
+        },
+    }
+
+
+def measure(name, func, items):
+    """ 运行并输出每笔耗时 """
+    start_time = time.perf_counter()
+    results = [func(item) for item in items]
+    elapsed_time = time.perf_counter() - start_time
+    print(f"{name:<40} {elapsed_time:7.3f} 秒  {elapsed_time / len(items) * 1e6:8.1f} µs/笔")
+    return results
+
+
+# ========== 主函数 ========== #
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    market_address = str(Pubkey.new_unique())
+    decoder = LogDecoder(None, log_enabled=False)
+
+    raw_responses = [
+        json.dumps({"jsonrpc": "2.0", "id": 0,
+                    "result": build_transaction(str(Signature.new_unique()), market_address)}).encode()
+        for _ in range(count)
+    ]
+
+    def old_path(raw):
+        tx_value = GetTransactionResp.from_json(raw.decode()).value  # solana-py 内部的反序列化
+        return decoder.parse_transaction_json(json.loads(tx_value.to_json()), market_address)
+
+    owner = Pubkey.from_string(market_address)
+
+    def solders_path(raw):
+        tx_value = GetTransactionResp.from_json(raw.decode()).value
+        meta = tx_value.transaction.meta
+
+        def owner_balances(token_balances):
+            return {str(b.mint): float(b.ui_token_amount.ui_amount) for b in token_balances if b.owner == owner}
+
+        return decoder.build_transaction_data(tx_value.block_time, owner_balances(meta.pre_token_balances),
+                                              owner_balances(meta.post_token_balances))
+
+    def fast_path(raw):
+        return decoder.parse_transaction_json(_json_loads(raw)["result"], market_address)
+
+    print(f"\n{count} 笔交易，JSON 解析器: {_json_loads.__module__}\n")
+    old = measure("solders + to_json + json.loads（旧）", old_path, raw_responses)
+    typed = measure("solders 字段", solders_path, raw_responses)
+    fast = measure("原始字节 + parse_transaction_json（快速）", fast_path, raw_responses)
+
+    assert old == typed == fast, "三种解析方式的结果不一致"
+    print("\n✅ 三种解析方式结果一致")
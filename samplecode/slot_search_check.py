@@ -0,0 +1,74 @@
+"""
+Slot 查找（SolanaSlotFinder）的本地检查：在 MockRpcServer 的合成链上，把插值查找的结果与逐个 Slot 计算的标准答案比较，
+重点覆盖最早可用区块附近的目标时间（早于第一个区块的 Slot 返回 -32004 Block not available）：
+1. find_closest_slot：逐个查找
+2. find_closest_slots：批量查找（不使用 Slot 索引）
+3. find_closest_slots：批量查找（使用临时目录中的 Slot 索引）
+三者都必须等于首个 blockTime >= 目标时间的有效 Slot（目标早于第一个区块时为第一个区块，晚于最新区块时为最新区块）。
+
+运行：
+python samplecode/slot_search_check.py [Slot 数]
+"""
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+
+CONFIG = config.CONFIG  # 直接使用 CONFIG
+
+
+def expected_slot(chain, target_timestamp):
+    """ 标准答案：首个 blockTime >= 目标时间的有效 Slot """
+    valid_slots = [slot for slot in range(chain.start_slot, chain.head_slot + 1) if not chain.is_skipped(slot)]
+    for slot in valid_slots:
+        if chain.block_time(slot) >= target_timestamp:
+            return slot
+    return valid_slots[-1]
+
+
+if __name__ == "__main__":
+    from MockRpcServer import MockRpcServer, SyntheticChain
+
+    slots = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    chain = SyntheticChain(slots=slots, tx_per_slot=1)
+    # 最早区块前后各 2 分钟逐秒查找，再加上整条链上均匀分布的目标与最新区块之后的目标
+    first_time, last_time = chain.block_time(chain.start_slot), chain.block_time(chain.head_slot)
+    targets = list(range(first_time - 120, first_time + 120))
+    targets += list(range(first_time, last_time, max(1, (last_time - first_time) // 50))) + [last_time + 60]
+    expected = [expected_slot(chain, target) for target in targets]
+
+    index_folder = tempfile.mkdtemp(prefix="slot_index_")
+    with MockRpcServer(chain) as server:
+        CONFIG.update({"rpc_url1": server.url, "rpc_url2": server.url, "slot_index_enabled": False,
+                       "rate_limits": {"default": {"initial_rate": 5000, "max_rate": 10000}}})
+        for key in [key for key in CONFIG if key.startswith("rpc_url") and key not in ("rpc_url1", "rpc_url2")]:
+            del CONFIG[key]
+
+        from SlotIndex import SlotIndex
+        from SolanaSlotFinder import SolanaSlotFinder
+
+        slot_finder = SolanaSlotFinder(server.url)
+        indexed_finder = SolanaSlotFinder(server.url, slot_index=SlotIndex(os.path.join(index_folder, "slot_index.bin")))
+
+        def run(name, lookup):
+            requests_before = server.stats()["requests"]
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = lookup()
+            mismatches = [(target, result, answer) for target, result, answer in zip(targets, results, expected)
+                          if result != answer]
+            assert not mismatches, f"❌ {name}：{len(mismatches)} 个结果错误，例如（目标时间, 结果, 标准答案）{mismatches[:3]}"
+            requests = server.stats()["requests"] - requests_before
+            print(f"✅ {name}：{len(targets)} 个目标全部正确，平均每个目标 {requests / len(targets):.1f} 次 RPC")
+
+        run("find_closest_slot", lambda: [slot_finder.find_closest_slot(target) for target in targets])
+        run("find_closest_slots（无索引）", lambda: slot_finder.find_closest_slots(targets))
+        run("find_closest_slots（Slot 索引）", lambda: indexed_finder.find_closest_slots(targets))
+        indexed_finder.slot_index.close()
+
+    shutil.rmtree(index_folder, ignore_errors=True)
@@ -0,0 +1,148 @@
+"""
+订阅模式（LogSubscriber）的本地检查：MockRpcServer（HTTP）与 MockWebsocketServer（logsSubscribe）共用一条合成链，
+依次验证：
+1. subscribe：每个交易池都订阅成功
+2. notification：出块后收到推送并解码写入 DATA
+3. gap-fill：断线期间出的块在重连后由签名分页补齐
+4. fallback：websocket 拒绝握手时退回轮询（PoolFollower.poll_once），恢复后重新订阅
+最后检查 DATA 恰好包含起始高水位之后全部成功交易（不多、不少、不重复）。
+
+运行：
+python samplecode/subscriber_check.py
+"""
+import asyncio
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config
+
+CONFIG = config.CONFIG  # 直接使用 CONFIG
+
+WSOL = "So11111111111111111111111111111111111111112"
+USDC = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+BLOCKS_PER_STEP = 20  # 每个阶段出块的 Slot 数
+
+
+def wait_until(condition, timeout=30, message=""):
+    """ 轮询等待条件成立，超时抛出 AssertionError """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return
+        time.sleep(0.1)
+    raise AssertionError(f"❌ 等待超时：{message}")
+
+
+def expected_signatures(chain, first_slot, last_slot):
+    """ (first_slot, last_slot] 中的全部成功交易 """
+    return {
+        signature for signature, (slot, index) in chain.transactions.items()
+        if first_slot < slot <= last_slot and not chain.is_failed(slot, index)
+    }
+
+
+def data_signatures(output_path):
+    """ DATA 中的全部签名（列表，保留重复） """
+    signatures = []
+    folder = os.path.join(output_path, "DATA")
+    for file_name in os.listdir(folder) if os.path.isdir(folder) else []:
+        signatures.extend(row[0] for row in DataWriter.read_rows(os.path.join(folder, file_name)))
+    return signatures
+
+
+if __name__ == "__main__":
+    from MockRpcServer import MockRpcServer, MockWebsocketServer, SyntheticChain
+
+    chain = SyntheticChain(slots=400, tx_per_slot=4)
+    chain.head_slot = chain.start_slot + 100  # 之后的 Slot 由 MockWebsocketServer.advance() 逐步出块
+    initial_head = chain.head_slot
+
+    output_path = tempfile.mkdtemp(prefix="subscriber_")
+    with MockRpcServer(chain) as server, MockWebsocketServer(chain) as ws_server:
+        CONFIG.update({
+            "rpc_url1": server.url, "rpc_url2": server.url, "ws_url": ws_server.url,
+            "output_path": output_path, "input_path": output_path,
+            "slot_index_enabled": False, "fetch_checkpoint_enabled": False, "tx_cache_enabled": False,
+            "ws_checkpoint_interval": 0.5, "ws_fallback_after": 2,
+        })
+        for key in [key for key in CONFIG if key.startswith("rpc_url") and key not in ("rpc_url1", "rpc_url2")]:
+            del CONFIG[key]
+        with open(os.path.join(output_path, "input.csv"), mode="w", newline="") as file:
+            csv.writer(file).writerows([["mint1", "mint2"], [WSOL, USDC]])
+
+        from DataWriter import DataWriter
+        from LogSubscriber import LogSubscriber
+        from RaydiumPoolFetcher import RaydiumPoolFetcher
+        from SOL_fetcher import SolanaFetcher
+
+        RaydiumPoolFetcher.RAYDIUM_API_BASE_URL = server.url
+        fetcher = SolanaFetcher(chain.start_slot, initial_head, server.url)  # 第一次订阅从 end_slot 之后开始
+        pools = fetcher.read_all_pools()
+        subscriber = LogSubscriber(fetcher, pools)
+
+        # 在独立线程的事件循环中运行订阅，检查结束后取消
+        loop = asyncio.new_event_loop()
+        task = loop.create_task(subscriber._run())
+
+        def run_subscriber():
+            try:
+                loop.run_until_complete(task)
+            except asyncio.CancelledError:
+                pass  # _run 的 finally 已等待解码完成并推进高水位
+
+        thread = threading.Thread(target=run_subscriber, daemon=True)
+        thread.start()
+
+        # 1. subscribe
+        wait_until(lambda: ws_server.subscriptions() == len(pools), message="订阅全部交易池")
+        print(f"✅ subscribe：{len(pools)} 个交易池已订阅")
+
+        # 2. notification -> decode
+        ws_server.advance(BLOCKS_PER_STEP)
+        expected = expected_signatures(chain, initial_head, chain.head_slot)
+        wait_until(lambda: subscriber.transactions_decoded >= len(expected), message="推送的交易解码完成")
+        assert subscriber.notifications == ws_server.notifications, "推送数不一致"
+        print(f"✅ notification：推送 {subscriber.notifications} 笔，解码 {subscriber.transactions_decoded} 笔")
+
+        # 3. 断线期间出块（不推送），重连后补缺口
+        ws_server.accepting = False
+        ws_server.disconnect()
+        missed = expected_signatures(chain, chain.head_slot, chain.head_slot + BLOCKS_PER_STEP)
+        ws_server.advance(BLOCKS_PER_STEP, notify=False)
+        ws_server.accepting = True
+        expected = expected_signatures(chain, initial_head, chain.head_slot)
+        wait_until(lambda: subscriber.transactions_decoded >= len(expected), message="断线期间的交易补齐")
+        assert subscriber.reconnects >= 1 and subscriber.gap_filled >= len(missed), "没有补缺口"
+        print(f"✅ gap-fill：重连 {subscriber.reconnects} 次，补缺口 {subscriber.gap_filled} 笔（错过 {len(missed)} 笔）")
+
+        # 4. websocket 持续不可用：退回轮询，之后恢复订阅
+        wait_until(lambda: ws_server.subscriptions() == len(pools), message="重新订阅")
+        ws_server.accepting = False
+        ws_server.disconnect()
+        ws_server.advance(BLOCKS_PER_STEP, notify=False)
+        expected = expected_signatures(chain, initial_head, chain.head_slot)
+        wait_until(lambda: subscriber.follower.polls >= 1, timeout=60, message="退回轮询")
+        wait_until(lambda: expected <= set(data_signatures(output_path)), message="轮询获取的交易写入 DATA")
+        ws_server.accepting = True
+        wait_until(lambda: ws_server.subscriptions() == len(pools), timeout=60, message="websocket 恢复后重新订阅")
+        print(f"✅ fallback：轮询 {subscriber.follower.polls} 轮，拒绝握手 {ws_server.rejected} 次，已重新订阅")
+
+        loop.call_soon_threadsafe(task.cancel)
+        thread.join(timeout=60)
+
+        signatures = data_signatures(output_path)
+        assert len(signatures) == len(set(signatures)), "DATA 中有重复签名"
+        assert set(signatures) == expected, (f"DATA 与合成链不一致：缺少 {len(expected - set(signatures))} 笔，"
+                                             f"多出 {len(set(signatures) - expected)} 笔")
+        print(f"✅ DATA 共 {len(signatures)} 笔交易，与合成链 Slot {initial_head + 1} ~ {chain.head_slot} 的成功交易一致")
+        print(f"📊 websocket: {ws_server.stats()}，HTTP: {server.stats()['calls']}")
+
+    shutil.rmtree(output_path, ignore_errors=True)